@@ -1,11 +1,38 @@
 import os
+import sys
 import time
 import logging
 import pyautogui
 import shutil
-import subprocess  # 确保在文件顶部导入subprocess模块
-import win32api
-import win32con
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as futures_wait
+
+from template_cache import TemplateCache
+from matcher import Box, match_score, match_template, match_templates, match_scales
+from roi_hints import RoiHintStore
+from scale_hints import ScaleHintStore
+from ui_wait import wait_until, ScreenSettled, FrameChangeDetector
+from export_watcher import ExportFolderWatcher, folder_signature
+from discovery import ClientIndex, discover_clients, inspect_executable
+from processes import ProcessTracker
+from parallel_export import parallel_supported, run_parallel, merge_stats
+from transfer import TransferLog, move_tree
+from postprocess import PostProcessQueue
+from dedup_store import BlobStore
+from incremental import IncrementalMerger
+from result_index import build_index
+from search_index import SearchIndex, update_search_index
+from archive_pack import ArchivePacker, SEGMENT_SIZE, pack_export, find_export_dirs
+import run_journal
+from run_journal import RunJournal
+import retry
+from retry import ExportFailure, RetryScheduler
+import timing_history
+from timing_history import TimingHistory
+import tracing
+from tracing import Tracer, format_summary
+import capture
+from capture import ScreenCapture
 
 # 有条件导入pythoncom，如果不可用则跳过
 try:
@@ -34,6 +61,97 @@ EXPORT_OPTIONS = [              # 需要勾选的导出选项
 SUPPORTED_LANGUAGES = ["en", "ru"]  # 支持的语言列表：英语和俄语
 DEFAULT_LANGUAGE = "en"             # 默认语言：英语
 
+# 等待超时（秒）：界面就绪后立即继续，超时仅作为上限
+CLIENT_START_TIMEOUT = 15           # 等待客户端主界面出现
+MENU_OPEN_TIMEOUT = 3               # 等待菜单展开
+SETTLE_TIMEOUT = 2                  # 等待画面稳定
+UI_CHECK_INTERVAL = 2               # 等待导出期间检查界面按钮的间隔
+EXPORT_FOLDER_TIMEOUT = 30          # 确认保存后等待导出文件夹出现的超时
+# 结果文件写完后，导出文件夹需保持不变的秒数才视为导出完成；结果文件最后写入，收尾后只需短暂确认
+EXPORT_SETTLE_SECONDS = 3
+# 始终没有结果文件时，导出文件夹需保持不变的秒数；
+# 应大于导出过程中可能出现的停顿（限流等待、网络中断）
+EXPORT_QUIET_SECONDS = 30
+EXPORT_WAIT_TIMEOUT = 1800          # 没有耗时记录时等待导出完成的超时
+EXPORT_WAIT_MAX = 6 * 3600          # 按耗时记录计算的导出等待超时上限
+EXPORT_GROWTH_WINDOW = 300          # 超时时导出文件夹仍在增长则继续等待，每次延长的秒数（总等待不超过上限）
+
+# 流水线导出：客户端开始写入文件后即可启动下一个客户端，该值为同时写入的客户端数量上限（1表示逐个导出）
+PIPELINE_DEPTH = 2
+
+# Telegram Desktop默认的导出下载目录
+DOWNLOADS_PATH = os.path.join(os.path.expanduser("~"), "Downloads", "Telegram Desktop")
+
+# 可选截图（不存在时不影响运行）
+OPTIONAL_SCREENSHOTS = ["hamburger_menu_dark.png"]
+
+# 截图模板缓存，启动时预加载，避免每次定位都重新读盘解码
+TEMPLATES = TemplateCache(SCREENSHOT_DIR)
+
+# 界面元素位置提示，按语言和分辨率记录，优先在上次位置附近搜索
+ROI_HINTS_FILE = "roi_hints.json"
+ROI_HINTS = RoiHintStore(ROI_HINTS_FILE)
+
+# 界面缩放比例记录：本机缩放设置与截图时不同时，记录匹配成功的比例，之后直接使用该比例的截图
+SCALE_HINTS_FILE = "scale_hints.json"
+SCALE_HINTS = ScaleHintStore(SCALE_HINTS_FILE)
+
+# 可执行文件识别结果索引，按(路径, 大小, 修改时间)缓存，重复运行时只检查有变化的文件
+CLIENT_INDEX_FILE = "client_index.json"
+CLIENT_INDEX = ClientIndex(CLIENT_INDEX_FILE)
+
+# 客户端进程跟踪器：记录本程序启动的进程，并按可执行文件路径缓存Telegram判断结果
+PROCESS_TRACKER = ProcessTracker(lambda exe_path: inspect_executable(exe_path)["is_telegram"])
+
+# 导出文件夹转移记录，用于汇总每个客户端的转移吞吐量
+TRANSFERS = TransferLog()
+
+# 后处理队列：导出文件转移和下载目录清理在后台线程中执行
+POSTPROCESS_WORKERS = 2             # 同时执行的后处理任务数
+POSTPROCESS_MAX_PENDING = 4         # 排队任务上限，队列满时界面线程等待
+POSTPROCESS = PostProcessQueue(POSTPROCESS_WORKERS, POSTPROCESS_MAX_PENDING)
+
+# 去重存储：启用后导出的媒体文件按内容只保存一份，各客户端导出目录通过链接引用
+DEDUP_EXPORTS = False               # 默认是否启用
+DEDUP_STORE_DIR = "_dedup_store"    # 存储目录（位于导出目录下，保证与导出文件在同一分区）
+DEDUP_STORE = BlobStore()
+
+# 增量导出：保留上次的导出目录，只合并新消息和新文件
+INCREMENTAL_EXPORTS = False         # 默认是否启用
+INCREMENTAL = IncrementalMerger()
+
+# 转移完成后为result.json生成SQLite消息索引（流式解析，内存占用与文件大小无关）
+INDEX_EXPORTS = True
+
+# 运行结束后将所有客户端的消息索引汇总到 导出目录/search_index.sqlite，供search命令检索
+SEARCH_INDEX_EXPORTS = True
+
+# 打包：转移和索引完成后将客户端导出目录打包为分段zip文件（<导出目录>.pack），也可用pack命令批量打包
+PACK_EXPORTS = False                # 默认是否启用
+PACK_REMOVE_SOURCE = False          # 打包后是否删除源文件（保留消息索引；增量模式下不删除）
+PACKER = ArchivePacker()
+
+# 运行日志：导出目录/run_journal.jsonl 记录每个客户端的处理状态，中断后可用 --resume 继续
+JOURNAL = RunJournal()
+
+# 失败重试：一轮结束后按失败原因重新处理可重试的客户端（未登录等不重试）
+RETRY_MAX_ATTEMPTS = 3              # 每个客户端最多处理的轮数（含首轮），1表示不重试
+RETRY = RetryScheduler(RETRY_MAX_ATTEMPTS)
+
+# 耗时记录：按客户端记录各阶段耗时，据此计算自适应超时和预计剩余时间
+TIMING_HISTORY_FILE = "timing_history.json"
+HISTORY = TimingHistory(TIMING_HISTORY_FILE)
+
+# 耗时追踪：记录各步骤的耗时和模板匹配次数，写入 导出目录/trace_<运行编号>.jsonl（或Chrome Trace格式的.json）
+TRACE_EXPORTS = True
+TRACE_FORMAT = tracing.JSONL        # tracing.JSONL 或 tracing.CHROME
+TRACER = Tracer()
+
+# 截屏后端：capture.AUTO按 DXGI(Windows) -> mss -> pyautogui 的顺序选择第一个可用的后端，
+# 也可指定capture.MSS、capture.DXGI、capture.PYAUTOGUI；所有定位都通过CAPTURE截屏
+CAPTURE_BACKEND = capture.AUTO
+CAPTURE = ScreenCapture(CAPTURE_BACKEND)
+
 # 初始化日志
 logging.basicConfig(
     filename='telegram_export.log',
@@ -70,34 +188,182 @@ def check_screenshot_dir(language="en"):
     
     if missing:
         raise FileNotFoundError(f"语言 {language} 缺少必要截图文件：{', '.join(missing)}")
+    
+    # 预加载并解码所有截图，同时验证截图文件可用
+    TEMPLATES.load(language, required_files, OPTIONAL_SCREENSHOTS)
+
+def grab_screen(region=None):
+    """截取屏幕（或指定区域）并返回灰度数组（截屏缓冲区的视图，下一次截屏前有效）"""
+    return CAPTURE.grab_gray(region)
+
+def locate_on_screen(image_name, language="en", confidence=0.7, gate=None, search_scales=True):
+    """
+    使用缓存中的截图数组在屏幕上定位元素，未找到时返回None
+    
+    优先在该元素上次出现位置附近的区域内匹配，未命中时再进行全屏匹配，仍未命中时在其他缩放比例上查找
+    （search_scales为False时只尝试待确认的比例，轮询中使用，避免每次未命中都搜索全部比例）。
+    传入gate(FrameChangeDetector)时截取一次整屏，整屏画面没有变化则直接跳过匹配，
+    有变化时ROI和全屏匹配都使用这一帧（元素出现在ROI之外时也能及时发现）。
+    """
+    resolution = CAPTURE.size()
+    scale = SCALE_HINTS.scale_for(resolution)
+    needle = TEMPLATES.get(language, image_name, grayscale=True, scale=scale)
+    
+    region = ROI_HINTS.region_for(language, resolution, image_name)
+    frame = None
+    if gate is not None:
+        frame = grab_screen()
+        if not gate.check(frame):
+            return None
+    
+    if region:
+        TRACER.count("matches")
+        left, top, width, height = region
+        roi = frame[top:top + height, left:left + width] if frame is not None else grab_screen(region)
+        location = match_template(roi, needle, confidence, offset=region[:2])
+        if location:
+            ROI_HINTS.roi_hits += 1
+            ROI_HINTS.record(language, resolution, image_name, location)
+            SCALE_HINTS.confirm(resolution, scale)
+            return location
+        ROI_HINTS.roi_misses += 1
+    
+    TRACER.count("matches")
+    if frame is None:
+        frame = grab_screen()
+    location = match_template(frame, needle, confidence)
+    if location:
+        SCALE_HINTS.confirm(resolution, scale)
+    else:
+        found = find_at_other_scales(frame, [(language, image_name)], confidence, search_scales)
+        location = found[2] if found else None
+    if location:
+        ROI_HINTS.record(language, resolution, image_name, location)
+    return location
+
+def find_at_other_scales(frame, candidates, confidence, search=True):
+    """
+    在当前缩放比例下没有找到任何候选截图时，在其他缩放比例上查找
+    
+    先在待确认的比例（之前在其他比例上找到过）上匹配；search为True时再按SCALE_HINTS的间隔限制搜索全部比例。
+    同一比例上多次以足够高的得分命中后，SCALE_HINTS才改用该比例，之后的定位直接使用该比例的截图。
+    
+    返回:
+        (语言, 截图文件名, 位置) 或 None
+    """
+    resolution = CAPTURE.size()
+    candidate_scale = SCALE_HINTS.candidate_for(resolution)
+    if candidate_scale is not None:
+        TRACER.count("matches", len(candidates))
+        for language, image_name in candidates:
+            needle = TEMPLATES.get(language, image_name, grayscale=True, scale=candidate_scale)
+            score, loc = match_score(frame, needle)
+            if loc is not None and score >= confidence:
+                SCALE_HINTS.record(resolution, candidate_scale, score)
+                return language, image_name, Box(loc[0], loc[1], needle.shape[1], needle.shape[0])
+    if not search:
+        return None
+    scales = SCALE_HINTS.begin_search(resolution)
+    if not scales:
+        return None
+    TRACER.count("matches", len(scales) * len(candidates))
+    found = match_scales(
+        frame,
+        lambda scale: {c: TEMPLATES.get(*c, grayscale=True, scale=scale) for c in candidates},
+        scales,
+        confidence
+    )
+    if not found:
+        return None
+    (language, image_name), location, scale, score = found
+    SCALE_HINTS.record(resolution, scale, score)
+    return language, image_name, location
 
 def find_and_click(image_path, timeout=15, confidence=0.6, language="en"):
-    """通过图像识别定位并点击元素，支持多语言"""
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            location = pyautogui.locateOnScreen(
-                os.path.join(SCREENSHOT_DIR, language, image_path),
-                confidence=confidence
-            )
-            if location:
-                center = pyautogui.center(location)
-                pyautogui.click(center)
-                return True
-        except pyautogui.ImageNotFoundException:
-            time.sleep(1)
+    """
+    通过图像识别定位并点击元素，支持多语言
+    
+    等待时间按该元素以往出现所用的时间缩短（不超过timeout）；重试轮次中按RETRY放宽置信度和等待时间。
+    轮询时不搜索全部缩放比例，超时后才在其他比例上搜索一次。
+    """
+    confidence = RETRY.confidence(confidence)
+    start = time.monotonic()
+    with TRACER.span("find_and_click", image=image_path):
+        location = wait_until(
+            lambda: locate_on_screen(image_path, language, confidence, search_scales=False),
+            RETRY.timeout(HISTORY.element_timeout(image_path, timeout)),
+            poll_backoff=(0.1, 1.5, 1.0)
+        ) or locate_on_screen(image_path, language, confidence)
+    if location:
+        HISTORY.record_element(image_path, time.monotonic() - start)
+        center = pyautogui.center(location)
+        pyautogui.click(center)
+        return True
     logging.warning(f"未找到元素：{image_path} (语言: {language})")
     return False
 
+def wait_for_settle(timeout=SETTLE_TIMEOUT):
+    """等待画面稳定（动画、页面加载结束），超时后直接继续"""
+    return wait_until(ScreenSettled(grab_screen), timeout)
+
+def wait_for_template(candidates, timeout, confidence=0.7):
+    """
+    等待任一候选截图出现在屏幕上
+    
+    参数:
+        candidates: [(语言, 截图文件名), ...]，每次轮询只截屏一次
+        timeout: 最长等待时间（秒）
+        confidence: 匹配置信度
+    
+    轮询时不搜索全部缩放比例，超时后才在其他比例上搜索一次。
+    
+    返回:
+        (语言, 截图文件名, 位置) 或 None
+    """
+    candidates = [c for c in candidates if TEMPLATES.has(*c)]
+    
+    def visible(search_scales=False):
+        frame = grab_screen()
+        resolution = CAPTURE.size()
+        scale = SCALE_HINTS.scale_for(resolution)
+        for language, image_name in candidates:
+            TRACER.count("matches")
+            location = match_template(frame, TEMPLATES.get(language, image_name, grayscale=True, scale=scale),
+                                      confidence)
+            if location:
+                SCALE_HINTS.confirm(resolution, scale)
+                return language, image_name, location
+        return find_at_other_scales(frame, candidates, confidence, search_scales)
+    
+    return wait_until(visible, timeout) or visible(search_scales=True)
+
+def wait_for_menu(timeout=MENU_OPEN_TIMEOUT):
+    """等待汉堡菜单展开（任一语言的设置菜单项出现）"""
+    if not wait_for_template([(lang, "settings_menu_item.png") for lang in SUPPORTED_LANGUAGES], timeout, 0.75):
+        wait_for_settle()
+
+def find_export_options(options, language="en", confidence=0.7):
+    """
+    截屏一次，在同一帧上匹配所有给定的导出选项（使用当前记录的缩放比例）
+    
+    返回:
+        dict - {选项: 位置}，只包含找到的选项
+    """
+    scale = SCALE_HINTS.scale_for(CAPTURE.size())
+    TRACER.count("matches", len(options))
+    return match_templates(
+        grab_screen(),
+        {option: TEMPLATES.get(language, f"{option}.png", grayscale=True, scale=scale) for option in options},
+        confidence=confidence
+    )
+
+@TRACER.traced("select_export_options")
 def select_export_options(language="en"):
     """选择导出选项（直接点击所有指定选项），支持多语言"""
     # 通过识别导出设置窗口标题来获取焦点
     try:
         # 尝试查找"Chat export settings"标题
-        title_loc = pyautogui.locateOnScreen(
-            os.path.join(SCREENSHOT_DIR, language, "export_settings_title.png"),
-            confidence=0.7
-        )
+        title_loc = locate_on_screen("export_settings_title.png", language, 0.7)
         if title_loc:
             center = pyautogui.center(title_loc)
             # 直接点击标题区域以获取焦点
@@ -111,44 +377,45 @@ def select_export_options(language="en"):
         logging.warning(f"获取窗口焦点异常: {str(e)}，使用屏幕中心点击")
         pyautogui.click(pyautogui.size()[0] // 2, pyautogui.size()[1] // 2)
     
-    time.sleep(0.5)
+    wait_for_settle()
     
     # 直接使用全局定义的EXPORT_OPTIONS，不再重复定义all_options
     
     # 初始强力滚动到顶部
     for _ in range(3):
         pyautogui.scroll(800)  # 向上滚动
-        time.sleep(0.5)
+        wait_for_settle()
     
     # 再向下滚动一点，确保从选项开始的位置
     pyautogui.scroll(-400)
-    time.sleep(0.5)
+    wait_for_settle()
     
-    # 动态滚动查找
+    # 动态滚动查找（导出设置窗口已经找到，缩放比例已确定）
     options_found = set()
     
     for attempt in range(10):
         logging.info(f"选项查找尝试 #{attempt+1}")
         
-        for option in EXPORT_OPTIONS:  # 使用EXPORT_OPTIONS替代all_options
-            if option in options_found:
+        pending = [option for option in EXPORT_OPTIONS if option not in options_found]
+        try:
+            matches = find_export_options(pending, language, RETRY.confidence(0.7))
+        except Exception as e:
+            logging.debug(f"选项匹配异常：{str(e)}")
+            matches = {}
+        
+        # 按EXPORT_OPTIONS的顺序点击本帧中找到的选项
+        for option in pending:
+            text_loc = matches.get(option)
+            if not text_loc:
                 continue
-                
             try:
-                # 定位选项文字，使用对应语言的截图
-                text_loc = pyautogui.locateOnScreen(
-                    os.path.join(SCREENSHOT_DIR, language, f"{option}.png"),
-                    confidence=0.7
-                )
-                if text_loc:
-                    # 直接点击选项文字
-                    center = pyautogui.center(text_loc)
-                    pyautogui.click(center)  # 直接点击文字中央
-                    #pyautogui.click(center.x - 50, center.y)  # 点击文字左侧约50像素处的复选框
-                    logging.info(f"已点击选项：{option}")
-                    time.sleep(0.2)
-                    
-                    options_found.add(option)
+                # 直接点击选项文字
+                center = pyautogui.center(text_loc)
+                pyautogui.click(center)  # 直接点击文字中央
+                #pyautogui.click(center.x - 50, center.y)  # 点击文字左侧约50像素处的复选框
+                logging.info(f"已点击选项：{option}")
+                
+                options_found.add(option)
             except Exception as e:
                 logging.debug(f"选项处理异常：{option} - {str(e)}")
                 continue
@@ -160,13 +427,14 @@ def select_export_options(language="en"):
             
         # 强力向下滚动，使用更大的滚动距离
         pyautogui.scroll(-500)
-        time.sleep(1)
+        wait_for_settle()
         
     # 记录未找到的选项
     if len(options_found) < len(EXPORT_OPTIONS):  # 使用EXPORT_OPTIONS替代all_options
         missing = set(EXPORT_OPTIONS) - options_found  # 使用EXPORT_OPTIONS替代all_options
         logging.warning(f"未能找到以下选项: {missing}")
 
+@TRACER.traced("detect_language")
 def detect_language(client_path):
     """检测客户端界面语言，使用设置菜单项来判断，并直接点击进入设置"""
     # 先点击汉堡菜单，以便能看到设置菜单项
@@ -176,17 +444,14 @@ def detect_language(client_path):
         white_menu_path = os.path.join(SCREENSHOT_DIR, DEFAULT_LANGUAGE, "hamburger_menu.png")
         logging.debug(f"白底菜单图片路径: {white_menu_path}")
         
-        # 检查文件是否存在
-        if not os.path.exists(white_menu_path):
+        # 检查截图是否已加载
+        if not TEMPLATES.has(DEFAULT_LANGUAGE, "hamburger_menu.png"):
             logging.warning(f"白底菜单图片不存在: {white_menu_path}")
         
         # 尝试查找白底汉堡菜单
         location = None
         try:
-            location = pyautogui.locateOnScreen(
-                white_menu_path,
-                confidence=0.8
-            )
+            location = locate_on_screen("hamburger_menu.png", DEFAULT_LANGUAGE, 0.8)
             
             if location:
                 logging.info(f"找到白底汉堡菜单，位置: {location}")
@@ -202,18 +467,15 @@ def detect_language(client_path):
             dark_menu_path = os.path.join(SCREENSHOT_DIR, DEFAULT_LANGUAGE, "hamburger_menu_dark.png")
             logging.debug(f"黑底菜单图片路径: {dark_menu_path}")
             
-            # 检查文件是否存在
-            if not os.path.exists(dark_menu_path):
+            # 检查截图是否已加载
+            if not TEMPLATES.has(DEFAULT_LANGUAGE, "hamburger_menu_dark.png"):
                 logging.warning(f"黑底菜单图片不存在: {dark_menu_path}")
             else:
                 # 尝试降低confidence值查找黑底菜单
                 for conf in [0.8, 0.7, 0.6]:
                     try:
                         logging.info(f"尝试使用confidence={conf}查找黑底菜单")
-                        location = pyautogui.locateOnScreen(
-                            dark_menu_path,
-                            confidence=conf
-                        )
+                        location = locate_on_screen("hamburger_menu_dark.png", DEFAULT_LANGUAGE, conf)
                         if location:
                             logging.info(f"找到黑底汉堡菜单，位置: {location}，confidence: {conf}")
                             break
@@ -225,7 +487,7 @@ def detect_language(client_path):
             center = pyautogui.center(location)
             logging.info(f"点击汉堡菜单，位置: {center}")
             pyautogui.click(center)
-            time.sleep(2)  # 等待菜单展开
+            wait_for_menu()  # 等待菜单展开
         else:
             # 如果使用默认语言找不到，尝试使用其他支持的语言
             logging.info("默认语言未找到汉堡菜单，尝试其他语言...")
@@ -237,27 +499,21 @@ def detect_language(client_path):
                 
                 # 尝试查找白底汉堡菜单
                 white_path = os.path.join(SCREENSHOT_DIR, language, "hamburger_menu.png")
-                if os.path.exists(white_path):
+                if TEMPLATES.has(language, "hamburger_menu.png"):
                     logging.debug(f"尝试白底菜单: {white_path}")
-                    location = pyautogui.locateOnScreen(
-                        white_path,
-                        confidence=0.8
-                    )
+                    location = locate_on_screen("hamburger_menu.png", language, 0.8)
                 else:
                     logging.warning(f"白底菜单图片不存在: {white_path}")
                 
                 # 如果找不到白底菜单，尝试查找黑底菜单
                 if not location:
                     dark_path = os.path.join(SCREENSHOT_DIR, language, "hamburger_menu_dark.png")
-                    if os.path.exists(dark_path):
+                    if TEMPLATES.has(language, "hamburger_menu_dark.png"):
                         logging.debug(f"尝试黑底菜单: {dark_path}")
                         # 尝试降低confidence值查找黑底菜单
                         for conf in [0.8, 0.7, 0.6]:
                             logging.info(f"尝试使用confidence={conf}查找黑底菜单")
-                            location = pyautogui.locateOnScreen(
-                                dark_path,
-                                confidence=conf
-                            )
+                            location = locate_on_screen("hamburger_menu_dark.png", language, conf)
                             if location:
                                 logging.info(f"找到黑底汉堡菜单，位置: {location}，confidence: {conf}")
                                 break
@@ -268,13 +524,13 @@ def detect_language(client_path):
                     center = pyautogui.center(location)
                     logging.info(f"点击汉堡菜单，位置: {center}，语言: {language}")
                     pyautogui.click(center)
-                    time.sleep(2)  # 等待菜单展开
+                    wait_for_menu()  # 等待菜单展开
                     break
             
             if not location:
                 # 添加截图以便调试
                 debug_screenshot = os.path.join(os.getcwd(), "debug_screenshot.png")
-                pyautogui.screenshot(debug_screenshot)
+                CAPTURE.save(debug_screenshot)
                 logging.warning(f"无法找到汉堡菜单按钮，已保存调试截图: {debug_screenshot}")
                 logging.warning("无法找到汉堡菜单按钮，语言检测可能不准确")
     except Exception as e:
@@ -282,7 +538,7 @@ def detect_language(client_path):
         # 保存异常时的截图
         try:
             error_screenshot = os.path.join(os.getcwd(), "error_screenshot.png")
-            pyautogui.screenshot(error_screenshot)
+            CAPTURE.save(error_screenshot)
             logging.error(f"发生异常，已保存错误截图: {error_screenshot}")
         except:
             pass
@@ -291,41 +547,127 @@ def detect_language(client_path):
     for language in SUPPORTED_LANGUAGES:
         try:
             # 尝试查找该语言的设置菜单项
-            location = pyautogui.locateOnScreen(
-                os.path.join(SCREENSHOT_DIR, language, "settings_menu_item.png"),
-                confidence=0.75
-            )
+            location = locate_on_screen("settings_menu_item.png", language, 0.75)
             if location:
                 logging.info(f"检测到界面语言: {language}")
                 # 直接点击设置菜单项，进入设置
                 center = pyautogui.center(location)
                 pyautogui.click(center)
-                time.sleep(1)  # 等待设置页面加载
+                wait_for_settle()  # 等待设置页面加载
                 return language
         except Exception as e:
             logging.debug(f"语言检测异常 ({language}): {str(e)}")
     
     # 点击ESC关闭可能打开的菜单
     pyautogui.press('escape')
-    time.sleep(0.5)
+    wait_for_settle()
     
     # 如果无法检测到语言，返回默认语言
     logging.warning(f"无法检测界面语言，使用默认语言: {DEFAULT_LANGUAGE}")
     return DEFAULT_LANGUAGE
 
-def export_telegram_data(client_path, export_base_dir):
-    process = None  # 在函数开始处定义process变量
+def discard_screenshot(screenshot_path):
+    """清理未能移动到导出文件夹的临时截图"""
+    if screenshot_path and os.path.exists(screenshot_path):
+        try:
+            os.remove(screenshot_path)
+            logging.info("已清理临时截图文件")
+        except Exception as e:
+            logging.debug(f"清理临时截图失败: {str(e)}")
+
+@TRACER.traced("close_client")
+def close_client(process, interactive=True):
+    """
+    关闭客户端进程
+    
+    参数:
+        process: PROCESS_TRACKER.spawn返回的进程对象，可为None
+        interactive: 是否同时关闭残留的Telegram进程并整理桌面窗口；
+                     在后台线程中关闭写入完成的客户端时为False，不干扰前台正在操作的客户端
+    """
+    try:
+        # 首先按PID关闭本次启动的客户端进程（含子进程）
+        if process is not None:
+            PROCESS_TRACKER.unprotect(process.pid)
+            try:
+                if PROCESS_TRACKER.terminate(process):
+                    logging.info(f"已关闭客户端进程 PID={process.pid}")
+                else:
+                    logging.warning(f"客户端进程未能退出 PID={process.pid}")
+            except Exception as e:
+                logging.debug(f"关闭客户端进程失败: {str(e)}")
+        
+        if not interactive:
+            return
+        
+        # 再按PID关闭残留的Telegram进程
+        close_telegram_processes()
+        
+        # 无论关闭成功与否，都显示桌面并按Alt+Tab切换窗口焦点
+        try:
+            pyautogui.hotkey('win', 'd')
+            wait_for_settle()
+            pyautogui.hotkey('alt', 'tab')
+            wait_for_settle()
+            pyautogui.hotkey('win', 'd')
+            logging.info("已显示桌面并切换窗口焦点")
+        except Exception as e:
+            logging.debug(f"显示桌面失败: {str(e)}")
+        
+        # 等待桌面画面稳定，确保窗口已关闭
+        wait_for_settle()
+        
+    except Exception as e:
+        logging.debug(f"关闭客户端过程中出现异常: {str(e)}")
+        if interactive:
+            try:
+                pyautogui.hotkey('win', 'd')
+            except:
+                pass
+
+def begin_export(client_path, export_base_dir, watcher):
+    """
+    导出的界面操作阶段：启动客户端、进入导出设置、勾选选项并确认保存
+    
+    确认保存后客户端开始写入文件，界面不再需要输入。
+    
+    参数:
+        client_path: 客户端可执行文件路径
+        export_base_dir: 导出基础目录
+        watcher: ExportFolderWatcher实例
+    
+    返回:
+        (status, pending) - status为True表示已进入写入阶段，pending为交给complete_export的导出信息；
+        status为ExportFailure表示未登录或状态异常，说明失败原因（此时客户端已关闭，pending为None）
+    """
+    process = None
+    entered = False
     try:
         # 首先验证是否为Telegram客户端
         is_telegram, exe_name = is_telegram_exe(client_path)
         if not is_telegram:
             logging.warning(f"不是有效的Telegram客户端: {client_path}")
-            return None
+            return ExportFailure(retry.NOT_TELEGRAM), None
         
-        # 使用subprocess启动客户端
+        # 通过进程跟踪器启动客户端，记录其PID
         logging.info(f"启动客户端: {client_path} ({exe_name})")
-        process = subprocess.Popen([client_path])
-        time.sleep(5)  # 等待客户端启动
+        phase_start = time.monotonic()
+        with TRACER.span("launch"):
+            process = PROCESS_TRACKER.spawn(client_command(client_path))
+            JOURNAL.record(client_path, run_journal.LAUNCHED, pid=process.pid)
+            # 等待客户端主界面出现（汉堡菜单或未登录的开始按钮）
+            start_timeout = HISTORY.timeout(client_path, timing_history.LAUNCH, CLIENT_START_TIMEOUT)
+            ready = wait_for_template(
+                [(lang, name) for lang in SUPPORTED_LANGUAGES
+                 for name in ("hamburger_menu.png", "hamburger_menu_dark.png", "start_messaging_button.png")],
+                start_timeout
+            )
+        if ready:
+            HISTORY.record(client_path, timing_history.LAUNCH, time.monotonic() - phase_start)
+        else:
+            logging.warning(f"等待客户端界面超时({start_timeout:.0f}秒)，继续尝试执行")
+        wait_for_settle()
+        phase_start = time.monotonic()
         
         # 检测界面语言并已经点击了设置菜单
         language = detect_language(client_path)
@@ -340,22 +682,18 @@ def export_telegram_data(client_path, export_base_dir):
         # 在点击设置菜单后进行截图
         settings_screenshot = os.path.join(export_base_dir, f"{client_dir}_settings.png")
         try:
-            pyautogui.screenshot(settings_screenshot)
+            CAPTURE.save(settings_screenshot)
             logging.info(f"已保存设置页面截图: {settings_screenshot}")
         except Exception as e:
             logging.error(f"保存设置页面截图失败: {str(e)}")
             # 即使截图失败也继续执行
-        time.sleep(1)
 
         # 检查是否有"Start Messaging"按钮（未登录状态）
         try:
-            start_messaging = pyautogui.locateOnScreen(
-                os.path.join(SCREENSHOT_DIR, language, "start_messaging_button.png"),
-                confidence=0.7
-            )
+            start_messaging = locate_on_screen("start_messaging_button.png", language, 0.7)
             if start_messaging:
                 logging.warning(f"客户端未登录，跳过处理：{client_path}")
-                return None  # 返回None表示未登录
+                return ExportFailure(retry.NOT_LOGGED_IN), None
         except Exception as e:
             logging.debug(f"检查登录状态异常: {str(e)}")
             # 忽略查找异常，继续执行
@@ -369,18 +707,21 @@ def export_telegram_data(client_path, export_base_dir):
             logging.warning(f"找不到高级选项，可能客户端状态异常: {client_path}")
             # 保存当前屏幕截图以便调试
             debug_screenshot = os.path.join(export_base_dir, f"{client_dir}_debug.png")
-            pyautogui.screenshot(debug_screenshot)
+            CAPTURE.save(debug_screenshot)
             logging.info(f"已保存调试截图: {debug_screenshot}")
-            return None  # 返回None表示状态异常
+            return ExportFailure(retry.ELEMENT_NOT_FOUND, "advanced_tab.png"), None
         
-        time.sleep(1)
+        wait_for_settle()
 
         # 滚动查找导出按钮
         if not scroll_and_find_export(language):
             logging.warning(f"找不到导出按钮，可能客户端状态异常: {client_path}")
-            return None  # 返回None表示状态异常
+            return ExportFailure(retry.ELEMENT_NOT_FOUND, "export_button.png"), None
         
-        time.sleep(1)
+        # 等待导出设置窗口出现
+        wait_for_template([(language, "export_settings_title.png")], MENU_OPEN_TIMEOUT)
+        navigate_seconds = time.monotonic() - phase_start
+        phase_start = time.monotonic()
         
         # 执行选项勾选
         select_export_options(language)
@@ -388,238 +729,377 @@ def export_telegram_data(client_path, export_base_dir):
         # 点击最终保存按钮
         if not find_and_click("save_button.png", timeout=20, language=language):
             logging.warning(f"找不到保存按钮，可能客户端状态异常: {client_path}")
-            return None  # 返回None表示状态异常
+            return ExportFailure(retry.ELEMENT_NOT_FOUND, "save_button.png"), None
         
         # 处理保存路径
-        client_dir = os.path.basename(os.path.dirname(client_path))
         export_path = os.path.join(export_base_dir, client_dir)
         # 不再提前创建文件夹，而是在确认需要复制时再创建
-        # os.makedirs(export_path, exist_ok=True)  # 移除这行
-        time.sleep(2)
+        wait_for_settle()
         
-        # 获取导出前下载文件夹中的文件列表
-        downloads_path = os.path.join(os.path.expanduser("~"), "Downloads", "Telegram Desktop")
-        before_export_folders = []
-        if os.path.exists(downloads_path):
-            before_export_folders = [f for f in os.listdir(downloads_path) if os.path.isdir(os.path.join(downloads_path, f))]
-            logging.info(f"导出前下载文件夹中的文件夹数量: {len(before_export_folders)}")
+        # 记录导出前下载目录中已有的文件夹
+        watcher.snapshot()
         
         # 输入路径并确认 (这里使用默认路径，不再手动指定)
         pyautogui.press('enter')
-        time.sleep(1)
+        write_start = time.monotonic()
+        HISTORY.record(client_path, timing_history.NAVIGATE, navigate_seconds)
+        HISTORY.record(client_path, timing_history.OPTIONS, write_start - phase_start)
         
-        # 添加一个返回值标志，表示是否成功导出
-        export_success = False
+        # 认领本次导出生成的文件夹，多个导出同时写入时按文件夹分别判断完成
+        folder = wait_until(
+            watcher.claim_new_folder,
+            EXPORT_FOLDER_TIMEOUT,
+            poll_backoff=(0.2, 1.5, 1.0),
+            sleep=watcher.wait_for_change
+        )
+        if not folder:
+            logging.info(f"{EXPORT_FOLDER_TIMEOUT}秒内未发现新的导出文件夹，将在导出完成时再识别")
         
+        JOURNAL.record(client_path, run_journal.EXPORTING, export_path=export_path, folder=folder)
+        entered = True
+        return True, {
+            "client_path": client_path,
+            "client_dir": client_dir,
+            "language": language,
+            "process": process,
+            "export_path": export_path,
+            "settings_screenshot": settings_screenshot,
+            "folder": folder,
+            "write_start": write_start,
+        }
+    finally:
+        if not entered:
+            close_client(process)
+
+def relocate_export(pending, source_path):
+    """
+    将下载目录中的导出文件夹移到导出目录，并移入设置页面截图
+    返回: bool - 是否成功
+    """
+    export_path = pending["export_path"]
+    settings_screenshot = pending["settings_screenshot"]
+    client_dir = pending["client_dir"]
+    newest_folder = os.path.basename(source_path)
+    
+    if INCREMENTAL.can_merge(export_path):
+        # 增量模式：保留上次的导出，只合并新消息和新文件
         try:
-            # 等待"Show My Data"按钮出现，表示导出已完成
-            logging.info("等待导出完成，寻找'Show My Data'按钮...")
-            show_data_found = False
-            max_wait_time = 1800  
-            start_time = time.time()
+            result = INCREMENTAL.merge_export(source_path, export_path)
+            logging.info(f"已将导出文件夹 {newest_folder} 合并到 {export_path} "
+                         f"(新消息 {result['new_messages']} 条, 新聊天 {result['new_chats']} 个, "
+                         f"新增文件 {result['added_files']} 个, 跳过已有文件 {result['skipped_files']} 个)")
+        except Exception as e:
+            logging.error(f"合并增量导出失败: {str(e)}")
+            discard_screenshot(settings_screenshot)
+            return False
+    else:
+        # 在确认有源文件夹后，再创建或清理目标文件夹；继续上次中断的转移时保留已转移的文件
+        if os.path.exists(export_path) and not pending.get("resume"):
+            try:
+                shutil.rmtree(export_path)
+                logging.info(f"已删除已存在的目标文件夹: {export_path}")
+            except Exception as e:
+                logging.error(f"删除目标文件夹失败: {str(e)}")
+        
+        # 同一分区直接重命名，跨分区时流式复制并逐个删除源文件
+        try:
+            result = move_tree(source_path, export_path)
+            TRANSFERS.record(client_dir, result)
+            logging.info(f"已将导出文件夹 {newest_folder} 移动到 {export_path} "
+                         f"({'重命名' if result['method'] == 'rename' else '复制'}, {result['files']} 个文件, "
+                         f"{result['bytes'] / 1024 / 1024:.1f} MB, {result['mbps']:.1f} MB/s)")
+        except Exception as e:
+            # 未转移的文件保留在下载目录中，不删除源文件夹
+            logging.error(f"转移导出文件夹失败: {str(e)}")
+            discard_screenshot(settings_screenshot)
+            return False
+        
+        # 增量模式下记录本次完整导出的状态，作为下次合并的基准
+        if INCREMENTAL.enabled:
+            try:
+                INCREMENTAL.write_state(export_path)
+            except Exception as e:
+                logging.error(f"写入导出状态失败: {str(e)}")
+    
+    # 只有在成功转移导出文件夹后，才移动截图到导出文件夹
+    if settings_screenshot and os.path.exists(settings_screenshot):
+        try:
+            final_screenshot_path = os.path.join(export_path, f"{client_dir}_settings.png")
+            shutil.move(settings_screenshot, final_screenshot_path)
+            logging.info(f"已将设置页面截图移动到导出文件夹: {final_screenshot_path}")
+        except Exception as e:
+            logging.error(f"移动截图失败: {str(e)}")
+            # 如果移动失败，不要删除原始截图
+    
+    # 启用去重存储时，将媒体文件替换为指向存储内容的链接
+    if DEDUP_STORE.enabled:
+        try:
+            manifest = DEDUP_STORE.ingest_tree(export_path)
+            logging.info(f"去重完成：{client_dir} 共 {len(manifest['files'])} 个媒体文件")
+        except Exception as e:
+            logging.error(f"去重处理失败，保留完整导出文件: {str(e)}")
+    return True
+
+def finish_relocation(pending, source_path, watcher=None):
+    """
+    后处理任务：转移导出文件夹并生成消息索引，完成后停止跟踪该文件夹
+    
+    pending["relocated"]为True时（继续上次的运行）跳过转移，只生成索引和打包。
+    """
+    client_path = pending["client_path"]
+    stage = "relocate"
+    start = time.monotonic()
+    try:
+        with TRACER.span("relocate", client=os.path.dirname(client_path)):
+            if not pending.get("relocated"):
+                try:
+                    if not relocate_export(pending, source_path):
+                        raise RuntimeError(f"转移导出文件夹失败: {source_path}")
+                finally:
+                    if watcher is not None:
+                        watcher.release(os.path.basename(source_path))
+                JOURNAL.record(client_path, run_journal.RELOCATED)
+                # 继续转移的导出文件夹不属于本轮的下载目录清理范围，转移成功后在这里删除
+                if pending.get("resume"):
+                    remove_download_folder(source_path)
+            stage = "finish"
             
-            while time.time() - start_time < max_wait_time:
+            if INDEX_EXPORTS:
                 try:
-                    # 尝试定位"Show My Data"按钮
-                    location = pyautogui.locateOnScreen(
-                        os.path.join(SCREENSHOT_DIR, language, "show_my_data_button.png"),
-                        confidence=0.7
-                    )
-                    if location:
-                        logging.info("导出完成，已找到'Show My Data'按钮")
-                        show_data_found = True
-                        export_success = True  # 设置成功标志
-                        
-                        # 先关闭导出窗口
-                        if find_and_click("close_button.png", timeout=10, language=language):
-                            logging.info("已关闭导出窗口")
-                        else:
-                            logging.warning("未能找到关闭按钮，尝试继续执行")
-                        
-                        time.sleep(2)  # 等待窗口关闭
-                        break
+                    with TRACER.span("build_index"):
+                        build_index(pending["export_path"])
                 except Exception as e:
-                    logging.debug(f"查找按钮异常: {str(e)}")
-                    pass
-                
-                time.sleep(2)
-            
-            if not show_data_found:
-                logging.warning(f"等待超时，未找到'Show My Data'按钮，可能导出未完成")
-                # 如果导出未完成，清理临时截图
-                if settings_screenshot and os.path.exists(settings_screenshot):
-                    try:
-                        os.remove(settings_screenshot)
-                        logging.info("已清理临时截图文件")
-                    except Exception as e:
-                        logging.debug(f"清理临时截图失败: {str(e)}")
-                return False  # 返回失败标志
+                    raise RuntimeError(f"生成导出索引失败: {str(e)}")
             
-            # 查找导出后新生成的文件夹
-            time.sleep(3)  # 等待文件系统更新
-            if os.path.exists(downloads_path):
-                after_export_folders = [f for f in os.listdir(downloads_path) if os.path.isdir(os.path.join(downloads_path, f))]
-                
-                # 找出新增的文件夹
-                new_folders = [f for f in after_export_folders if f not in before_export_folders]
-                
-                if new_folders:
-                    # 如果有多个新文件夹，选择最新创建的一个
-                    newest_folder = None
-                    newest_time = 0
-                    
-                    for folder in new_folders:
-                        folder_path = os.path.join(downloads_path, folder)
-                        folder_time = os.path.getctime(folder_path)
-                        if folder_time > newest_time:
-                            newest_time = folder_time
-                            newest_folder = folder
-                    
-                    if newest_folder:
-                        source_path = os.path.join(downloads_path, newest_folder)
-                        
-                        # 在确认有源文件夹后，再创建或清理目标文件夹
-                        if os.path.exists(export_path):
-                            try:
-                                shutil.rmtree(export_path)
-                                logging.info(f"已删除已存在的目标文件夹: {export_path}")
-                            except Exception as e:
-                                logging.error(f"删除目标文件夹失败: {str(e)}")
-                        
-                        # 创建父目录（如果不存在）
-                        os.makedirs(os.path.dirname(export_path), exist_ok=True)
-                        
-                        # 直接复制文件夹
-                        try:
-                            shutil.copytree(source_path, export_path)
-                            logging.info(f"已将导出文件夹 {newest_folder} 复制到 {export_path}")
-                            
-                            # 只有在成功复制导出文件夹后，才移动截图到导出文件夹
-                            if settings_screenshot and os.path.exists(settings_screenshot):
-                                try:
-                                    final_screenshot_path = os.path.join(export_path, f"{client_dir}_settings.png")
-                                    shutil.move(settings_screenshot, final_screenshot_path)
-                                    logging.info(f"已将设置页面截图移动到导出文件夹: {final_screenshot_path}")
-                                except Exception as e:
-                                    logging.error(f"移动截图失败: {str(e)}")
-                                    # 如果移动失败，不要删除原始截图
-                        except Exception as e:
-                            logging.error(f"复制文件夹失败: {str(e)}")
-                            # 如果复制失败，清理临时截图
-                            if settings_screenshot and os.path.exists(settings_screenshot):
-                                try:
-                                    os.remove(settings_screenshot)
-                                    logging.info("已清理临时截图文件")
-                                except Exception as e2:
-                                    logging.debug(f"清理临时截图失败: {str(e2)}")
-        
-                # 复制成功后尝试删除源文件夹
+            # 打包在本任务中直接执行，不再提交到后处理队列（避免队列满时任务互相等待）
+            if PACKER.enabled:
                 try:
-                    shutil.rmtree(source_path)
-                    logging.info(f"已删除源文件夹: {source_path}")
-                    # 不在控制台输出删除源文件夹的信息
+                    with TRACER.span("pack"):
+                        PACKER.pack(pending["export_path"])
                 except Exception as e:
-                    logging.warning(f"无法删除源文件夹: {source_path}")
-                    # 不在控制台输出无法删除的信息
+                    raise RuntimeError(f"打包导出目录失败: {str(e)}")
+    except Exception as e:
+        failure = ExportFailure(retry.COPY_FAILED if stage == "relocate" else retry.POSTPROCESS_FAILED, str(e))
+        RETRY.record_failure(client_path, failure)
+        JOURNAL.record(client_path, run_journal.FAILED, stage=stage, reason=failure.reason, detail=failure.detail)
+        raise
+    HISTORY.record(client_path, timing_history.RELOCATE, time.monotonic() - start)
+    JOURNAL.record(client_path, run_journal.DONE)
+
+def resume_relocation(client_info, record):
+    """
+    继续上次运行中导出文件已写完、但未完成转移的客户端，不重新启动客户端
+    
+    参数:
+        client_info: {"path": 可执行文件路径, "root_dir_name": 根目录名称}
+        record: 运行日志中该客户端的记录
+    
+    返回:
+        bool - 是否已提交后处理任务；False表示不是转移阶段中断的客户端，或下载目录中的导出文件夹
+               已不存在，需要重新导出
+    """
+    state = record["state"]
+    stage = record.get("stage")
+    if state not in (run_journal.WRITTEN, run_journal.RELOCATED) and not (
+            state == run_journal.FAILED and stage in ("relocate", "finish")):
+        return False
+    relocated = state == run_journal.RELOCATED or (state == run_journal.FAILED and stage == "finish")
+    source_path = record.get("source_path")
+    if relocated:
+        if not os.path.isdir(record.get("export_path") or ""):
+            return False
+    elif not source_path or not os.path.isdir(source_path):
+        return False
+    pending = {
+        "client_path": client_info["path"],
+        "client_dir": os.path.basename(os.path.dirname(client_info["path"])),
+        "language": None,
+        "process": None,
+        "export_path": record["export_path"],
+        "settings_screenshot": record.get("settings_screenshot"),
+        "folder": os.path.basename(source_path) if source_path else None,
+        "resume": True,
+        "relocated": relocated,
+    }
+    logging.info(f"继续上次未完成的{'索引和打包' if relocated else '转移'}: {pending['client_dir']}")
+    POSTPROCESS.submit(pending["client_dir"], "relocate", finish_relocation, pending, source_path)
+    return True
+
+def export_progress(watcher, folder):
+    """
+    返回导出文件夹当前的签名（文件数量、总大小、最新修改时间），用于判断超时时导出是否仍在写入
+    folder为None时取最新出现的未认领文件夹；文件夹不存在时返回None
+    """
+    if not folder:
+        folders = watcher.new_folders()
+        if not folders:
+            return None
+        folder = folders[0]
+    path = os.path.join(watcher.downloads_path, folder)
+    if not os.path.isdir(path):
+        return None
+    return folder_signature(path)
+
+def complete_export(pending, watcher, interactive=True):
+    """
+    导出的写入阶段：等待导出文件夹写入完成，关闭客户端并将导出文件的转移交给后处理队列
+    
+    参数:
+        pending: begin_export返回的导出信息
+        watcher: ExportFolderWatcher实例
+        interactive: 为True时同时检查界面上的'Show My Data'按钮并关闭导出窗口；
+                     为False时只根据导出文件夹判断完成，不操作界面，可在后台线程中运行
+    
+    返回:
+        True表示成功；失败时返回ExportFailure（导出超时、找不到导出文件夹或处理异常）
+    """
+    language = pending["language"]
+    folder = pending["folder"]
+    settings_screenshot = pending["settings_screenshot"]
+    handed_off = False
+    try:
+        # 等待导出完成：以导出文件夹在下载目录中写入完成为准，"Show My Data"按钮作为辅助判断
+        if interactive:
+            logging.info("等待导出完成，监视下载目录并寻找'Show My Data'按钮...")
+        else:
+            logging.info(f"等待导出完成，监视导出文件夹: {folder}")
+        # 按该客户端以往的写入耗时和导出大小决定超时，没有记录时使用默认值；重试轮次中按RETRY放宽
+        max_wait_time = min(EXPORT_WAIT_MAX, RETRY.timeout(
+            HISTORY.timeout(pending["client_path"], timing_history.WRITE, EXPORT_WAIT_TIMEOUT,
+                            maximum=EXPORT_WAIT_MAX)))
+        
+        # 画面检查每2秒最多一次，画面没有变化时跳过模板匹配
+        change_gate = FrameChangeDetector()
+        last_ui_check = [0.0]
+        ui_confirmed = [False]
+        
+        def export_finished():
+            # 结果文件已收尾且文件夹短暂保持不变即视为完成；前台等待时界面上出现'Show My Data'按钮
+            # 且结果文件已收尾则立即完成
+            source = watcher.completed_folder(folder)
+            if source:
+                return "folder", source
+            if interactive and not ui_confirmed[0] and time.monotonic() - last_ui_check[0] >= UI_CHECK_INTERVAL:
+                last_ui_check[0] = time.monotonic()
+                if locate_on_screen("show_my_data_button.png", language, 0.7, gate=change_gate, search_scales=False):
+                    logging.info("已找到'Show My Data'按钮")
+                    ui_confirmed[0] = True
+            if ui_confirmed[0]:
+                source = watcher.results_ready(folder)
+                if source:
+                    return "ui", source
+            return None
+        
+        # 目录变更通知句柄只在前台线程中使用，后台等待退回定时轮询
+        with TRACER.span("wait_export", client=os.path.dirname(pending["client_path"])):
+            wait_time = max_wait_time
+            signature = None
+            while True:
+                finished = wait_until(
+                    export_finished,
+                    wait_time,
+                    poll_backoff=(0.5, 1.5, 2.0),
+                    sleep=watcher.wait_for_change if interactive else time.sleep
+                )
+                if finished:
+                    break
+                # 超时时导出文件夹仍在增长，说明只是比以往写得慢，延长等待直到上限
+                previous, signature = signature, export_progress(watcher, folder)
+                waited = time.monotonic() - pending["write_start"]
+                if signature is None or signature == previous or waited >= EXPORT_WAIT_MAX:
+                    break
+                wait_time = min(EXPORT_GROWTH_WINDOW, EXPORT_WAIT_MAX - waited)
+                logging.info(f"导出文件夹仍在写入（{signature[0]} 个文件, {signature[1] / 1024 / 1024:.1f} MB），"
+                             f"延长等待 {wait_time:.0f} 秒")
+        if interactive:
+            logging.info(f"等待导出期间共检查画面 {change_gate.checks} 次，"
+                         f"因画面无变化跳过匹配 {change_gate.skipped} 次")
+        
+        if not finished:
+            # 记为写入耗时的下限，下次按更长的超时等待
+            waited = time.monotonic() - pending["write_start"]
+            logging.warning(f"等待 {waited:.0f} 秒后超时，导出文件夹 {folder or '(未识别)'} 未完成写入"
+                            "且未找到'Show My Data'按钮，可能导出未完成")
+            HISTORY.record(pending["client_path"], timing_history.WRITE, waited,
+                           signature[1] if signature else None, lower_bound=True)
+            # 如果导出未完成，清理临时截图
+            discard_screenshot(settings_screenshot)
+            return ExportFailure(retry.EXPORT_TIMEOUT, f"等待 {waited:.0f} 秒后导出仍未完成")
+        
+        finished_by, source_path = finished
+        if finished_by == "folder":
+            logging.info(f"导出完成，导出文件夹已写入: {source_path}")
+        else:
+            logging.info(f"导出完成，已找到'Show My Data'按钮且结果文件已写完: {source_path}")
+        
+        if interactive:
+            # 先关闭导出窗口
+            if find_and_click("close_button.png", timeout=10, language=language):
+                logging.info("已关闭导出窗口")
             else:
-                logging.warning(f"下载路径不存在: {downloads_path}")
-                # 如果下载路径不存在，清理临时截图
-                if settings_screenshot and os.path.exists(settings_screenshot):
-                    try:
-                        os.remove(settings_screenshot)
-                        logging.info("已清理临时截图文件")
-                    except Exception as e:
-                        logging.debug(f"清理临时截图失败: {str(e)}")
+                logging.warning("未能找到关闭按钮，尝试继续执行")
             
-            logging.info(f"导出完成：{client_dir}")
-            return export_success  # 返回成功标志
-            
-        except Exception as e:
-            # 如果处理失败，清理临时截图
-            if settings_screenshot and os.path.exists(settings_screenshot):
-                try:
-                    os.remove(settings_screenshot)
-                    logging.info("已清理临时截图文件")
-                except Exception as e2:
-                    logging.debug(f"清理临时截图失败: {str(e2)}")
-            logging.error(f"处理失败：{client_path} - {str(e)}")
-            return False  # 异常情况返回失败
+            wait_for_settle()  # 等待窗口关闭
+        
+        HISTORY.record(pending["client_path"], timing_history.WRITE, time.monotonic() - pending["write_start"],
+                       folder_signature(source_path)[1])
+        
+        # 导出文件已写完，先关闭客户端，释放对导出文件的占用
+        close_client(pending["process"], interactive)
+        pending["process"] = None
+        
+        # 转移导出文件交给后台队列，当前线程继续处理下一个客户端
+        JOURNAL.record(pending["client_path"], run_journal.WRITTEN, source_path=source_path,
+                       export_path=pending["export_path"], settings_screenshot=settings_screenshot)
+        POSTPROCESS.submit(pending["client_dir"], "relocate", finish_relocation, pending, source_path, watcher)
+        handed_off = True
+        
+        logging.info(f"导出完成：{pending['client_dir']}")
+        return True  # 返回成功标志
+        
+    except Exception as e:
+        # 如果处理失败，清理临时截图
+        discard_screenshot(settings_screenshot)
+        logging.error(f"处理失败：{pending['client_path']} - {str(e)}")
+        return ExportFailure(retry.ERROR, str(e))
     finally:
-        try:
-            # 尝试多种方式关闭应用
-            close_success = False
-            
-            # 首先尝试使用process.terminate()关闭
-            if process is not None:
-                try:
-                    process.terminate()
-                    time.sleep(2)
-                    logging.info("已尝试通过process.terminate()关闭客户端")
-                except Exception as e:
-                    logging.debug(f"process.terminate()关闭失败: {str(e)}")
-            
-            # 使用新的进程关闭函数
-            telegram_processes = find_telegram_processes()
-            if telegram_processes:
-                for exe_name in telegram_processes:
-                    try:
-                        # 首先尝试正常关闭
-                        subprocess.run(f"taskkill /IM {exe_name} /T", 
-                                    shell=True, 
-                                    stdout=subprocess.PIPE, 
-                                    stderr=subprocess.PIPE)
-                        logging.info(f"已尝试关闭进程: {exe_name}")
-                        
-                        # 如果正常关闭失败，使用强制关闭
-                        subprocess.run(f"taskkill /F /IM {exe_name} /T", 
-                                    shell=True, 
-                                    stdout=subprocess.PIPE, 
-                                    stderr=subprocess.PIPE)
-                        logging.info(f"已强制关闭进程: {exe_name}")
-                    except Exception as e:
-                        logging.error(f"关闭进程失败 {exe_name}: {str(e)}")
-            
-            # 最后验证是否所有进程都已关闭
-            remaining_processes = find_telegram_processes()
-            if remaining_processes:
-                logging.warning(f"以下进程仍在运行: {', '.join(remaining_processes)}")
-                # 最后的强制关闭尝试
-                for exe_name in remaining_processes:
-                    try:
-                        subprocess.run(f"taskkill /F /IM {exe_name}", 
-                                    shell=True, 
-                                    stdout=subprocess.PIPE, 
-                                    stderr=subprocess.PIPE)
-                    except Exception as e:
-                        logging.error(f"最终强制关闭失败 {exe_name}: {str(e)}")
-            
-            # 无论关闭成功与否，都显示桌面并按Alt+Tab切换窗口焦点
-            try:
-                pyautogui.hotkey('win', 'd')
-                time.sleep(1)
-                pyautogui.hotkey('alt', 'tab')
-                time.sleep(0.5)
-                pyautogui.hotkey('win', 'd')
-                logging.info("已显示桌面并切换窗口焦点")
-            except Exception as e:
-                logging.debug(f"显示桌面失败: {str(e)}")
-            
-            # 等待一段时间确保资源释放
-            time.sleep(2)
-            
-        except Exception as e:
-            logging.debug(f"关闭客户端过程中出现异常: {str(e)}")
-            try:
-                pyautogui.hotkey('win', 'd')
-            except:
-                pass
+        if folder and not handed_off:
+            watcher.release(folder)
+        if pending["process"] is not None:
+            close_client(pending["process"], interactive)
+
+def export_telegram_data(client_path, export_base_dir, watcher=None):
+    """
+    导出单个客户端的数据
+    
+    参数:
+        client_path: 客户端可执行文件路径
+        export_base_dir: 导出基础目录
+        watcher: 可选的ExportFolderWatcher，用于在多个客户端之间汇总新生成的文件夹
+    
+    返回:
+        True表示成功；失败时返回ExportFailure，其reason说明失败原因（见retry.py），布尔值为False
+    """
+    own_watcher = watcher is None
+    if own_watcher:
+        watcher = ExportFolderWatcher(DOWNLOADS_PATH, EXPORT_QUIET_SECONDS, EXPORT_SETTLE_SECONDS)
+    try:
+        with TRACER.span("export_client", client=os.path.dirname(client_path)):
+            status, pending = begin_export(client_path, export_base_dir, watcher)
+            if status is not True:
+                return status
+            return complete_export(pending, watcher)
+    finally:
+        if own_watcher:
+            watcher.close()
 
 # 添加支持多语言的滚动查找函数
+@TRACER.traced("scroll_and_find_export")
 def scroll_and_find_export(language="en"):
     """滚动屏幕并查找导出按钮，支持多语言"""
     for _ in range(SCROLL_ATTEMPTS):
         pyautogui.scroll(SCROLL_DISTANCE)
-        time.sleep(0.8)
+        wait_for_settle()
         if find_and_click("export_button.png", timeout=2, language=language):
             return True
     return False
@@ -629,72 +1109,310 @@ def is_telegram_exe(exe_path):
     检查可执行文件是否为Telegram客户端
     返回: (bool, str) - (是否为Telegram客户端, 可执行文件名)
     """
-    try:
-        # 获取文件版本信息
-        info = win32api.GetFileVersionInfo(exe_path, "\\")
-        ms = info['FileVersionMS']
-        ls = info['FileVersionLS']
-        version = f"{win32api.HIWORD(ms)}.{win32api.LOWORD(ms)}.{win32api.HIWORD(ls)}.{win32api.LOWORD(ls)}"
-        
-        # 获取文件属性信息
-        lang, codepage = win32api.GetFileVersionInfo(exe_path, '\\VarFileInfo\\Translation')[0]
-        str_info_path = f'\\StringFileInfo\\{lang:04x}{codepage:04x}\\'
-        
-        # 获取文件说明和产品名称
-        file_description = win32api.GetFileVersionInfo(exe_path, str_info_path + 'FileDescription')
-        product_name = win32api.GetFileVersionInfo(exe_path, str_info_path + 'ProductName')
-        
-        # 检查是否为Telegram Desktop
-        is_telegram = (
-            'Telegram' in file_description and 'Desktop' in file_description
-        ) or (
-            'Telegram' in product_name and 'Desktop' in product_name
-        )
-        
-        if is_telegram:
-            exe_name = os.path.basename(exe_path)
-            logging.info(f"找到Telegram客户端: {exe_name} (版本: {version})")
-            return True, exe_name
-        return False, None
-        
-    except Exception as e:
-        logging.debug(f"读取文件属性失败: {exe_path} - {str(e)}")
-        return False, None
+    verdict = CLIENT_INDEX.inspect(exe_path)
+    if verdict["is_telegram"]:
+        logging.info(f"找到Telegram客户端: {verdict['exe_name']} (版本: {verdict['version']})")
+        return True, verdict["exe_name"]
+    return False, None
+
+def client_command(client_path):
+    """返回启动客户端的命令行，非Windows平台通过wine运行"""
+    if sys.platform != "win32":
+        return ["wine", client_path]
+    return [client_path]
 
 def find_telegram_processes():
     """
-    查找所有正在运行的Telegram客户端进程
-    返回: list of str - 进程名称列表
+    查找所有正在运行的Telegram客户端进程（包括本程序启动的进程及其子进程）
+    返回: list of ProcessInfo - (pid, ppid, exe_path)
     """
-    telegram_processes = set()
     try:
-        # 使用wmic命令获取所有进程的详细信息
-        cmd = 'wmic process get ExecutablePath,ProcessId /format:csv'
-        result = subprocess.run(cmd, 
-                              shell=True, 
-                              stdout=subprocess.PIPE, 
-                              stderr=subprocess.PIPE,
-                              text=True)
-        
-        if result.returncode == 0:
-            lines = result.stdout.strip().split('\n')
-            for line in lines[1:]:  # 跳过标题行
-                if line.strip():
-                    parts = line.split(',')
-                    if len(parts) >= 2 and parts[1].strip():  # 确保有可执行文件路径
-                        exe_path = parts[1].strip()
-                        if exe_path and os.path.exists(exe_path):
-                            is_telegram, exe_name = is_telegram_exe(exe_path)
-                            if is_telegram and exe_name:
-                                telegram_processes.add(exe_name)
-        
-        return list(telegram_processes)
+        return PROCESS_TRACKER.find_targets()
     except Exception as e:
         logging.error(f"查找Telegram进程失败: {str(e)}")
         return []
 
+def describe_processes(processes):
+    """将进程列表格式化为便于记录日志的字符串"""
+    return ', '.join(f"{os.path.basename(p.exe_path or '?')}(PID {p.pid})" for p in processes)
+
+def format_duration(seconds):
+    """将秒数格式化为便于阅读的时长"""
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f} 小时"
+    if seconds >= 60:
+        return f"{seconds / 60:.0f} 分钟"
+    return f"{seconds:.0f} 秒"
+
+def report_progress(callback, idx, total, exe_path, remaining=None, concurrency=1):
+    """
+    汇报处理进度，callback为GUI对象的方法时同时发送进度信号
+    
+    remaining为尚未完成的客户端路径列表时，按耗时记录附带预计剩余时间。
+    """
+    # 更新进度信息 - 这里需要发送进度信号
+    if hasattr(callback, '__self__') and hasattr(callback.__self__, 'signals'):
+        # 如果callback是GUI对象的方法，尝试发送进度信号
+        try:
+            callback.__self__.signals.update_progress.emit(idx, total)
+        except Exception as e:
+            logging.debug(f"发送进度信号失败: {str(e)}")
+    
+    progress = f"处理进度：{idx}/{total}"
+    eta = HISTORY.estimate_remaining(remaining, concurrency) if remaining else None
+    if eta is not None:
+        progress += f"，预计剩余 {format_duration(eta)}"
+    if callback:
+        callback(f"{progress}\n正在处理：{os.path.dirname(exe_path)}")
+    logging.info(progress)
+    logging.info(f"正在处理：{os.path.dirname(exe_path)}")
+
+def report_client_result(client_info, export_success, callback=None):
+    """
+    汇报单个客户端的导出结果
+    
+    参数:
+        client_info: {"path": 可执行文件路径, "root_dir_name": 客户端根目录名称}
+        export_success: export_telegram_data的返回值，或导出过程中抛出的异常
+        callback: 可选的回调函数
+    
+    返回:
+        (bool, str) - (是否成功, 成功时为"根目录/客户端目录"，失败时为客户端完整路径)
+    """
+    exe_path = client_info["path"]
+    root_dir_name = client_info["root_dir_name"]
+    client_dir = os.path.basename(os.path.dirname(exe_path))
+    
+    # 根据export_telegram_data的返回值判断是否成功
+    if isinstance(export_success, Exception):
+        failure = ExportFailure(retry.ERROR, str(export_success))
+        message = f"错误：客户端 {client_dir} (根目录: {root_dir_name}) 导出失败 - {str(export_success)}"
+        level = logging.ERROR
+    elif isinstance(export_success, ExportFailure):
+        failure = export_success
+        message = f"警告：客户端 {client_dir} (根目录: {root_dir_name}) 未成功导出数据 ({str(failure)})"
+        level = logging.WARNING
+    else:
+        message = f"客户端 {client_dir} (根目录: {root_dir_name}) 数据导出成功"
+        if callback:
+            callback(message)
+        logging.info(message)
+        return True, f"{root_dir_name}/{client_dir}"  # 添加到成功列表，包含根目录信息
+    
+    if callback:
+        callback(message)
+    logging.log(level, message)
+    # 记录失败原因，由重试调度决定是否在本轮结束后重新处理
+    RETRY.record_failure(exe_path, failure)
+    JOURNAL.record(exe_path, run_journal.FAILED, stage="export", reason=failure.reason, detail=failure.detail)
+    return False, os.path.dirname(exe_path)  # 保存完整路径
+
+def export_client(client_info, export_dir, watcher=None, callback=None):
+    """
+    导出单个客户端并汇报结果
+    
+    参数:
+        client_info: {"path": 可执行文件路径, "root_dir_name": 客户端根目录名称}
+        export_dir: 导出目录
+        watcher: ExportFolderWatcher实例
+        callback: 可选的回调函数
+    
+    返回:
+        (bool, str) - 见report_client_result
+    """
+    # 创建按照新结构的导出目录：导出目录-客户端根目录文件夹名-客户端文件夹名
+    client_export_dir = os.path.join(export_dir, client_info["root_dir_name"])
+    
+    try:
+        # 执行导出并获取是否成功的返回值
+        export_success = export_telegram_data(client_info["path"], client_export_dir, watcher=watcher)
+    except Exception as e:
+        export_success = e
+    return report_client_result(client_info, export_success, callback)
+
+def export_clients_pipelined(clients, export_dir, watcher, callback=None, depth=PIPELINE_DEPTH):
+    """
+    以流水线方式导出多个客户端
+    
+    客户端确认保存、开始写入文件后界面不再需要输入：将其窗口最小化，在后台线程中按导出文件夹
+    等待写入完成并转移文件，同时启动并操作下一个客户端。同时处于写入阶段的客户端最多depth个。
+    
+    参数:
+        clients: [{"path": 可执行文件路径, "root_dir_name": 根目录名称}]
+        export_dir: 导出目录
+        watcher: ExportFolderWatcher实例
+        callback: 可选的回调函数
+        depth: 同时写入的客户端数量上限
+    
+    返回:
+        list of (bool, str) - 与clients顺序一致，见report_client_result
+    """
+    results = [None] * len(clients)
+    writing = {}  # Future -> 客户端序号
+    
+    def collect(futures):
+        for future in futures:
+            idx = writing.pop(future)
+            try:
+                export_success = future.result()
+            except Exception as e:
+                export_success = e
+            results[idx] = report_client_result(clients[idx], export_success, callback)
+    
+    with ThreadPoolExecutor(max_workers=depth, thread_name_prefix="export-writer") as pool:
+        for idx, client_info in enumerate(clients):
+            # 写入中的客户端达到上限时，等待其中一个完成
+            if len(writing) >= depth:
+                done, _ = futures_wait(writing, return_when=FIRST_COMPLETED)
+                collect(done)
+            
+            report_progress(callback, idx + 1, len(clients), client_info["path"],
+                            [c["path"] for c in clients[idx:]])
+            client_export_dir = os.path.join(export_dir, client_info["root_dir_name"])
+            try:
+                with TRACER.span("begin_export", client=os.path.dirname(client_info["path"])):
+                    status, pending = begin_export(client_info["path"], client_export_dir, watcher)
+                if status is not True:
+                    results[idx] = report_client_result(client_info, status, callback)
+                elif not pending["folder"]:
+                    # 无法区分本次导出的文件夹，按原流程在前台等待完成
+                    results[idx] = report_client_result(client_info, complete_export(pending, watcher), callback)
+                else:
+                    # 写入期间不关闭该客户端，最小化窗口后交给后台线程
+                    PROCESS_TRACKER.protect(pending["process"].pid)
+                    pyautogui.hotkey('win', 'd')
+                    writing[pool.submit(complete_export, pending, watcher, False)] = idx
+            except Exception as e:
+                results[idx] = report_client_result(client_info, e, callback)
+            
+            # 每个客户端处理完后保存区域提示、缩放比例和耗时记录，中途退出也不会丢失
+            ROI_HINTS.save()
+            SCALE_HINTS.save()
+            HISTORY.save()
+            
+            # 等待桌面画面稳定后再处理下一个客户端
+            wait_for_settle(timeout=5)
+        
+        collect(list(writing))
+    
+    return results
+
+def remove_download_folder(folder_path):
+    """后处理任务：删除下载目录中的导出文件夹"""
+    if os.path.exists(folder_path):
+        shutil.rmtree(folder_path)
+        logging.info(f"已删除导出文件夹: {folder_path}")
+
+def pending_relocation_folders():
+    """
+    转移失败、导出文件仍留在下载目录中的客户端
+    返回: {导出文件夹路径: 客户端路径}
+    """
+    states = JOURNAL.states()
+    folders = {}
+    for client_path, failure in RETRY.failures().items():
+        source_path = states.get(client_path, {}).get("source_path")
+        if failure.relocation and source_path:
+            folders[source_path] = client_path
+    return folders
+
+def cleanup_download_folders(watcher):
+    """
+    删除导出过程中在下载目录生成的文件夹
+    
+    先等待所有转移任务完成，再将删除任务交给后处理队列并等待队列清空。
+    转移失败的客户端的导出文件夹保留在下载目录中，重试轮次（或 --resume）直接从这里继续转移，
+    转移成功后由finish_relocation删除。
+    """
+    POSTPROCESS.drain()
+    kept = {os.path.basename(path): client_path for path, client_path in pending_relocation_folders().items()}
+    if os.path.exists(watcher.downloads_path):
+        for folder in sorted(watcher.created):
+            folder_path = os.path.join(watcher.downloads_path, folder)
+            if not os.path.exists(folder_path):
+                continue
+            if folder in kept:
+                logging.info(f"保留转移失败的导出文件夹，稍后继续转移: {folder_path} "
+                             f"(客户端 {os.path.basename(os.path.dirname(kept[folder]))})")
+                continue
+            POSTPROCESS.submit(folder, "cleanup", remove_download_folder, folder_path)
+    POSTPROCESS.drain()
+
+def export_pass(clients, export_dir, callback=None, workers=1, pipeline_depth=PIPELINE_DEPTH):
+    """
+    导出一批客户端（首轮和每轮重试共用），失败原因记录在RETRY中
+    
+    返回:
+        dict - 并行导出时为run_parallel的结果（统计来自各工作进程）；逐个导出时为None
+    """
+    if workers > 1 and clients:
+        if parallel_supported():
+            # 多个工作进程各自在独立的显示会话中并行导出
+            started = []
+            def on_start(idx, client_info):
+                started.append(idx)
+                report_progress(callback, len(started), len(clients), client_info["path"],
+                                [c["path"] for c in clients[len(started) - 1:]], workers)
+            try:
+                result = run_parallel(clients, export_dir, workers, callback=callback, on_start=on_start,
+                                      dedup_root=DEDUP_STORE.root, incremental=INCREMENTAL.enabled,
+                                      pack={"remove_source": PACKER.remove_source, "segment_size": PACKER.segment_size}
+                                           if PACKER.enabled else None,
+                                      journal=(JOURNAL.path, JOURNAL.run_id), attempt=RETRY.attempt,
+                                      trace=(TRACER.path, TRACER.format) if TRACER.path else None)
+                RETRY.merge(result["failures"])
+                ROI_HINTS.merge(result["hints"])
+                ROI_HINTS.save()
+                SCALE_HINTS.merge(result["scales"])
+                SCALE_HINTS.save()
+                HISTORY.merge(result["timings"])
+                HISTORY.save()
+                for summary in result["trace"]:
+                    TRACER.merge(summary)
+                return result
+            except Exception as e:
+                message = f"并行导出启动失败，改为逐个导出: {str(e)}"
+                if callback:
+                    callback(message)
+                logging.error(message)
+        else:
+            message = "当前环境不支持独立显示会话（需要Linux和Xvfb），改为逐个导出"
+            if callback:
+                callback(message)
+            logging.warning(message)
+    
+    # 监视下载目录，记录所有导出过程中新生成的文件夹
+    watcher = ExportFolderWatcher(DOWNLOADS_PATH, EXPORT_QUIET_SECONDS, EXPORT_SETTLE_SECONDS)
+    
+    if pipeline_depth > 1:
+        # 流水线：前一个客户端写入文件期间，启动并操作下一个客户端
+        export_clients_pipelined(clients, export_dir, watcher, callback, pipeline_depth)
+    else:
+        # 批量处理
+        for idx, client_info in enumerate(clients, 1):
+            report_progress(callback, idx, len(clients), client_info["path"],
+                            [c["path"] for c in clients[idx - 1:]])
+            
+            export_client(client_info, export_dir, watcher, callback)
+            
+            # 每个客户端处理完后保存区域提示、缩放比例和耗时记录，中途退出也不会丢失
+            ROI_HINTS.save()
+            SCALE_HINTS.save()
+            HISTORY.save()
+            
+            # 等待桌面画面稳定后再处理下一个客户端
+            wait_for_settle(timeout=5)
+    
+    watcher.close()
+    
+    # 所有处理完成后，只删除导出过程中生成的文件夹
+    cleanup_download_folders(watcher)
+    return None
+
 # 添加一个新函数，用于GUI程序调用
-def run_export(source_dirs, export_dir, callback=None):
+def run_export(source_dirs, export_dir, callback=None, workers=1, pipeline_depth=PIPELINE_DEPTH,
+               dedup=DEDUP_EXPORTS, incremental=INCREMENTAL_EXPORTS, pack=PACK_EXPORTS, resume=False,
+               attempts=RETRY_MAX_ATTEMPTS):
     """
     执行Telegram数据导出的主要功能，适用于GUI程序调用
     
@@ -702,10 +1420,27 @@ def run_export(source_dirs, export_dir, callback=None):
         source_dirs: 客户端根目录列表，支持多个目录
         export_dir: 导出目录
         callback: 可选的回调函数，用于更新GUI进度
+        workers: 并行导出的工作进程数，大于1时每个工作进程使用独立的显示会话（仅Linux + Xvfb）
+        pipeline_depth: 逐个导出时同时写入的客户端数量上限，大于1时以流水线方式导出
+        dedup: 是否启用去重存储（存储目录为 导出目录/DEDUP_STORE_DIR）
+        incremental: 是否启用增量模式（合并到已有导出目录，而不是删除后重新导出）
+        pack: 是否在转移完成后打包每个客户端的导出目录
+        resume: 是否继续上次中断的运行（按 导出目录/run_journal.jsonl 跳过已完成的客户端）
+        attempts: 每个客户端最多处理的轮数（含首轮），1表示失败后不重试
     
     返回:
         dict: 包含导出结果的字典，包括成功列表、失败列表等
     """
+    # 重置模板缓存统计，检查截图时会重新预加载所有模板
+    TEMPLATES.reset_stats()
+    ROI_HINTS.reset_stats()
+    SCALE_HINTS.reset_stats()
+    TRANSFERS.reset_stats()
+    POSTPROCESS.reset_stats()
+    HISTORY.reset_stats()
+    TRACER.reset_stats()
+    CAPTURE.reset_stats()
+    
     try:
         # 检查所有支持语言的截图目录
         for language in SUPPORTED_LANGUAGES:
@@ -728,127 +1463,205 @@ def run_export(source_dirs, export_dir, callback=None):
     # 创建导出目录
     os.makedirs(export_dir, exist_ok=True)
     
+    # 去重存储位于导出目录下
+    DEDUP_STORE.reset_stats()
+    DEDUP_STORE.configure(os.path.join(export_dir, DEDUP_STORE_DIR) if dedup else None)
+    INCREMENTAL.reset_stats()
+    INCREMENTAL.configure(incremental)
+    # 增量模式需要保留上次的导出文件，此时不删除打包的源文件
+    PACKER.reset_stats()
+    PACKER.configure(pack, PACK_REMOVE_SOURCE and not incremental)
+    
+    RETRY.reset_stats()
+    RETRY.configure(attempts)
+    
+    # 开始或继续运行日志
+    journal_states = JOURNAL.start(export_dir, resume)
+    
+    # 追踪文件按运行编号命名，继续上次的运行时追加到同一个文件
+    if TRACE_EXPORTS:
+        extension = ".json" if TRACE_FORMAT == tracing.CHROME else ".jsonl"
+        TRACER.configure(os.path.join(export_dir, f"trace_{JOURNAL.run_id}{extension}"), TRACE_FORMAT)
+    else:
+        TRACER.configure(None)
+    
     # 将单个目录转换为列表以统一处理
     if isinstance(source_dirs, str):
         source_dirs = [source_dirs]
     
-    # 查找所有客户端
-    clients = []
-    for source_dir in source_dirs:
-        source_dir_name = os.path.basename(source_dir)
-        for root, dirs, files in os.walk(source_dir):
-            for file in files:
-                if file.lower().endswith('.exe'):
-                    exe_path = os.path.join(root, file)
-                    is_telegram, _ = is_telegram_exe(exe_path)
-                    if is_telegram:
-                        clients.append({
-                            "path": exe_path,
-                            "root_dir_name": source_dir_name
-                        })
+    # 并行查找所有客户端，未变化的可执行文件直接使用索引中的识别结果
+    CLIENT_INDEX.reset_stats()
+    clients = discover_clients(source_dirs, CLIENT_INDEX)
+    CLIENT_INDEX.save()
     
     if callback:
         callback(f"找到 {len(clients)} 个客户端")
     logging.info(f"找到 {len(clients)} 个客户端")
     
-    # 记录所有导出的文件夹名称
-    exported_folders = []
-    
     # 记录处理失败的客户端
     failed_clients = []
     
     # 记录成功导出的客户端
     success_clients = []
     
-    # 批量处理
-    for idx, client_info in enumerate(clients, 1):
-        exe_path = client_info["path"]
-        root_dir_name = client_info["root_dir_name"]
-        
-        # 更新进度信息 - 这里需要发送进度信号
-        if hasattr(callback, '__self__') and hasattr(callback.__self__, 'signals'):
-            # 如果callback是GUI对象的方法，尝试发送进度信号
-            try:
-                callback.__self__.signals.update_progress.emit(idx, len(clients))
-            except Exception as e:
-                logging.debug(f"发送进度信号失败: {str(e)}")
-        
+    # 继续上次的运行：跳过已完成的客户端，导出文件已写完的直接继续转移，其余重新导出
+    all_clients = clients
+    clients = []
+    resumed = 0
+    for client_info in all_clients:
+        record = journal_states.get(client_info["path"])
+        if record and record["state"] == run_journal.DONE:
+            continue
+        if record and resume_relocation(client_info, record):
+            resumed += 1
+            continue
+        JOURNAL.record(client_info["path"], run_journal.DISCOVERED, root_dir_name=client_info["root_dir_name"])
+        clients.append(client_info)
+    if resume:
+        message = (f"继续上次的运行：跳过已完成的 {len(all_clients) - len(clients) - resumed} 个客户端，"
+                   f"继续转移 {resumed} 个，待导出 {len(clients)} 个")
         if callback:
-            callback(f"处理进度：{idx}/{len(clients)}\n正在处理：{os.path.dirname(exe_path)}")
-        logging.info(f"处理进度：{idx}/{len(clients)}")
-        logging.info(f"正在处理：{os.path.dirname(exe_path)}")
-        
-        # 获取导出前的文件夹列表
-        downloads_path = os.path.join(os.path.expanduser("~"), "Downloads", "Telegram Desktop")
-        before_folders = set()
-        if os.path.exists(downloads_path):
-            before_folders = set(f for f in os.listdir(downloads_path) if os.path.isdir(os.path.join(downloads_path, f)))
-        
-        # 执行导出并获取结果
-        client_dir = os.path.basename(os.path.dirname(exe_path))
-        
-        # 创建按照新结构的导出目录：导出目录-客户端根目录文件夹名-客户端文件夹名
-        client_export_dir = os.path.join(export_dir, root_dir_name)
+            callback(message)
+        logging.info(message)
+    
+    # 按耗时记录估计本次运行所需时间
+    estimate = HISTORY.estimate_remaining([c["path"] for c in clients], workers)
+    if estimate is not None:
+        message = f"根据以往的耗时记录，预计需要 {format_duration(estimate)}"
+        if callback:
+            callback(message)
+        logging.info(message)
+    
+    # 首轮导出，结束后按失败原因重试可重试的客户端（每轮之间按退避间隔等待）
+    passes = [export_pass(clients, export_dir, callback, workers, pipeline_depth)]
+    # 等待继续转移的任务完成（逐个导出时已在清理下载目录前完成）
+    POSTPROCESS.drain()
+    
+    while True:
+        retry_clients = RETRY.take_retryable()
+        if not retry_clients:
+            break
+        delay = RETRY.delay()
+        message = f"第 {RETRY.attempt} 轮：{delay:.0f} 秒后重试 {len(retry_clients)} 个客户端"
+        if callback:
+            callback(message)
+        logging.info(message)
+        time.sleep(delay)
         
+        # 转移失败的客户端直接从下载目录中的导出文件夹继续转移，其余重新导出
+        states = JOURNAL.states()
+        batch = []
+        for client_info in all_clients:
+            failure = retry_clients.get(client_info["path"])
+            if failure is None:
+                continue
+            record = states.get(client_info["path"])
+            if failure.relocation and record and resume_relocation(client_info, record):
+                continue
+            batch.append(client_info)
+        passes.append(export_pass(batch, export_dir, callback, workers, pipeline_depth))
+        POSTPROCESS.drain()
+    
+    # 保存后台转移任务中记录的耗时
+    HISTORY.save()
+    
+    # 重试轮数用完后仍未转移的导出文件夹保留在下载目录中，可用 --resume 继续转移
+    for source_path, client_path in pending_relocation_folders().items():
+        if os.path.isdir(source_path):
+            logging.warning(f"客户端 {os.path.basename(os.path.dirname(client_path))} 的导出文件夹未能转移，"
+                            f"已保留在下载目录中（可用 --resume 继续转移）: {source_path}")
+    
+    # 按最终的失败记录汇总结果（重试后成功的客户端不再计为失败）
+    failures = RETRY.failures()
+    failure_reasons = {}
+    for client_info in all_clients:
+        exe_path = client_info["path"]
+        if exe_path in failures:
+            failed_clients.append(os.path.dirname(exe_path))
+            failure_reasons[os.path.dirname(exe_path)] = str(failures[exe_path])
+        else:
+            success_clients.append(f"{client_info['root_dir_name']}/{os.path.basename(os.path.dirname(exe_path))}")
+    
+    # 并行导出的统计来自各工作进程，逐个导出的统计来自本进程
+    worker_results = [result for result in passes if result is not None]
+    local_pass = len(worker_results) < len(passes)
+    def combined(key, local_stats):
+        total = {}
+        for result in worker_results:
+            merge_stats(total, result[key])
+        if local_pass or not worker_results:
+            merge_stats(total, local_stats)
+        return total
+    
+    # 更新跨客户端检索索引（只导入有变化的导出）
+    search_stats = None
+    if INDEX_EXPORTS and SEARCH_INDEX_EXPORTS:
         try:
-            # 执行导出并获取是否成功的返回值
-            export_success = export_telegram_data(exe_path, client_export_dir)
-            
-            # 根据export_telegram_data的返回值判断是否成功
-            if export_success is False:  # 明确检查是否为False，因为未登录的情况下返回None
-                message = f"警告：客户端 {client_dir} (根目录: {root_dir_name}) 未成功导出数据 (未找到'Show My Data'按钮)"
-                if callback:
-                    callback(message)
-                logging.warning(message)
-                failed_clients.append(os.path.dirname(exe_path))  # 保存完整路径
-            elif export_success is None:  # 处理未登录或其他提前返回的情况
-                message = f"警告：客户端 {client_dir} (根目录: {root_dir_name}) 未处理 (可能未登录或状态异常)"
-                if callback:
-                    callback(message)
-                logging.warning(message)
-                failed_clients.append(os.path.dirname(exe_path))  # 保存完整路径
-            else:
-                message = f"客户端 {client_dir} (根目录: {root_dir_name}) 数据导出成功"
-                if callback:
-                    callback(message)
-                logging.info(message)
-                success_clients.append(f"{root_dir_name}/{client_dir}")  # 添加到成功列表，包含根目录信息
+            search_stats = update_search_index(export_dir, skip_dirs=(DEDUP_STORE_DIR,))
         except Exception as e:
-            message = f"错误：客户端 {client_dir} (根目录: {root_dir_name}) 导出失败 - {str(e)}"
-            if callback:
-                callback(message)
-            logging.error(message)
-            failed_clients.append(os.path.dirname(exe_path))  # 保存完整路径
-        
-        time.sleep(5)
-        
-        # 获取导出后的文件夹列表，找出新增的文件夹
-        if os.path.exists(downloads_path):
-            after_folders = set(f for f in os.listdir(downloads_path) if os.path.isdir(os.path.join(downloads_path, f)))
-            new_folders = after_folders - before_folders
-            exported_folders.extend(new_folders)
-    
-    # 所有处理完成后，只删除导出过程中生成的文件夹
-    downloads_path = os.path.join(os.path.expanduser("~"), "Downloads", "Telegram Desktop")
-    if os.path.exists(downloads_path):
-        for folder in exported_folders:
-            folder_path = os.path.join(downloads_path, folder)
-            if os.path.exists(folder_path):
-                try:
-                    shutil.rmtree(folder_path)
-                    logging.info(f"已删除导出文件夹: {folder_path}")
-                except Exception as e:
-                    logging.error(f"删除文件夹失败 {folder}: {str(e)}")
+            logging.error(f"更新检索索引失败: {str(e)}")
     
     # 处理结果摘要
     summary = {
-        "total": len(clients),
+        "total": len(all_clients),
         "success": len(success_clients),
         "failed": len(failed_clients),
         "success_list": success_clients,
-        "failed_list": failed_clients
+        "failed_list": failed_clients,
+        "failure_reasons": failure_reasons,
+        "template_cache": combined("template_cache", TEMPLATES.stats()),
+        "roi_hints": combined("roi_hints", ROI_HINTS.stats()),
+        "scale_hints": combined("scale_hints", SCALE_HINTS.stats()),
+        "transfers": combined("transfers", TRANSFERS.stats()),
+        "postprocess": [o for result in worker_results for o in result["postprocess"]] + POSTPROCESS.outcomes(),
+        "dedup": combined("dedup", DEDUP_STORE.stats()),
+        "incremental": combined("incremental", INCREMENTAL.stats()),
+        "pack": combined("pack", PACKER.stats()),
+        "retry": RETRY.stats(),
+        "timing_history": HISTORY.stats(),
+        "trace": {"file": TRACER.path, "phases": TRACER.stats()},
+        "capture": combined("capture", CAPTURE.stats()),
+        "search_index": search_stats
     }
     
+    cache_stats = summary["template_cache"]
+    logging.info(f"模板缓存：共 {cache_stats['templates']} 个模板，解码 {cache_stats['decodes']} 次，"
+                 f"获取 {cache_stats['lookups']} 次，节省解码 {cache_stats['saved_decodes']} 次")
+    roi_stats = summary["roi_hints"]
+    logging.info(f"区域提示：ROI命中 {roi_stats['roi_hits']} 次，退回全屏 {roi_stats['roi_misses']} 次")
+    scale_stats = summary["scale_hints"]
+    if scale_stats.get("scale_searches"):
+        logging.info(f"缩放比例：多比例搜索 {scale_stats['scale_searches']} 次，在其他比例上找到 {scale_stats['scale_found']} 次，"
+                     f"当前比例 {SCALE_HINTS.scale_for(CAPTURE.size())}")
+    capture_stats = summary["capture"]
+    if capture_stats.get("grabs"):
+        logging.info(f"截屏（{CAPTURE.name}）：{capture_stats['grabs']} 次，"
+                     f"平均 {capture_stats['seconds'] / capture_stats['grabs'] * 1000:.1f} ms，"
+                     f"共 {capture_stats['pixels'] / 1e6:.0f} 百万像素")
+    postprocess_failed = [o for o in summary["postprocess"] if not o["ok"]]
+    logging.info(f"后处理任务：共 {len(summary['postprocess'])} 个，失败 {len(postprocess_failed)} 个")
+    if DEDUP_STORE.enabled:
+        dedup_stats = summary["dedup"]
+        logging.info(f"去重存储：{dedup_stats['files']} 个媒体文件，新存入 {dedup_stats['stored']} 个，"
+                     f"复用 {dedup_stats['reused']} 个，节省 {dedup_stats['saved_bytes'] / 1024 / 1024:.1f} MB")
+    if INCREMENTAL.enabled:
+        incremental_stats = summary["incremental"]
+        logging.info(f"增量导出：合并 {incremental_stats['merged']} 个客户端，新消息 {incremental_stats['new_messages']} 条，"
+                     f"跳过已有文件 {incremental_stats['skipped_files']} 个")
+    if PACKER.enabled:
+        pack_stats = summary["pack"]
+        logging.info(f"打包：{pack_stats['packed']} 个导出，{pack_stats['files']} 个文件，"
+                     f"{pack_stats['bytes'] / 1024 / 1024:.1f} MB -> {pack_stats['packed_bytes'] / 1024 / 1024:.1f} MB")
+    retry_stats = summary["retry"]
+    if retry_stats["rounds"]:
+        logging.info(f"失败重试：{retry_stats['rounds']} 轮，重试 {retry_stats['retried']} 个客户端，"
+                     f"重试后成功 {retry_stats['recovered']} 个，最终失败原因 {retry_stats['reasons']}")
+    if summary["trace"]["phases"]:
+        logging.info(f"各步骤耗时（追踪文件 {TRACER.path}）：\n{format_summary(summary['trace']['phases'])}")
+    transfer_stats = summary["transfers"]
+    logging.info(f"文件转移：重命名 {transfer_stats['renamed']} 个，复制 {transfer_stats['copied']} 个，"
+                 f"共 {transfer_stats['bytes'] / 1024 / 1024:.1f} MB，平均 {transfer_stats['mbps']:.1f} MB/s")
+    
     # 将失败的客户端列表写入文件
     if failed_clients:
         current_dir = os.getcwd()
@@ -858,7 +1671,7 @@ def run_export(source_dirs, export_dir, callback=None):
                 f.write(f"导出失败的客户端列表 (总计 {len(failed_clients)} 个):\n")
                 f.write("="*50 + "\n")
                 for client_path in failed_clients:
-                    f.write(f"{client_path}\n")
+                    f.write(f"{client_path}\t{failure_reasons.get(client_path, '')}\n")
             if callback:
                 callback(f"失败记录已保存至: {failed_log_path}")
             logging.info(f"失败记录已保存至: {failed_log_path}")
@@ -880,28 +1693,20 @@ def close_telegram_processes():
             logging.info("未发现正在运行的Telegram客户端进程")
             return True
         
-        for exe_name in telegram_processes:
+        for info in telegram_processes:
             try:
-                # 首先尝试正常关闭
-                subprocess.run(f"taskkill /IM {exe_name} /T", 
-                              shell=True, 
-                              stdout=subprocess.PIPE, 
-                              stderr=subprocess.PIPE)
-                logging.info(f"已尝试关闭进程: {exe_name}")
-                
-                # 如果正常关闭失败，使用强制关闭
-                subprocess.run(f"taskkill /F /IM {exe_name} /T", 
-                              shell=True, 
-                              stdout=subprocess.PIPE, 
-                              stderr=subprocess.PIPE)
-                logging.info(f"已强制关闭进程: {exe_name}")
+                # 按PID先正常关闭，超时后强制关闭
+                if PROCESS_TRACKER.kill(info):
+                    logging.info(f"已关闭进程: {describe_processes([info])}")
+                else:
+                    logging.warning(f"强制关闭后进程仍在运行: {describe_processes([info])}")
             except Exception as e:
-                logging.error(f"关闭进程失败 {exe_name}: {str(e)}")
+                logging.error(f"关闭进程失败 {describe_processes([info])}: {str(e)}")
         
         # 最后验证是否所有进程都已关闭
         remaining_processes = find_telegram_processes()
         if remaining_processes:
-            logging.warning(f"以下进程仍在运行: {', '.join(remaining_processes)}")
+            logging.warning(f"以下进程仍在运行: {describe_processes(remaining_processes)}")
             return False
         return True
     except Exception as e:
@@ -910,7 +1715,7 @@ def close_telegram_processes():
 
 
 # 保留原始main函数，但重命名为console_main，用于命令行模式
-def console_main():
+def console_main(resume=False):
     # 原来的main函数代码
     try:
         # 检查所有支持语言的截图目录
@@ -944,19 +1749,42 @@ def console_main():
     export_dir = input("\n📁 请输入导出目录 :").strip()
     print(f"✅ 已确认导出目录：{export_dir}\n")
     
+    # 支持独立显示会话时，可选择同时导出多个客户端
+    workers = 1
+    if parallel_supported():
+        workers_input = input("🔀 请输入并行导出的客户端数量(直接回车为1) :").strip()
+        if workers_input.isdigit() and int(workers_input) > 0:
+            workers = int(workers_input)
+        print(f"✅ 并行数量：{workers}\n")
+    
     # 调用新的run_export函数，传入目录列表
-    result = run_export(source_dirs, export_dir, callback=print)
+    result = run_export(source_dirs, export_dir, callback=print, workers=workers, resume=resume)
     
     # 输出处理结果摘要
     print("\n========== 处理结果摘要 ==========")
     print(f"总客户端数量: {result['total']}")
     print(f"成功导出数量: {result['success']}")
     print(f"失败客户端数量: {result['failed']}")
+    print(f"模板缓存节省解码次数: {result['template_cache']['saved_decodes']}")
+    print(f"导出文件转移: {result['transfers']['bytes'] / 1024 / 1024:.1f} MB，平均 {result['transfers']['mbps']:.1f} MB/s")
+    if result['retry']['retried']:
+        print(f"失败重试: {result['retry']['retried']} 个客户端，重试后成功 {result['retry']['recovered']} 个")
+    if result['trace']['phases']:
+        print("\n各步骤耗时:")
+        print(format_summary(result['trace']['phases']))
+        if result['trace']['file']:
+            print(f"追踪文件: {result['trace']['file']}")
+    
+    postprocess_failed = [o for o in result['postprocess'] if not o['ok']]
+    if postprocess_failed:
+        print("\n以下后处理任务失败:")
+        for outcome in postprocess_failed:
+            print(f"- [{outcome['kind']}] {outcome['name']}: {outcome['error']}")
     
     if result['failed'] > 0:
         print("\n以下客户端导出失败:")
         for client_path in result['failed_list']:
-            print(f"- {client_path}")
+            print(f"- {client_path} ({result['failure_reasons'].get(client_path, '')})")
         
         if 'failed_log' in result:
             print(f"\n失败记录已保存至: {result['failed_log']}")
@@ -966,8 +1794,87 @@ def console_main():
     print("程序执行完毕！按任意键退出...")
     input()  # 等待用户按任意键
 
+# 命令行检索：python TG_DataExporter.py search 导出目录 [关键词] [选项]
+def search_main(argv=None):
+    """检索导出目录中所有客户端的消息"""
+    import argparse
+    parser = argparse.ArgumentParser(prog="TG_DataExporter.py search", description="检索已导出的Telegram消息")
+    parser.add_argument("export_dir", help="导出目录")
+    parser.add_argument("keywords", nargs="?", help="关键词（多个词以空格分隔，需同时出现；以*结尾表示前缀匹配，如 \"abc*\"）")
+    parser.add_argument("--raw", action="store_true", help="关键词按FTS5查询语法解析，如 \"a OR b\"、\"NEAR(a b)\"")
+    parser.add_argument("--from", dest="sender", help="发送者名称")
+    parser.add_argument("--since", help="起始日期，如 2024-01-01")
+    parser.add_argument("--until", help="结束日期，如 2024-12-31")
+    parser.add_argument("--client", help="客户端（根目录/客户端目录）")
+    parser.add_argument("--limit", type=int, default=50, help="最多显示的条数（默认50）")
+    parser.add_argument("--no-update", action="store_true", help="不检查新导出，直接检索")
+    args = parser.parse_args(argv)
+    
+    if not os.path.isdir(args.export_dir):
+        print(f"❌ 导出目录不存在：{args.export_dir}")
+        return 1
+    
+    index = SearchIndex(args.export_dir, skip_dirs=(DEDUP_STORE_DIR,))
+    try:
+        if not args.no_update:
+            stats = index.update()
+            if stats["added"] or stats["updated"] or stats["removed"]:
+                print(f"✅ 检索索引已更新：新增 {stats['added']}，更新 {stats['updated']}，删除 {stats['removed']}")
+        start = time.monotonic()
+        results = index.search(args.keywords, args.sender, args.since, args.until, args.client, args.limit, args.raw)
+        elapsed = (time.monotonic() - start) * 1000
+    except sqlite3.OperationalError as e:
+        print(f"❌ 检索失败：{str(e)}" + ("（请检查FTS5查询语法）" if args.raw else ""))
+        return 1
+    finally:
+        index.close()
+    
+    for row in results:
+        text = (row["text"] or "").replace("\n", " ")
+        print(f"[{row['date']}] {row['client']} | {row['chat_name']} | {row['from_name'] or '-'}: {text[:200]}")
+    print(f"\n共 {len(results)} 条结果 ({elapsed:.1f} ms)")
+    return 0
+
+def pack_main(argv=None):
+    """批量打包导出目录中已有的客户端导出"""
+    import argparse
+    parser = argparse.ArgumentParser(prog="TG_DataExporter.py pack", description="将已导出的客户端目录打包为分段zip文件")
+    parser.add_argument("export_dir", help="导出目录")
+    parser.add_argument("--segment-size", type=int, default=SEGMENT_SIZE // 1024 // 1024,
+                        help=f"每个分段的大小（MB，默认{SEGMENT_SIZE // 1024 // 1024}）")
+    parser.add_argument("--workers", type=int, default=None, help="并行压缩的线程数（默认为CPU核数）")
+    parser.add_argument("--remove-source", action="store_true", help="打包后删除源文件（保留消息索引）")
+    args = parser.parse_args(argv)
+    
+    if not os.path.isdir(args.export_dir):
+        print(f"❌ 导出目录不存在：{args.export_dir}")
+        return 1
+    
+    failed = 0
+    export_paths = find_export_dirs(args.export_dir)
+    for idx, export_path in enumerate(export_paths, 1):
+        try:
+            result = pack_export(export_path, segment_size=args.segment_size * 1024 * 1024,
+                                 workers=args.workers, remove_source=args.remove_source)
+        except Exception as e:
+            failed += 1
+            logging.error(f"打包导出目录失败: {export_path} - {str(e)}")
+            print(f"❌ [{idx}/{len(export_paths)}] {export_path}: {str(e)}")
+            continue
+        print(f"✅ [{idx}/{len(export_paths)}] {export_path}: {result['files']} 个文件，{result['segments']} 个分段，"
+              f"{result['bytes'] / 1024 / 1024:.1f} MB -> {result['packed_bytes'] / 1024 / 1024:.1f} MB "
+              f"({result['seconds']:.1f} 秒)")
+    print(f"\n共打包 {len(export_paths) - failed} 个导出，失败 {failed} 个")
+    return 1 if failed else 0
+
 # 修改主入口点
 if __name__ == "__main__":
+    # 检索和打包模式不需要界面自动化，直接执行后退出
+    if len(sys.argv) > 1 and sys.argv[1] == "search":
+        sys.exit(search_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "pack":
+        sys.exit(pack_main(sys.argv[2:]))
+    
     # 有条件初始化COM
     if PYTHONCOM_AVAILABLE:
         pythoncom.CoInitialize()
@@ -1009,7 +1916,8 @@ if __name__ == "__main__":
         # 调用主函数，添加表情符号
         input("\n🚀 准备好后，按回车键开始执行...")
         # 修改为调用console_main而不是main
-        console_main()  # 将main()改为console_main()
+        # --resume：继续上次中断的运行，跳过已完成的客户端
+        console_main(resume="--resume" in sys.argv[1:])  # 将main()改为console_main()
     finally:
         # 有条件反初始化COM
         if PYTHONCOM_AVAILABLE:
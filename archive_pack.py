@@ -0,0 +1,244 @@
+"""
+导出打包 - 将客户端导出目录打包为分段zip文件，并生成可按文件定位的索引
+
+大量小文件不利于备份和传输。打包时按大小把文件分配到多个分段，各分段在线程池中并行压缩
+（zlib压缩时释放GIL）；图片、视频等已压缩的文件以存储方式写入，不再浪费CPU重复压缩。
+index.json记录每个文件所在的分段，读取单个文件时只需打开对应分段。
+"""
+
+import os
+import json
+import time
+import zlib
+import shutil
+import logging
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PACK_SUFFIX = ".pack"                    # 打包目录后缀：<导出目录>.pack
+INDEX_NAME = "index.json"
+SEGMENT_SIZE = 128 * 1024 * 1024         # 每个分段的目标大小（未压缩），分段越小可并行压缩的分段越多
+COMPRESS_LEVEL = 6
+SAMPLE_SIZE = 64 * 1024                  # 判断是否已压缩时读取的样本大小
+COMPRESSED_RATIO = 0.95                  # 样本压缩后仍大于该比例时视为已压缩
+KEEP_FILES = ("result_index.sqlite",)    # 打包后删除源文件时保留的文件（检索索引仍需使用）
+
+# 常见的已压缩格式，直接按扩展名判断
+COMPRESSED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".mp4", ".mov", ".mkv", ".webm", ".avi",
+    ".mp3", ".m4a", ".ogg", ".oga", ".opus", ".aac", ".flac",
+    ".zip", ".gz", ".tgs", ".7z", ".rar", ".xz", ".bz2", ".zst",
+}
+
+
+def is_compressed(path):
+    """判断文件是否已经是压缩格式：先按扩展名，未知扩展名时抽样试压缩"""
+    if os.path.splitext(path)[1].lower() in COMPRESSED_EXTENSIONS:
+        return True
+    try:
+        with open(path, "rb") as f:
+            sample = f.read(SAMPLE_SIZE)
+    except OSError:
+        return False
+    if len(sample) < 1024:
+        return False
+    return len(zlib.compress(sample, 1)) > len(sample) * COMPRESSED_RATIO
+
+
+def plan_segments(files, segment_size=SEGMENT_SIZE):
+    """
+    按大小将文件分配到分段，同一目录的文件尽量在同一分段中
+    参数: files - [(相对路径, 大小)]
+    返回: list of list
+    """
+    segments = []
+    current = []
+    current_size = 0
+    for relative, size in sorted(files):
+        if current and current_size + size > segment_size:
+            segments.append(current)
+            current = []
+            current_size = 0
+        current.append((relative, size))
+        current_size += size
+    if current:
+        segments.append(current)
+    return segments
+
+
+def _write_segment(source, segment_path, entries):
+    """写入一个分段，返回 {相对路径: 是否以存储方式写入}"""
+    stored = {}
+    tmp_path = segment_path + ".tmp"
+    with zipfile.ZipFile(tmp_path, "w", allowZip64=True) as zf:
+        for relative, _ in entries:
+            path = os.path.join(source, relative)
+            compressed = is_compressed(path)
+            zf.write(
+                path,
+                relative.replace(os.sep, "/"),
+                compress_type=zipfile.ZIP_STORED if compressed else zipfile.ZIP_DEFLATED,
+                compresslevel=None if compressed else COMPRESS_LEVEL,
+            )
+            stored[relative] = compressed
+    os.replace(tmp_path, segment_path)
+    return stored
+
+
+def pack_export(source, target=None, segment_size=SEGMENT_SIZE, workers=None, remove_source=False):
+    """
+    打包一个客户端导出目录
+
+    参数:
+        source: 导出目录
+        target: 打包目录，默认为 source + ".pack"（已存在时覆盖）
+        segment_size: 每个分段的目标大小（字节）
+        workers: 并行压缩的线程数，默认为CPU核数
+        remove_source: 打包完成后是否删除源文件（保留KEEP_FILES中的文件）
+
+    返回:
+        dict: target, files, segments, bytes, packed_bytes, stored_files, seconds
+    """
+    start = time.monotonic()
+    source = os.path.abspath(source)
+    target = target or source.rstrip(os.sep) + PACK_SUFFIX
+
+    files = []
+    for current, dirs, names in os.walk(source):
+        for name in names:
+            path = os.path.join(current, name)
+            files.append((os.path.relpath(path, source), os.path.getsize(path)))
+    segments = plan_segments(files, segment_size)
+
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.makedirs(target)
+
+    segment_names = [f"segment_{i + 1:04d}.zip" for i in range(len(segments))]
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        results = list(pool.map(
+            lambda item: _write_segment(source, os.path.join(target, item[0]), item[1]),
+            zip(segment_names, segments)
+        ))
+
+    index = {"source": os.path.basename(source), "segments": [], "files": {}}
+    stored_files = 0
+    for name, entries, stored in zip(segment_names, segments, results):
+        index["segments"].append({
+            "name": name,
+            "files": len(entries),
+            "bytes": sum(size for _, size in entries),
+            "size": os.path.getsize(os.path.join(target, name)),
+        })
+        for relative, size in entries:
+            index["files"][relative.replace(os.sep, "/")] = {
+                "segment": name, "size": size, "stored": stored[relative]
+            }
+            stored_files += stored[relative]
+    with open(os.path.join(target, INDEX_NAME), "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+
+    if remove_source:
+        for relative, _ in files:
+            if os.path.basename(relative) not in KEEP_FILES:
+                os.remove(os.path.join(source, relative))
+        for current, dirs, names in os.walk(source, topdown=False):
+            if current != source and not os.listdir(current):
+                os.rmdir(current)
+
+    total = sum(size for _, size in files)
+    packed = sum(segment["size"] for segment in index["segments"])
+    seconds = time.monotonic() - start
+    logging.info(f"已打包导出目录: {source} -> {target} ({len(files)} 个文件, {len(segments)} 个分段, "
+                 f"{total / 1024 / 1024:.1f} MB -> {packed / 1024 / 1024:.1f} MB, {seconds:.1f} 秒)")
+    return {
+        "target": target,
+        "files": len(files),
+        "segments": len(segments),
+        "bytes": total,
+        "packed_bytes": packed,
+        "stored_files": stored_files,
+        "seconds": seconds,
+    }
+
+
+class ArchivePacker:
+    """
+    转移完成后打包客户端导出目录
+
+    configure(True)后启用；统计所有已打包导出的文件数和压缩前后大小。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.remove_source = False
+        self.segment_size = SEGMENT_SIZE
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def configure(self, enabled, remove_source=False, segment_size=SEGMENT_SIZE):
+        """启用或停用打包；remove_source为True时打包后删除源文件"""
+        self.enabled = bool(enabled)
+        self.remove_source = bool(remove_source)
+        self.segment_size = segment_size
+
+    def reset_stats(self):
+        """重置统计计数（每次运行开始时调用）"""
+        with self._lock:
+            self.packed = 0          # 已打包的导出数
+            self.files = 0
+            self.segments = 0
+            self.bytes = 0           # 打包前大小
+            self.packed_bytes = 0    # 打包后大小
+            self.seconds = 0.0
+
+    def stats(self):
+        """返回打包统计"""
+        with self._lock:
+            return {
+                "packed": self.packed,
+                "files": self.files,
+                "segments": self.segments,
+                "bytes": self.bytes,
+                "packed_bytes": self.packed_bytes,
+                "seconds": self.seconds,
+            }
+
+    def pack(self, export_path):
+        """按当前配置打包导出目录，返回pack_export的结果"""
+        result = pack_export(export_path, segment_size=self.segment_size, remove_source=self.remove_source)
+        with self._lock:
+            self.packed += 1
+            self.files += result["files"]
+            self.segments += result["segments"]
+            self.bytes += result["bytes"]
+            self.packed_bytes += result["packed_bytes"]
+            self.seconds += result["seconds"]
+        return result
+
+
+def read_packed_file(pack_dir, relative):
+    """根据索引从打包目录中读取单个文件的内容"""
+    with open(os.path.join(pack_dir, INDEX_NAME), "r", encoding="utf-8") as f:
+        index = json.load(f)
+    entry = index["files"][relative.replace(os.sep, "/")]
+    with zipfile.ZipFile(os.path.join(pack_dir, entry["segment"])) as zf:
+        return zf.read(relative.replace(os.sep, "/"))
+
+
+def find_export_dirs(export_dir):
+    """查找导出目录下的客户端导出目录（导出目录/根目录/客户端目录，含result.json或export_results.html）"""
+    found = []
+    for root_name in sorted(os.listdir(export_dir)):
+        root_path = os.path.join(export_dir, root_name)
+        if root_name.startswith("_") or not os.path.isdir(root_path):
+            continue
+        for client_name in sorted(os.listdir(root_path)):
+            client_path = os.path.join(root_path, client_name)
+            if client_name.endswith(PACK_SUFFIX) or not os.path.isdir(client_path):
+                continue
+            if any(os.path.exists(os.path.join(client_path, m)) for m in ("result.json", "export_results.html")):
+                found.append(client_path)
+    return found
@@ -0,0 +1,590 @@
+"""
+模板匹配基准测试 - 在录制或合成的整屏画面上离线回放界面元素定位，测量匹配耗时和准确率
+
+不截取真实屏幕、不点击，可在没有显示的Linux环境中运行：与bench_throughput相同，用FixtureScreen代替pyautogui，
+流程回放直接调用TG_DataExporter中的定位函数（locate_on_screen、wait_for_template等）。报告三部分内容：
+  - 每个界面元素截图的匹配耗时（全屏匹配和ROI区域内匹配）
+  - 按导出流程的顺序回放所有定位步骤的总耗时（没有区域提示和已有区域提示两种情况）
+  - 各置信度下的命中/误报/漏报数量，以及每个截图的最低命中得分和最高误报得分
+
+结果可保存为JSON（--output），下次运行时用--compare与之对比；结果中记录了提交、画面摘要和运行环境，
+只有画面摘要相同的结果之间才能直接比较。
+
+--screen-scale把画面放大或缩小，模拟缩放设置与截图时不同的屏幕：截图按该比例匹配，
+流程回放从没有缩放比例记录开始，首次未命中时在其他比例上搜索（与locate_on_screen相同）。
+
+用法：
+    python bench_matcher.py [--fixtures 录制画面目录] [--repeat 5] [--output 结果.json] [--compare 基准.json]
+                            [--screen-scale 1.25]
+    python bench_matcher.py --save-fixtures 目录    # 保存合成画面，可作为录制真实截图的模板
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import platform
+import tempfile
+import subprocess
+
+import cv2
+import numpy as np
+
+import capture
+from matcher import to_gray, match_score
+from template_cache import TemplateCache
+from roi_hints import RoiHintStore
+from scale_hints import ScaleHintStore
+from screen_fixtures import OPTION_IMAGES, synthetic_fixtures, load_fixtures, save_fixtures, scale_fixture
+
+SCREENSHOT_DIR = "screenshots"
+LANGUAGES = ["en", "ru"]
+CONFIDENCE_LEVELS = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95]
+REPEAT = 3
+POSITION_TOLERANCE = 3      # 命中位置与预期位置的最大偏差（像素）
+REGRESSION_THRESHOLD = 0.1  # 对比时耗时增加超过该比例视为变慢
+
+# 导出流程中的定位步骤（与begin_export/complete_export的调用顺序和置信度一致）：
+#   (界面, 滚动位置, 方式, 截图名称列表, 置信度)
+#   any: 一帧上依次匹配所有语言的候选截图，命中一个即停止（wait_for_template）
+#   wait: 同上，只匹配当前语言
+#   detect: 按语言顺序定位，命中即停止（detect_language）
+#   locate: 当前语言的locate_on_screen，优先在区域提示内匹配
+#   options: 一帧上匹配所有尚未找到的导出选项（find_export_options）
+FLOW = [
+    ("main", 0, "any", ["hamburger_menu.png", "hamburger_menu_dark.png", "start_messaging_button.png"], 0.7),
+    ("main", 0, "detect", ["hamburger_menu.png", "hamburger_menu_dark.png"], 0.8),
+    ("menu", 0, "any", ["settings_menu_item.png"], 0.75),
+    ("menu", 0, "detect", ["settings_menu_item.png"], 0.75),
+    ("settings", 0, "locate", ["start_messaging_button.png"], 0.7),
+    ("settings", 0, "locate", ["advanced_tab.png"], 0.6),
+    ("advanced", 0, "locate", ["export_button.png"], 0.6),
+    ("advanced", 1, "locate", ["export_button.png"], 0.6),
+    ("export_options", 0, "wait", ["export_settings_title.png"], 0.7),
+    ("export_options", 0, "locate", ["export_settings_title.png"], 0.7),
+    ("export_options", 0, "options", OPTION_IMAGES, 0.7),
+    ("export_options", 1, "options", OPTION_IMAGES, 0.7),
+    ("export_options", 1, "locate", ["save_button.png"], 0.6),
+    ("export_done", 0, "locate", ["show_my_data_button.png"], 0.7),
+    ("export_done", 0, "locate", ["close_button.png"], 0.6),
+]
+
+
+def load_templates(screenshot_dir, languages):
+    """加载各语言目录下的全部截图"""
+    templates = TemplateCache(screenshot_dir)
+    for language in languages:
+        lang_dir = os.path.join(screenshot_dir, language)
+        templates.load(language, sorted(f for f in os.listdir(lang_dir) if f.lower().endswith(".png")))
+    return templates
+
+
+def template_names(templates, language):
+    """流程中用到的截图（未使用的截图如复选框不参与测试）"""
+    used = {name for _, _, _, images, _ in FLOW for name in images}
+    return sorted(name for lang, name in templates.keys() if lang == language and name in used)
+
+
+def fixtures_digest(fixtures, templates):
+    """画面和截图内容的摘要，摘要相同的结果之间才可以直接比较"""
+    digest = hashlib.sha1()
+    for fixture in fixtures:
+        digest.update(fixture["name"].encode("utf-8"))
+        digest.update(fixture["frame"].tobytes())
+    for key in sorted(templates.keys()):
+        digest.update("/".join(key).encode("utf-8"))
+        digest.update(templates.get(*key, grayscale=True).tobytes())
+    return digest.hexdigest()[:12]
+
+
+def git_commit():
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return output.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def position_ok(loc, box, tolerance=POSITION_TOLERANCE):
+    return abs(loc[0] - box.left) <= tolerance and abs(loc[1] - box.top) <= tolerance
+
+
+def median_ms(samples):
+    return float(np.median(samples)) * 1000 if samples else None
+
+
+def p95_ms(samples):
+    return float(np.percentile(samples, 95)) * 1000 if samples else None
+
+
+def bench_templates(fixtures, templates, repeat, padding=100, scale=1.0):
+    """
+    记录每个截图在每帧画面上的匹配得分，并在截图应出现的画面上测量全屏和ROI区域内的匹配耗时
+
+    截图按scale缩放（与画面的缩放比例一致，即已经记录了正确比例时的情况）。
+
+    返回:
+        (耗时统计 {"语言/截图": {...}}, 得分记录 [(主题, 语言/截图, 得分, 是否应命中, 位置是否正确)])
+    """
+    hints = RoiHintStore(os.path.join(tempfile.gettempdir(), "bench_matcher_unused.json"), padding)
+    full_times = {}
+    roi_times = {}
+    scores = []
+    grays = [to_gray(fixture["frame"]) for fixture in fixtures]
+
+    for fixture, gray in zip(fixtures, grays):
+        language = fixture["language"]
+        for name in template_names(templates, language):
+            score, loc = match_score(gray, templates.get(language, name, grayscale=True, scale=scale))
+            box = fixture["expect"].get(name)
+            scores.append((fixture["theme"], f"{language}/{name}", score, box is not None,
+                           box is not None and loc is not None and position_ok(loc, box)))
+
+    for _ in range(repeat):
+        for fixture, gray in zip(fixtures, grays):
+            language = fixture["language"]
+            resolution = (gray.shape[1], gray.shape[0])
+            for name in template_names(templates, language):
+                box = fixture["expect"].get(name)
+                if box is None:
+                    continue
+                key = f"{language}/{name}"
+                needle = templates.get(language, name, grayscale=True, scale=scale)
+                start = time.perf_counter()
+                match_score(gray, needle)
+                full_times.setdefault(key, []).append(time.perf_counter() - start)
+
+                hints.record(language, resolution, name, box)
+                left, top, width, height = hints.region_for(language, resolution, name)
+                start = time.perf_counter()
+                match_score(gray[top:top + height, left:left + width], needle)
+                roi_times.setdefault(key, []).append(time.perf_counter() - start)
+
+    stats = {}
+    for key in sorted(full_times):
+        stats[key] = {
+            "full_ms": median_ms(full_times[key]),
+            "full_p95_ms": p95_ms(full_times[key]),
+            "roi_ms": median_ms(roi_times.get(key, [])),
+        }
+    return stats, scores
+
+
+def accuracy(scores, confidence_levels):
+    """
+    按主题和置信度统计命中情况
+
+    tp: 应命中且在预期位置命中；fn: 应命中但未命中；
+    fp: 不应命中却命中，或命中位置错误；tn: 不应命中且未命中
+    """
+    result = {}
+    for theme in sorted({record[0] for record in scores}):
+        result[theme] = {f"{confidence:.2f}": _count_hits([r for r in scores if r[0] == theme], confidence)
+                         for confidence in confidence_levels}
+    return result
+
+
+def _count_hits(scores, confidence):
+    counts = {"tp": 0, "fp": 0, "fn": 0, "tn": 0}
+    for _, _, score, expected, located in scores:
+        hit = score >= confidence
+        if expected:
+            if hit and located:
+                counts["tp"] += 1
+            else:
+                counts["fn"] += 1
+                if hit:
+                    counts["fp"] += 1
+        elif hit:
+            counts["fp"] += 1
+        else:
+            counts["tn"] += 1
+    found = counts["tp"] + counts["fp"]
+    positives = counts["tp"] + counts["fn"]
+    counts["precision"] = counts["tp"] / found if found else None
+    counts["recall"] = counts["tp"] / positives if positives else None
+    return counts
+
+
+def margins(scores):
+    """每个截图的最低命中得分和最高误报得分，两者的差距越大，置信度越容易设置"""
+    result = {}
+    for _, key, score, expected, located in scores:
+        entry = result.setdefault(key, {"min_hit": None, "max_miss": None})
+        if expected and located:
+            entry["min_hit"] = score if entry["min_hit"] is None else min(entry["min_hit"], score)
+        else:
+            entry["max_miss"] = score if entry["max_miss"] is None else max(entry["max_miss"], score)
+    return {key: result[key] for key in sorted(result)}
+
+
+class FixtureScreen:
+    """
+    提供定位流程用到的pyautogui接口：截屏返回当前画面（RGB），点击、滚动和按键只做记录
+
+    install()后替换sys.modules中的pyautogui，必须在导入TG_DataExporter之前调用。
+    """
+
+    FAILSAFE = False
+    PAUSE = 0
+
+    def __init__(self):
+        self._frames = {}           # 画面名称 -> RGB画面
+        self._frame = None
+        self.clicks = []
+
+    def install(self):
+        sys.modules["pyautogui"] = self
+        return self
+
+    def show(self, fixture):
+        """切换当前画面，之后的截屏都返回该画面"""
+        frame = self._frames.get(fixture["name"])
+        if frame is None:
+            frame = self._frames[fixture["name"]] = cv2.cvtColor(fixture["frame"], cv2.COLOR_BGR2RGB)
+        self._frame = frame
+
+    # ---- pyautogui接口 ----
+
+    def size(self):
+        return self._frame.shape[1], self._frame.shape[0]
+
+    def center(self, box):
+        return box[0] + box[2] // 2, box[1] + box[3] // 2
+
+    def screenshot(self, imageFilename=None, region=None):
+        frame = self._frame
+        if region:
+            left, top, width, height = region
+            frame = frame[top:top + height, left:left + width]
+        return frame
+
+    def click(self, x=None, y=None, *args, **kwargs):
+        self.clicks.append((x, y))
+
+    def scroll(self, *args, **kwargs):
+        pass
+
+    def press(self, *args, **kwargs):
+        pass
+
+    def hotkey(self, *args, **kwargs):
+        pass
+
+    def moveTo(self, *args, **kwargs):
+        pass
+
+
+def load_exporter(templates, work_dir):
+    """
+    导入TG_DataExporter，截屏改为读取FixtureScreen的当前画面
+
+    导入时在work_dir中创建日志文件并读取区域提示等记录，不影响当前目录中正式运行的数据。
+
+    返回:
+        (TG_DataExporter模块, FixtureScreen)
+    """
+    screen = sys.modules.get("pyautogui")
+    if not isinstance(screen, FixtureScreen):
+        screen = FixtureScreen().install()
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        import TG_DataExporter as exporter
+    finally:
+        os.chdir(cwd)
+    exporter.TEMPLATES = templates
+    exporter.CAPTURE.configure(capture.PYAUTOGUI)
+    return exporter, screen
+
+
+def replay_flow(exporter, screen, frames, language, languages):
+    """
+    按FLOW的顺序在一组画面上回放定位步骤，每一步调用导出流程中的定位函数
+
+    参数:
+        exporter: load_exporter()导入的TG_DataExporter，回放过程中使用并更新其ROI_HINTS和SCALE_HINTS
+        screen: FixtureScreen
+        frames: {(界面, 滚动位置): 画面}
+
+    返回:
+        (耗时秒数, 匹配次数, 结果与预期不符的步骤列表)
+    """
+    seconds = 0.0
+    matches = 0
+    errors = []
+    pending = list(OPTION_IMAGES)
+    for step, (state, scroll, kind, images, confidence) in enumerate(FLOW):
+        fixture = frames[(state, scroll)]
+        expect = fixture["expect"]
+        wanted = {name for name in (pending if kind == "options" else images) if name in expect}
+        screen.show(fixture)
+        found = {}
+        start = time.perf_counter()
+        with exporter.TRACER.span("bench_step") as span:
+            if kind in ("any", "wait"):
+                candidate_languages = [language] if kind == "wait" else languages
+                hit = exporter.wait_for_template([(candidate_language, image_name)
+                                                  for candidate_language in candidate_languages
+                                                  for image_name in images], 0, confidence)
+                if hit:
+                    found[hit[:2]] = hit[2]
+            elif kind == "detect":
+                for candidate in [(candidate_language, image_name) for candidate_language in languages
+                                  for image_name in images if exporter.TEMPLATES.has(candidate_language, image_name)]:
+                    location = exporter.locate_on_screen(candidate[1], candidate[0], confidence)
+                    if location:
+                        found[candidate] = location
+                        break
+            elif kind == "locate":
+                location = exporter.locate_on_screen(images[0], language, confidence)
+                if location:
+                    found[(language, images[0])] = location
+            else:
+                hits = exporter.find_export_options([os.path.splitext(name)[0] for name in pending],
+                                                    language, confidence)
+                for option, location in hits.items():
+                    found[(language, f"{option}.png")] = location
+                    pending.remove(f"{option}.png")
+        seconds += time.perf_counter() - start
+        matches += span.counts.get("matches", 0)
+
+        # 按当前语言的预期检查结果；any/detect步骤命中其他语言的截图视为错误
+        got = found_names(found, language)
+        wrong = [f"{lang}/{name}" for (lang, name), location in found.items()
+                 if lang != language or name not in expect
+                 or not position_ok(location, expect[name])]
+        if kind in ("any", "wait", "detect"):
+            missed = [] if got & wanted or not wanted else sorted(wanted)
+        else:
+            missed = sorted(wanted - got)
+        if wrong or missed:
+            errors.append({"step": step, "state": state, "scroll": scroll, "wrong": wrong, "missed": missed})
+    return seconds, matches, errors
+
+
+def found_names(found, language):
+    return {name for lang, name in found if lang == language}
+
+
+def bench_flows(exporter, screen, fixtures, languages, repeat):
+    """
+    对每个 语言 + 主题 回放完整流程：cold为没有区域提示的首次运行，warm为使用首次运行记录的区域提示
+
+    缺少流程所需画面的组合（例如只录制了部分界面）跳过。
+    """
+    groups = {}
+    for fixture in fixtures:
+        groups.setdefault((fixture["language"], fixture["theme"]), {})[(fixture["state"], fixture["scroll"])] = fixture
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for (language, theme), frames in sorted(groups.items()):
+            key = f"{language}/{theme}"
+            missing = sorted({f"{state}_{scroll}" for state, scroll, _, _, _ in FLOW} -
+                             {f"{state}_{scroll}" for state, scroll in frames})
+            if missing:
+                results[key] = {"skipped": f"缺少画面: {', '.join(missing)}"}
+                continue
+            cold, warm = [], []
+            for _ in range(repeat):
+                # 每次从没有区域提示和缩放比例记录的状态开始（不读取、不写入正式运行的记录文件）
+                exporter.ROI_HINTS = RoiHintStore(os.path.join(tmp, "roi_hints.json"))
+                exporter.SCALE_HINTS = ScaleHintStore(os.path.join(tmp, "scale_hints.json"))
+                cold_seconds, cold_matches, errors = replay_flow(exporter, screen, frames, language, languages)
+                cold_searches = exporter.SCALE_HINTS.searches
+                warm_seconds, warm_matches, _ = replay_flow(exporter, screen, frames, language, languages)
+                cold.append(cold_seconds)
+                warm.append(warm_seconds)
+            results[key] = {
+                "cold_ms": median_ms(cold),
+                "warm_ms": median_ms(warm),
+                "cold_matches": cold_matches,
+                "warm_matches": warm_matches,
+                "scale_searches": cold_searches,
+                "scale": exporter.SCALE_HINTS.scale_for(frames[FLOW[0][:2]]["frame"].shape[1::-1]),
+                "errors": errors,
+            }
+    return results
+
+
+def run_benchmark(exporter, screen, fixtures, templates, languages, repeat=REPEAT,
+                  confidence_levels=CONFIDENCE_LEVELS, source="synthetic", screen_scale=1.0):
+    """运行全部测试（exporter和screen由load_exporter()得到），返回可保存为JSON的结果"""
+    template_stats, scores = bench_templates(fixtures, templates, repeat, scale=screen_scale)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "fixtures": source,
+            "digest": fixtures_digest(fixtures, templates),
+            "frames": len(fixtures),
+            "screen_scale": screen_scale,
+            "repeat": repeat,
+            "threads": cv2.getNumThreads(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "machine": f"{platform.system()} {platform.machine()} {platform.processor() or ''}".strip(),
+        },
+        "templates": template_stats,
+        "flows": bench_flows(exporter, screen, fixtures, languages, repeat),
+        "accuracy": accuracy(scores, confidence_levels),
+        "margins": margins(scores),
+    }
+
+
+def _fmt(value, spec=".2f"):
+    return "-" if value is None else format(value, spec)
+
+
+def format_report(result):
+    meta = result["meta"]
+    lines = [f"提交 {meta['commit'] or '-'}  画面 {meta['fixtures']} ({meta['frames']} 帧, 摘要 {meta['digest']}, 缩放 {meta.get('screen_scale', 1.0)})  "
+             f"重复 {meta['repeat']} 次  OpenCV {meta['opencv']} 线程 {meta['threads']}  {meta['machine']}", ""]
+    lines.append(f"{'截图':<40}{'全屏(ms)':>10}{'全屏p95':>10}{'ROI(ms)':>10}{'最低命中':>10}{'最高误报':>10}")
+    for key, entry in result["templates"].items():
+        margin = result["margins"].get(key, {})
+        lines.append(f"{key:<40}{_fmt(entry['full_ms']):>10}{_fmt(entry['full_p95_ms']):>10}"
+                     f"{_fmt(entry['roi_ms']):>10}{_fmt(margin.get('min_hit'), '.3f'):>10}"
+                     f"{_fmt(margin.get('max_miss'), '.3f'):>10}")
+    lines.append("")
+    lines.append(f"{'流程':<16}{'首次(ms)':>10}{'有提示(ms)':>12}{'匹配次数':>12}  结果")
+    for key, entry in result["flows"].items():
+        if "skipped" in entry:
+            lines.append(f"{key:<16}{entry['skipped']}")
+            continue
+        errors = entry["errors"]
+        if len(errors) > 3:
+            errors = f"{len(errors)} 个步骤不符合预期: " + ", ".join(f"#{e['step']}" for e in errors)
+        else:
+            errors = "; ".join(f"#{e['step']} {e['state']}_{e['scroll']} 误报{e['wrong']} 漏报{e['missed']}"
+                               for e in errors) or "全部符合预期"
+        if entry.get("scale_searches"):
+            errors += f"（多比例搜索 {entry['scale_searches']} 次，比例 {entry['scale']}）"
+        lines.append(f"{key:<16}{_fmt(entry['cold_ms']):>10}{_fmt(entry['warm_ms']):>12}"
+                     f"{entry['cold_matches']:>6}/{entry['warm_matches']:<5}  {errors}")
+    lines.append("")
+    lines.append(f"{'主题':<8}{'置信度':<8}{'命中':>6}{'误报':>6}{'漏报':>6}{'正确拒绝':>10}{'精确率':>8}{'召回率':>8}")
+    for theme, levels in result["accuracy"].items():
+        for confidence, entry in levels.items():
+            lines.append(f"{theme:<8}{confidence:<8}{entry['tp']:>6}{entry['fp']:>6}{entry['fn']:>6}{entry['tn']:>10}"
+                         f"{_fmt(entry['precision']):>8}{_fmt(entry['recall']):>8}")
+    return "\n".join(lines)
+
+
+def compare(result, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    与基准结果对比
+
+    返回:
+        (报告文本, 变差的项目数) - 耗时增加超过threshold或命中数减少、误报数增加均计为变差
+    """
+    lines = []
+    if result["meta"]["digest"] != baseline["meta"]["digest"]:
+        lines.append("⚠️ 画面或截图与基准不同，以下结果不能直接比较")
+    if result["meta"]["machine"] != baseline["meta"]["machine"] or result["meta"]["threads"] != baseline["meta"]["threads"]:
+        lines.append("⚠️ 运行环境与基准不同，耗时仅供参考")
+    regressions = 0
+
+    def row(label, old, new, lower_is_better=True, ratio=True):
+        nonlocal regressions
+        if old is None or new is None:
+            return
+        if ratio:
+            change = (new - old) / old if old else 0.0
+            worse = change > threshold if lower_is_better else change < -threshold
+            text = f"{change:+.1%}"
+        else:
+            change = new - old
+            if not change:
+                return
+            worse = change > 0 if lower_is_better else change < 0
+            text = f"{change:+d}"
+        regressions += worse
+        lines.append(f"{'✗' if worse else ' '} {label:<48}{old:>10.2f}{new:>10.2f}  {text}")
+
+    lines.append(f"  {'项目':<48}{'基准':>10}{'当前':>10}  变化")
+    for key, entry in result["templates"].items():
+        old = baseline["templates"].get(key)
+        if old:
+            row(f"{key} 全屏", old["full_ms"], entry["full_ms"])
+            row(f"{key} ROI", old["roi_ms"], entry["roi_ms"])
+    for key, entry in result["flows"].items():
+        old = baseline["flows"].get(key)
+        if old and "skipped" not in old and "skipped" not in entry:
+            row(f"流程 {key} 首次", old["cold_ms"], entry["cold_ms"])
+            row(f"流程 {key} 有提示", old["warm_ms"], entry["warm_ms"])
+            row(f"流程 {key} 不符合预期的步骤", len(old["errors"]), len(entry["errors"]), ratio=False)
+    for theme, levels in result["accuracy"].items():
+        for confidence, entry in levels.items():
+            old = baseline["accuracy"].get(theme, {}).get(confidence)
+            if old:
+                row(f"{theme} 置信度 {confidence} 命中", old["tp"], entry["tp"], lower_is_better=False, ratio=False)
+                row(f"{theme} 置信度 {confidence} 误报", old["fp"], entry["fp"], ratio=False)
+    lines.append(f"\n变差的项目: {regressions}")
+    return "\n".join(lines), regressions
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="bench_matcher.py", description="模板匹配基准测试（离线回放整屏画面）")
+    parser.add_argument("--fixtures", help="录制画面目录（包含manifest.json），默认使用合成画面")
+    parser.add_argument("--screenshots", default=SCREENSHOT_DIR, help=f"界面元素截图目录（默认{SCREENSHOT_DIR}）")
+    parser.add_argument("--languages", default=",".join(LANGUAGES), help="语言代码，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help=f"重复测量次数，取中位数（默认{REPEAT}）")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="OpenCV线程数（默认1，使结果不受机器负载影响；0为OpenCV默认值）")
+    parser.add_argument("--output", help="将结果保存为JSON文件")
+    parser.add_argument("--compare", help="与之前保存的结果对比")
+    parser.add_argument("--strict", action="store_true", help="对比有变差的项目时返回非零退出码")
+    parser.add_argument("--screen-scale", type=float, default=1.0,
+                        help="把画面按该比例缩放，模拟缩放设置与截图时不同的屏幕（默认1）")
+    parser.add_argument("--save-fixtures", metavar="DIR", help="保存合成画面和manifest.json后退出")
+    args = parser.parse_args(argv)
+
+    if args.threads > 0:
+        cv2.setNumThreads(args.threads)
+    languages = [lang.strip() for lang in args.languages.split(",") if lang.strip()]
+    templates = load_templates(args.screenshots, languages)
+
+    if args.fixtures:
+        fixtures = [f for f in load_fixtures(args.fixtures) if f["language"] in languages]
+    else:
+        fixtures = synthetic_fixtures(templates, languages)
+    fixtures = [scale_fixture(fixture, args.screen_scale) for fixture in fixtures]
+    if args.save_fixtures:
+        save_fixtures(args.save_fixtures, fixtures)
+        print(f"已保存 {len(fixtures)} 帧画面: {args.save_fixtures}")
+        return 0
+    if not fixtures:
+        print("❌ 没有可用的画面")
+        return 1
+
+    work = tempfile.mkdtemp(prefix="bench_matcher_")
+    try:
+        exporter, screen = load_exporter(templates, work)
+        result = run_benchmark(exporter, screen, fixtures, templates, languages, max(1, args.repeat),
+                               source=args.fixtures or "synthetic", screen_scale=args.screen_scale)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    print(format_report(result))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存至: {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        report, regressions = compare(result, baseline)
+        print("\n========== 与基准对比 ==========")
+        print(report)
+        if args.strict and regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+"""
+整批导出吞吐量测试 - 用模拟客户端和虚拟桌面运行完整的run_export，不需要真实的Telegram、账号和屏幕
+
+VirtualDesktop实现导出流程用到的pyautogui接口（截屏、点击、滚动、按键），按screen_fixtures中的布局
+把前台模拟客户端的界面合成为整屏画面，并根据点击和滚动切换界面；确认导出后通知对应的模拟客户端进程
+（fake_telegram.py）在下载目录中写入导出文件夹。客户端发现、进程启停、导出文件转移、索引和运行日志
+都使用正式的代码，可用于测量上千个客户端时的整体吞吐量、流水线并发和转移耗时。
+
+虚拟桌面只存在于本进程中，并行导出（每个工作进程一个Xvfb显示）不在测试范围内；并发由--pipeline-depth控制。
+
+用法：
+    python bench_throughput.py --clients 1000 [--pipeline-depth 2] [--export-delay 2] [--export-size 1]
+                               [--not-logged-in 0.02] [--output 结果.json] [--work 工作目录]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import threading
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+import capture
+from template_cache import TemplateCache
+from processes import _pid_alive
+import fake_telegram
+from screen_fixtures import LAYOUTS, SCREEN_SIZE, SCROLL_STEP, render_state
+
+SCREENSHOT_DIR = "screenshots"
+SCROLL_PIXELS = 0.25        # pyautogui.scroll每个单位移动的像素（-1200约为一屏）
+LAUNCH_DELAY = 0.5          # 客户端进程启动后到主界面出现的秒数
+UI_DELAY = 0.1              # 点击后界面切换的秒数（期间画面不变、不响应输入）
+QUIET_SECONDS = 2.0         # 导出文件夹保持不变多久视为完成（模拟客户端写入时没有停顿，可比正式运行短）
+
+Size = namedtuple("Size", ["width", "height"])
+Point = namedtuple("Point", ["x", "y"])
+
+# 点击元素后的界面切换：界面 -> {截图名称: 新界面}
+TRANSITIONS = {
+    "main": {"hamburger_menu.png": "menu", "hamburger_menu_dark.png": "menu"},
+    "menu": {"hamburger_menu.png": "main", "hamburger_menu_dark.png": "main", "settings_menu_item.png": "settings"},
+    "settings": {"advanced_tab.png": "advanced"},
+    "advanced": {"export_button.png": "export_options"},
+    "export_options": {"save_button.png": "confirm"},
+    "export_done": {"close_button.png": "main"},
+}
+# 没有单独布局的界面：确认保存路径时仍显示导出设置窗口
+RENDER_AS = {"confirm": "export_options", "launching": "desktop"}
+
+
+class _Window:
+    """一个模拟客户端的窗口状态"""
+
+    def __init__(self, client_path, session_dir, config, ready_at):
+        self.client_path = client_path
+        self.session_dir = session_dir
+        self.config = config
+        self.ready_at = ready_at
+        self.state = "launching"
+        self.offset = 0.0           # 滚动位置（像素）
+        self.pending = None         # (新界面, 生效时间)
+        self.pid = None
+        self.selected = set()       # 已勾选的导出选项
+
+    def step(self):
+        scrolls = LAYOUTS[RENDER_AS.get(self.state, self.state)].get("scrolls", 1)
+        return min(scrolls - 1, int(round(self.offset / SCROLL_STEP)))
+
+
+class VirtualDesktop:
+    """
+    虚拟桌面，提供导出流程用到的pyautogui接口
+
+    install()后替换sys.modules中的pyautogui，必须在导入TG_DataExporter之前调用。
+    """
+
+    FAILSAFE = False
+    PAUSE = 0
+
+    def __init__(self, templates, sessions_dir, size=SCREEN_SIZE, launch_delay=LAUNCH_DELAY, ui_delay=UI_DELAY):
+        self.templates = templates
+        self.sessions_dir = sessions_dir
+        self.screen_size = Size(*size)
+        self.launch_delay = launch_delay
+        self.ui_delay = ui_delay
+        self._frames = {}           # (语言, 主题, 界面, 滚动位置) -> (RGB画面, {截图名称: Box})
+        self._windows = []
+        self._foreground = None
+        self._lock = threading.RLock()
+        self.counts = {"windows": 0, "screenshots": 0, "clicks": 0, "missed_clicks": 0, "scrolls": 0, "keys": 0}
+
+    def install(self):
+        sys.modules["pyautogui"] = self
+        return self
+
+    def open_window(self, client_path):
+        """为即将启动的模拟客户端创建窗口和会话目录，返回会话目录"""
+        with self._lock:
+            self.counts["windows"] += 1
+            session_dir = os.path.join(self.sessions_dir, f"{self.counts['windows']:05d}")
+            os.makedirs(session_dir, exist_ok=True)
+            window = _Window(client_path, session_dir, fake_telegram.load_config(client_path),
+                             time.monotonic() + self.launch_delay)
+            self._windows.append(window)
+            self._foreground = window
+        return session_dir
+
+    def _frame(self, window):
+        if window is None:
+            key = ("en", "light", "desktop", 0)
+        else:
+            key = (window.config["language"], window.config["theme"],
+                   RENDER_AS.get(window.state, window.state), window.step())
+        cached = self._frames.get(key)
+        if cached is None:
+            frame, expect = render_state(self.templates, key[0], key[2], key[1], key[3], tuple(self.screen_size))
+            cached = self._frames[key] = (cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), expect)
+        return cached
+
+    def _refresh(self, window, now):
+        """按时间和模拟客户端进程的状态推进窗口状态；进程已退出时关闭窗口"""
+        if window.pid is None:
+            try:
+                with open(os.path.join(window.session_dir, fake_telegram.PID_NAME), "r") as f:
+                    window.pid = int(f.read())
+            except (OSError, ValueError):
+                return
+        if not _pid_alive(window.pid):
+            self._windows.remove(window)
+            if self._foreground is window:
+                self._foreground = None
+            return
+        if window.state == "launching" and now >= window.ready_at:
+            window.state = "main" if window.config["logged_in"] else "login"
+        if window.pending and now >= window.pending[1]:
+            window.state, window.pending = window.pending[0], None
+            window.offset = 0.0
+        if window.state == "exporting" and os.path.exists(os.path.join(window.session_dir, fake_telegram.DONE_NAME)):
+            window.state = "export_done"
+
+    def _active(self):
+        window = self._foreground
+        if window is not None:
+            self._refresh(window, time.monotonic())
+        return self._foreground
+
+    def _switch(self, window, state):
+        window.pending = (state, time.monotonic() + self.ui_delay)
+
+    # ---- pyautogui接口 ----
+
+    def size(self):
+        return self.screen_size
+
+    def center(self, box):
+        return Point(box[0] + box[2] // 2, box[1] + box[3] // 2)
+
+    def screenshot(self, imageFilename=None, region=None):
+        """返回RGB数组（与PIL图像一样可直接传给np.asarray），指定文件名时同时保存为PNG"""
+        with self._lock:
+            self.counts["screenshots"] += 1
+            frame = self._frame(self._active())[0]
+        if region:
+            left, top, width, height = region
+            frame = frame[top:top + height, left:left + width]
+        if imageFilename:
+            ok, data = cv2.imencode(".png", cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+            if ok:
+                data.tofile(imageFilename)
+        return frame
+
+    def click(self, x=None, y=None, *args, **kwargs):
+        if isinstance(x, tuple):
+            x, y = x[0], x[1]
+        with self._lock:
+            self.counts["clicks"] += 1
+            window = self._active()
+            if window is None or window.pending:
+                self.counts["missed_clicks"] += 1
+                return
+            if x is None:
+                return
+            _, expect = self._frame(window)
+            for name, box in expect.items():
+                if box.left <= x < box.left + box.width and box.top <= y < box.top + box.height:
+                    break
+            else:
+                self.counts["missed_clicks"] += 1
+                return
+            if window.state == "export_options" and name.startswith("option_"):
+                window.selected ^= {name}
+            target = TRANSITIONS.get(window.state, {}).get(name)
+            if target:
+                self._switch(window, target)
+
+    def scroll(self, clicks, *args, **kwargs):
+        with self._lock:
+            self.counts["scrolls"] += 1
+            window = self._active()
+            if window is None or window.pending:
+                return
+            scrolls = LAYOUTS[RENDER_AS.get(window.state, window.state)].get("scrolls", 1)
+            window.offset = min(max(0.0, window.offset - clicks * SCROLL_PIXELS), (scrolls - 1) * SCROLL_STEP)
+
+    def press(self, key, *args, **kwargs):
+        with self._lock:
+            self.counts["keys"] += 1
+            window = self._active()
+            if window is None or window.pending:
+                return
+            if key == "escape" and window.state == "menu":
+                self._switch(window, "main")
+            elif key == "enter" and window.state == "confirm":
+                # 确认保存路径，通知模拟客户端进程开始写入导出文件夹
+                open(os.path.join(window.session_dir, fake_telegram.REQUEST_NAME), "wb").close()
+                window.state = "exporting"
+
+    def hotkey(self, *keys, **kwargs):
+        with self._lock:
+            self.counts["keys"] += 1
+            if keys == ("win", "d"):
+                # 显示桌面：所有窗口最小化
+                self._foreground = None
+            elif keys == ("alt", "tab") and self._windows:
+                self._foreground = self._windows[-1]
+
+    def moveTo(self, *args, **kwargs):
+        pass
+
+
+def make_bench_clients(root, args):
+    """按命令行参数生成模拟客户端：语言轮换，按比例未登录，导出耗时和大小在给定值的0.5~1.5倍之间浮动"""
+    languages = [lang.strip() for lang in args.languages.split(",") if lang.strip()]
+    return fake_telegram.make_clients(
+        root, args.clients, seed=args.seed,
+        language=lambda idx, rng: languages[idx % len(languages)],
+        theme=args.theme,
+        logged_in=lambda idx, rng: rng.random() >= args.not_logged_in,
+        export_delay=lambda idx, rng: round(args.export_delay * rng.uniform(0.5, 1.5), 2),
+        export_size=lambda idx, rng: int(args.export_size * 1024 * 1024 * rng.uniform(0.5, 1.5)),
+        files=args.files,
+        messages=args.messages,
+    )
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="bench_throughput.py", description="用模拟客户端测试整批导出的吞吐量")
+    parser.add_argument("--clients", type=int, default=20, help="模拟客户端数量（默认20）")
+    parser.add_argument("--pipeline-depth", type=int, default=2, help="同时写入的客户端数量上限（默认2）")
+    parser.add_argument("--export-delay", type=float, default=2.0, help="每个客户端写入导出文件的平均秒数（默认2）")
+    parser.add_argument("--export-size", type=float, default=1.0, help="每个客户端导出媒体文件的平均大小（MB，默认1）")
+    parser.add_argument("--files", type=int, default=10, help="每个导出的媒体文件数量（默认10）")
+    parser.add_argument("--messages", type=int, default=200, help="每个导出的消息数量（默认200）")
+    parser.add_argument("--not-logged-in", type=float, default=0.0, help="未登录客户端的比例（默认0）")
+    parser.add_argument("--languages", default="en,ru", help="客户端界面语言，按顺序轮换（默认en,ru）")
+    parser.add_argument("--theme", default="light", choices=["light", "dark"], help="界面主题（默认light）")
+    parser.add_argument("--launch-delay", type=float, default=LAUNCH_DELAY, help=f"客户端启动耗时（秒，默认{LAUNCH_DELAY}）")
+    parser.add_argument("--ui-delay", type=float, default=UI_DELAY, help=f"界面切换耗时（秒，默认{UI_DELAY}）")
+    parser.add_argument("--quiet-seconds", type=float, default=QUIET_SECONDS,
+                        help=f"导出文件夹保持不变多久视为完成（秒，默认{QUIET_SECONDS}）")
+    parser.add_argument("--attempts", type=int, default=1, help="每个客户端最多处理的轮数（默认1，不重试）")
+    parser.add_argument("--seed", type=int, default=0, help="生成客户端配置的随机种子")
+    parser.add_argument("--screenshots", default=SCREENSHOT_DIR, help=f"界面元素截图目录（默认{SCREENSHOT_DIR}）")
+    parser.add_argument("--work", help="工作目录（默认新建临时目录，结束后删除）")
+    parser.add_argument("--keep", action="store_true", help="保留工作目录（导出结果、日志和追踪文件）")
+    parser.add_argument("--output", help="将结果保存为JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="输出导出过程中的进度信息")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output) if args.output else None
+    screenshot_dir = os.path.abspath(args.screenshots)
+    work = os.path.abspath(args.work) if args.work else tempfile.mkdtemp(prefix="tg_throughput_")
+    clients_root = os.path.join(work, "clients")
+    downloads = os.path.join(work, "downloads")
+    export_dir = os.path.join(work, "export")
+    sessions = os.path.join(work, "sessions")
+    for path in (downloads, sessions):
+        os.makedirs(path, exist_ok=True)
+
+    start = time.monotonic()
+    make_bench_clients(clients_root, args)
+    setup_seconds = time.monotonic() - start
+    print(f"已生成 {args.clients} 个模拟客户端: {clients_root} ({setup_seconds:.1f} 秒)")
+
+    templates = TemplateCache(screenshot_dir)
+    desktop = VirtualDesktop(templates, sessions, launch_delay=args.launch_delay, ui_delay=args.ui_delay).install()
+    fake_client = os.path.abspath(fake_telegram.__file__)
+
+    # 区域提示、耗时记录、客户端索引和日志都写在工作目录中，不影响正式运行的数据
+    cwd = os.getcwd()
+    os.chdir(work)
+    try:
+        import TG_DataExporter as exporter
+        exporter.SCREENSHOT_DIR = screenshot_dir
+        exporter.TEMPLATES = templates
+        # 通过虚拟桌面截屏，不能使用直接读取真实屏幕的后端
+        exporter.CAPTURE.configure(capture.PYAUTOGUI)
+        exporter.DOWNLOADS_PATH = downloads
+        exporter.EXPORT_QUIET_SECONDS = args.quiet_seconds
+        exporter.EXPORT_SETTLE_SECONDS = min(exporter.EXPORT_SETTLE_SECONDS, args.quiet_seconds)
+        exporter.client_command = lambda client_path: [
+            sys.executable, fake_client, "client", client_path, desktop.open_window(client_path), downloads
+        ]
+
+        start = time.monotonic()
+        result = exporter.run_export([clients_root], export_dir, callback=print if args.verbose else None,
+                                     workers=1, pipeline_depth=args.pipeline_depth, attempts=args.attempts)
+        seconds = time.monotonic() - start
+    finally:
+        os.chdir(cwd)
+        # 删除会话目录后，残留的模拟客户端进程会自行退出
+        shutil.rmtree(sessions, ignore_errors=True)
+
+    if "error" in result:
+        print(f"❌ 导出失败: {result['error']}")
+        return 1
+
+    summary = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "clients": args.clients,
+            "pipeline_depth": args.pipeline_depth,
+            "export_delay": args.export_delay,
+            "export_size_mb": args.export_size,
+            "not_logged_in": args.not_logged_in,
+            "launch_delay": args.launch_delay,
+            "ui_delay": args.ui_delay,
+            "quiet_seconds": args.quiet_seconds,
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "machine": f"{platform.system()} {platform.machine()}",
+        },
+        "seconds": seconds,
+        "clients_per_minute": result["total"] / seconds * 60 if seconds else 0.0,
+        "seconds_per_client": seconds / result["total"] if result["total"] else 0.0,
+        "success": result["success"],
+        "failed": result["failed"],
+        "failure_reasons": {},
+        "transfers": result["transfers"],
+        "postprocess_failed": sum(1 for o in result["postprocess"] if not o["ok"]),
+        "phases": result["trace"]["phases"],
+        "desktop": desktop.counts,
+    }
+    for reason in result["failure_reasons"].values():
+        summary["failure_reasons"][reason] = summary["failure_reasons"].get(reason, 0) + 1
+
+    print("\n========== 吞吐量测试结果 ==========")
+    print(f"客户端: {result['total']}  成功: {result['success']}  失败: {result['failed']} {summary['failure_reasons'] or ''}")
+    print(f"总耗时: {seconds:.1f} 秒  吞吐量: {summary['clients_per_minute']:.1f} 个/分钟  "
+          f"平均每个客户端 {summary['seconds_per_client']:.2f} 秒（流水线深度 {args.pipeline_depth}）")
+    print(f"导出文件转移: {result['transfers']['bytes'] / 1024 / 1024:.1f} MB，平均 {result['transfers']['mbps']:.1f} MB/s，"
+          f"后处理失败 {summary['postprocess_failed']} 个")
+    print(f"虚拟桌面: 截屏 {desktop.counts['screenshots']} 次，点击 {desktop.counts['clicks']} 次"
+          f"（未点中元素 {desktop.counts['missed_clicks']} 次），滚动 {desktop.counts['scrolls']} 次")
+    if summary["phases"]:
+        print("\n各步骤耗时:")
+        print(exporter.format_summary(summary["phases"]))
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存至: {output}")
+    if args.keep or args.work:
+        print(f"工作目录: {work}")
+    else:
+        shutil.rmtree(work, ignore_errors=True)
+    return 0 if result["failed"] == 0 or args.not_logged_in else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
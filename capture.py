@@ -0,0 +1,318 @@
+"""
+截屏后端 - 统一的屏幕截取接口，可在多种实现之间切换
+
+  - mss: 使用mss库截屏（Windows为GDI BitBlt，Linux为X11），画面直接以NumPy视图访问mss的像素缓冲区
+  - dxgi: 使用dxcam库通过DXGI Desktop Duplication截屏（仅Windows），画面没有变化时复用上一帧
+  - pyautogui: 使用pyautogui.screenshot（PIL ImageGrab），作为其他后端不可用时的兜底
+  - replay: 依次回放目录中的截图文件，用于在没有显示的环境中测试定位流程
+
+灰度转换结果写入预先分配的缓冲区并以视图返回，连续截屏时不再分配新的整屏数组。
+返回的视图在下一次截屏前有效，需要保留画面时调用方应自行复制（或先缩小、转换为新数组）。
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+try:
+    import mss
+    MSS_AVAILABLE = True
+except ImportError:
+    MSS_AVAILABLE = False
+
+try:
+    import dxcam
+    DXCAM_AVAILABLE = True
+except ImportError:
+    DXCAM_AVAILABLE = False
+
+AUTO = "auto"
+MSS = "mss"
+DXGI = "dxgi"
+PYAUTOGUI = "pyautogui"
+REPLAY = "replay"
+
+
+class PyAutoGuiBackend:
+    """pyautogui.screenshot截屏，每次截屏都会生成新的PIL图像"""
+
+    name = PYAUTOGUI
+    color_code = cv2.COLOR_RGB2GRAY
+
+    def __init__(self):
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def size(self):
+        return tuple(self._pyautogui.size())
+
+    def grab(self, region=None):
+        return np.asarray(self._pyautogui.screenshot(region=region))
+
+    def close(self):
+        pass
+
+
+class MssBackend:
+    """mss截屏，返回直接引用mss像素缓冲区的BGRA视图"""
+
+    name = MSS
+    color_code = cv2.COLOR_BGRA2GRAY
+
+    def __init__(self):
+        self._mss = mss.mss()
+        self._monitor = self._mss.monitors[1]  # 主显示器
+
+    def size(self):
+        return self._monitor["width"], self._monitor["height"]
+
+    def grab(self, region=None):
+        if region:
+            left, top, width, height = region
+            area = {"left": self._monitor["left"] + left, "top": self._monitor["top"] + top,
+                    "width": width, "height": height}
+        else:
+            area = self._monitor
+        shot = self._mss.grab(area)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def close(self):
+        self._mss.close()
+
+
+class DxgiBackend:
+    """
+    DXGI Desktop Duplication截屏（dxcam）
+
+    始终截取整屏，区域截屏返回整屏帧的切片视图；画面没有变化时dxcam不返回新帧，直接复用上一帧。
+    """
+
+    name = DXGI
+    color_code = cv2.COLOR_BGRA2GRAY
+
+    def __init__(self):
+        self._camera = dxcam.create(output_color="BGRA")
+        if self._camera is None:
+            raise RuntimeError("无法创建DXGI截屏会话")
+        self._frame = None
+
+    def size(self):
+        return self._camera.width, self._camera.height
+
+    def grab(self, region=None):
+        frame = self._camera.grab()
+        if frame is not None:
+            self._frame = frame
+        elif self._frame is None:
+            # 会话刚创建时可能还没有可用的帧
+            deadline = time.monotonic() + 1.0
+            while self._frame is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+                self._frame = self._camera.grab()
+            if self._frame is None:
+                raise RuntimeError("DXGI截屏没有返回画面")
+        if region:
+            left, top, width, height = region
+            return self._frame[top:top + height, left:left + width]
+        return self._frame
+
+    def close(self):
+        self._camera.release()
+
+
+class ReplayBackend:
+    """
+    回放录制的截图（按文件名排序的PNG/JPG），所有图像启动时解码一次
+
+    调用advance()切换到下一帧，到达末尾后停在最后一帧（loop=True时从头开始）。
+    """
+
+    name = REPLAY
+    color_code = cv2.COLOR_BGR2GRAY
+
+    def __init__(self, path, loop=False):
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")))
+        self._frames = []
+        for name in names:
+            frame = cv2.imdecode(np.fromfile(os.path.join(path, name), dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                raise ValueError(f"无法解码截图文件：{os.path.join(path, name)}")
+            self._frames.append(frame)
+        if not self._frames:
+            raise FileNotFoundError(f"回放目录中没有截图文件：{path}")
+        self.names = names
+        self.loop = loop
+        self.index = 0
+
+    def size(self):
+        height, width = self._frames[self.index].shape[:2]
+        return width, height
+
+    def advance(self):
+        """切换到下一帧，返回是否还有新帧"""
+        if self.index + 1 < len(self._frames):
+            self.index += 1
+            return True
+        if self.loop:
+            self.index = 0
+            return True
+        return False
+
+    def grab(self, region=None):
+        frame = self._frames[self.index]
+        if region:
+            left, top, width, height = region
+            return frame[top:top + height, left:left + width]
+        return frame
+
+    def close(self):
+        pass
+
+
+def available_backends():
+    """当前环境中可用的实时截屏后端，按优先顺序排列"""
+    backends = []
+    if DXCAM_AVAILABLE and sys.platform == "win32":
+        backends.append(DXGI)
+    if MSS_AVAILABLE:
+        backends.append(MSS)
+    backends.append(PYAUTOGUI)
+    return backends
+
+
+def create_backend(name, path=None):
+    """按名称创建截屏后端，replay需要指定截图目录"""
+    if name == REPLAY:
+        return ReplayBackend(path)
+    if name == DXGI:
+        return DxgiBackend()
+    if name == MSS:
+        return MssBackend()
+    if name == PYAUTOGUI:
+        return PyAutoGuiBackend()
+    raise ValueError(f"未知的截屏后端：{name}")
+
+
+class ScreenCapture:
+    """
+    截屏服务，首次截屏时创建后端
+
+    backend为AUTO时按available_backends()的顺序选择第一个能创建成功的后端。
+    截屏只应在界面线程中调用；灰度帧写入共享的缓冲区，下一次截屏会覆盖上一帧。
+    """
+
+    def __init__(self, backend=AUTO, path=None):
+        self._lock = threading.Lock()
+        self.backend_name = backend
+        self.path = path
+        self._backend = None
+        self._gray = None           # 预分配的整屏灰度缓冲区
+        self.grabs = 0              # 截屏次数
+        self.seconds = 0.0          # 截屏和灰度转换的累计耗时
+        self.pixels = 0             # 累计截取的像素数
+
+    def configure(self, backend=AUTO, path=None):
+        """切换截屏后端（replay需要指定截图目录），下一次截屏时生效"""
+        with self._lock:
+            self.close()
+            self.backend_name = backend
+            self.path = path
+
+    def _ensure_backend(self):
+        if self._backend is not None:
+            return self._backend
+        names = available_backends() if self.backend_name == AUTO else [self.backend_name]
+        for name in names:
+            try:
+                self._backend = create_backend(name, self.path)
+                break
+            except Exception as e:
+                if name == names[-1]:
+                    raise
+                logging.warning(f"截屏后端 {name} 不可用，尝试下一个: {str(e)}")
+        if self.backend_name == AUTO:
+            missing = [name for name, available in ((DXGI, DXCAM_AVAILABLE and sys.platform == "win32"),
+                                                     (MSS, MSS_AVAILABLE)) if not available]
+            logging.info(f"自动选择截屏后端: {self._backend.name}"
+                         + (f"（未安装或不支持: {', '.join(missing)}）" if missing else ""))
+        else:
+            logging.info(f"截屏后端: {self._backend.name}")
+        return self._backend
+
+    @property
+    def name(self):
+        """正在使用的后端名称（尚未截屏时为配置的名称）"""
+        backend = self._backend
+        return backend.name if backend is not None else self.backend_name
+
+    @property
+    def backend(self):
+        with self._lock:
+            return self._ensure_backend()
+
+    def size(self):
+        """屏幕分辨率 (宽, 高)"""
+        return tuple(self.backend.size())
+
+    def grab(self, region=None):
+        """
+        截取屏幕（或区域 (left, top, width, height)）
+
+        返回:
+            (彩色帧, 灰度转换代码) - 帧的通道顺序由后端决定，可能是后端缓冲区的视图
+        """
+        with self._lock:
+            backend = self._ensure_backend()
+            frame = backend.grab(region)
+            self.grabs += 1
+            self.pixels += frame.shape[0] * frame.shape[1]
+            return frame, backend.color_code
+
+    def grab_gray(self, region=None):
+        """截屏并转换为灰度，返回预分配缓冲区的视图（下一次截屏前有效）"""
+        start = time.perf_counter()
+        frame, code = self.grab(region)
+        height, width = frame.shape[:2]
+        with self._lock:
+            if self._gray is None or self._gray.shape[0] < height or self._gray.shape[1] < width:
+                full_width, full_height = self._backend.size()
+                self._gray = np.empty((max(height, full_height), max(width, full_width)), dtype=np.uint8)
+            gray = self._gray[:height, :width]
+            cv2.cvtColor(frame, code, dst=gray)
+            self.seconds += time.perf_counter() - start
+        return gray
+
+    def save(self, path, region=None):
+        """截屏并保存为图像文件（使用imencode以兼容Windows下的非ASCII路径）"""
+        frame, code = self.grab(region)
+        if code == cv2.COLOR_RGB2GRAY:
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        elif code == cv2.COLOR_BGRA2GRAY:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        ok, data = cv2.imencode(os.path.splitext(path)[1] or ".png", frame)
+        if not ok:
+            raise ValueError(f"无法编码截图：{path}")
+        data.tofile(path)
+
+    def close(self):
+        """释放后端资源（调用方需持有锁或确保没有并发截屏）"""
+        if self._backend is not None:
+            try:
+                self._backend.close()
+            except Exception as e:
+                logging.debug(f"关闭截屏后端异常: {str(e)}")
+        self._backend = None
+        self._gray = None
+
+    def reset_stats(self):
+        self.grabs = 0
+        self.seconds = 0.0
+        self.pixels = 0
+
+    def stats(self):
+        return {"grabs": self.grabs, "seconds": self.seconds, "pixels": self.pixels}
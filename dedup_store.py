@@ -0,0 +1,177 @@
+"""
+去重存储 - 按内容哈希将导出的媒体文件只保存一份，各客户端的导出目录通过reflink或硬链接引用
+
+多个账号加入同一群组和频道时，相同的图片、视频和文件会被重复导出。启用后，每个媒体文件按SHA-256
+存入 存储目录/ab/cd/<哈希>，导出目录中的文件替换为指向该文件的链接，并在导出目录中写入清单记录对应关系。
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+import threading
+
+MANIFEST_NAME = "dedup_manifest.json"    # 每个导出目录中的清单文件名
+DEDUP_MIN_SIZE = 64 * 1024               # 小于该大小的文件不去重（链接本身的开销不值得）
+SKIP_EXTENSIONS = (".json", ".html", ".css", ".js", ".sqlite")  # 导出结构文件和索引，每个账号内容不同，不去重
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+FICLONE = 0x40049409                     # Linux reflink ioctl
+
+
+def file_sha256(path):
+    """流式计算文件的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(source, target):
+    """创建写时复制的文件副本（仅支持Linux上的btrfs/xfs等文件系统），不支持时抛出OSError"""
+    if not sys.platform.startswith("linux"):
+        raise OSError("当前平台不支持reflink")
+    import fcntl
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(target)
+            raise
+
+
+def _make_link(source, target, order):
+    """按order中的顺序尝试创建指向source内容的target，返回成功的方式，均失败时返回None"""
+    makers = {"reflink": _reflink, "hardlink": os.link}
+    for kind in order:
+        try:
+            makers[kind](source, target)
+            return kind
+        except OSError:
+            continue
+    return None
+
+
+def link_file(blob_path, target):
+    """
+    让target指向blob_path的内容，优先使用reflink（写时复制，修改互不影响），其次硬链接
+    返回: str - "reflink"/"hardlink"；均不支持时返回None（target保持不变）
+    """
+    tmp_path = target + ".dedup"
+    kind = _make_link(blob_path, tmp_path, ("reflink", "hardlink"))
+    if kind:
+        os.replace(tmp_path, target)
+    return kind
+
+
+class BlobStore:
+    """
+    按内容寻址的文件存储
+
+    configure指定存储目录后启用；存储目录应与导出目录位于同一分区，
+    新内容以硬链接存入、不复制数据，导出目录中的链接也才能生效。
+    """
+
+    def __init__(self, root=None):
+        self.root = None
+        self._lock = threading.Lock()
+        self.reset_stats()
+        self.configure(root)
+
+    @property
+    def enabled(self):
+        return self.root is not None
+
+    def configure(self, root):
+        """设置存储目录，为None时停用"""
+        self.root = root
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def reset_stats(self):
+        """重置统计计数（每次运行开始时调用）"""
+        with self._lock:
+            self.files = 0         # 参与去重的文件数
+            self.stored = 0        # 新存入的内容数
+            self.reused = 0        # 已存在、直接引用的内容数
+            self.saved_bytes = 0   # 因引用已有内容而节省的空间
+            self.unlinked = 0      # 无法建立链接、保留独立副本的文件数
+
+    def stats(self):
+        """返回去重统计"""
+        with self._lock:
+            return {
+                "files": self.files,
+                "stored": self.stored,
+                "reused": self.reused,
+                "saved_bytes": self.saved_bytes,
+                "unlinked": self.unlinked,
+            }
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def _should_dedup(self, path, size):
+        return size >= DEDUP_MIN_SIZE and not path.lower().endswith(SKIP_EXTENSIONS)
+
+    def ingest_file(self, path):
+        """
+        将单个文件纳入存储并替换为链接
+        返回: dict - sha256, size, link（"reflink"/"hardlink"/None）
+        """
+        size = os.path.getsize(path)
+        digest = file_sha256(path)
+        blob = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+
+        reused = os.path.exists(blob) and os.path.getsize(blob) == size
+        link = None
+        if reused:
+            link = link_file(blob, path)
+        else:
+            # 首次出现：以硬链接（或reflink）存入，不复制数据；文件系统均不支持时不去重
+            tmp_blob = blob + f".{os.getpid()}.{threading.get_ident()}.tmp"
+            link = _make_link(path, tmp_blob, ("hardlink", "reflink"))
+            if link:
+                os.replace(tmp_blob, blob)
+
+        with self._lock:
+            self.files += 1
+            if link is None:
+                self.unlinked += 1
+            elif reused:
+                self.reused += 1
+                self.saved_bytes += size
+            else:
+                self.stored += 1
+        return {"sha256": digest, "size": size, "link": link}
+
+    def ingest_tree(self, tree):
+        """
+        对导出目录中的媒体文件去重，并在目录中写入清单
+        返回: dict - 清单内容
+        """
+        manifest = {"store": os.path.abspath(self.root), "files": {}}
+        for current, dirs, names in os.walk(tree):
+            for name in names:
+                path = os.path.join(current, name)
+                if name == MANIFEST_NAME:
+                    continue
+                try:
+                    if not self._should_dedup(path, os.path.getsize(path)):
+                        continue
+                    entry = self.ingest_file(path)
+                except OSError as e:
+                    logging.warning(f"去重处理失败，保留原文件: {path} - {str(e)}")
+                    continue
+                manifest["files"][os.path.relpath(path, tree).replace(os.sep, "/")] = entry
+
+        with open(os.path.join(tree, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest
+
@@ -0,0 +1,189 @@
+"""
+客户端发现 - 并行扫描客户端根目录，并缓存每个可执行文件的Telegram识别结果
+"""
+
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pe_version import read_version_info, format_version
+
+DEFAULT_MAX_WORKERS = 16  # 扫描目录和读取版本信息的线程数（网络共享上主要是I/O等待）
+
+
+def inspect_executable(exe_path):
+    """
+    读取可执行文件的版本信息并判断是否为Telegram Desktop
+    返回: dict - is_telegram, exe_name, version
+    """
+    result = {"is_telegram": False, "exe_name": None, "version": ""}
+    try:
+        info = read_version_info(exe_path)
+    except Exception as e:
+        logging.debug(f"读取文件属性失败: {exe_path} - {str(e)}")
+        return result
+    if not info:
+        return result
+
+    # 检查是否为Telegram Desktop
+    file_description = info["strings"].get("FileDescription", "")
+    product_name = info["strings"].get("ProductName", "")
+    is_telegram = (
+        'Telegram' in file_description and 'Desktop' in file_description
+    ) or (
+        'Telegram' in product_name and 'Desktop' in product_name
+    )
+    if is_telegram:
+        result.update(
+            is_telegram=True,
+            exe_name=os.path.basename(exe_path),
+            version=format_version(info["file_version"]),
+        )
+    return result
+
+
+class ClientIndex:
+    """
+    可执行文件识别结果的本地索引
+
+    以 (路径, 大小, 修改时间) 为键缓存识别结果，文件未变化时直接复用，
+    重复运行时只需检查新增或变化的可执行文件。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.cached = 0      # 命中缓存的次数
+        self.inspected = 0   # 实际读取版本信息的次数
+        self.load()
+
+    def load(self):
+        """从文件加载索引，文件不存在或损坏时从空白开始"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except Exception as e:
+            logging.warning(f"读取客户端索引失败，将重新扫描: {str(e)}")
+            self._entries = {}
+
+    def save(self):
+        """写回索引文件"""
+        with self._lock:
+            entries = dict(self._entries)
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning(f"保存客户端索引失败: {str(e)}")
+
+    def inspect(self, exe_path):
+        """返回可执行文件的识别结果，文件未变化时使用缓存"""
+        key = os.path.normcase(os.path.abspath(exe_path))
+        try:
+            stat = os.stat(exe_path)
+        except OSError as e:
+            logging.debug(f"无法读取文件信息: {exe_path} - {str(e)}")
+            return {"is_telegram": False, "exe_name": None, "version": ""}
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            with self._lock:
+                self.cached += 1
+            return entry
+
+        entry = inspect_executable(exe_path)
+        entry.update(size=stat.st_size, mtime=stat.st_mtime)
+        with self._lock:
+            self._entries[key] = entry
+            self.inspected += 1
+        return entry
+
+    def reset_stats(self):
+        """重置统计计数（每次运行开始时调用）"""
+        self.cached = 0
+        self.inspected = 0
+
+    def prune(self, roots, seen_paths):
+        """删除位于已扫描根目录下、但本次未再出现的可执行文件记录"""
+        prefixes = tuple(os.path.join(os.path.normcase(os.path.abspath(r)), "") for r in roots)
+        seen = set(os.path.normcase(os.path.abspath(p)) for p in seen_paths)
+        with self._lock:
+            for key in list(self._entries):
+                if key.startswith(prefixes) and key not in seen:
+                    del self._entries[key]
+
+
+def _scan_exe_files(directory, recursive=True):
+    """列出目录下的.exe文件（按os.walk顺序）"""
+    if not recursive:
+        try:
+            return [os.path.join(directory, f) for f in sorted(os.listdir(directory))
+                    if f.lower().endswith('.exe') and os.path.isfile(os.path.join(directory, f))]
+        except OSError:
+            return []
+    exe_files = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file in sorted(files):
+            if file.lower().endswith('.exe'):
+                exe_files.append(os.path.join(root, file))
+    return exe_files
+
+
+def discover_clients(source_dirs, index, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    并行扫描客户端根目录，找出所有Telegram客户端
+
+    每个根目录的直接子目录分别交给线程池遍历，找到的.exe再并行识别。
+
+    参数:
+        source_dirs: 客户端根目录列表
+        index: ClientIndex实例
+        max_workers: 线程数
+
+    返回:
+        list: [{"path": 可执行文件路径, "root_dir_name": 根目录名称}]，顺序与目录遍历顺序一致
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # 第一步：并行遍历目录
+        scan_jobs = []
+        for source_dir in source_dirs:
+            source_dir_name = os.path.basename(source_dir)
+            scan_jobs.append((source_dir_name, pool.submit(_scan_exe_files, source_dir, False)))
+            try:
+                subdirs = sorted(d for d in os.listdir(source_dir)
+                                 if os.path.isdir(os.path.join(source_dir, d)))
+            except OSError as e:
+                logging.warning(f"无法读取客户端根目录: {source_dir} - {str(e)}")
+                subdirs = []
+            for subdir in subdirs:
+                scan_jobs.append((source_dir_name, pool.submit(_scan_exe_files, os.path.join(source_dir, subdir))))
+
+        candidates = []
+        for source_dir_name, job in scan_jobs:
+            candidates.extend((source_dir_name, exe_path) for exe_path in job.result())
+
+        # 第二步：并行识别可执行文件（命中缓存的直接返回）
+        verdicts = list(pool.map(lambda c: index.inspect(c[1]), candidates))
+
+    index.prune(source_dirs, [exe_path for _, exe_path in candidates])
+
+    clients = []
+    for (source_dir_name, exe_path), verdict in zip(candidates, verdicts):
+        if verdict["is_telegram"]:
+            logging.info(f"找到Telegram客户端: {verdict['exe_name']} (版本: {verdict['version']})")
+            clients.append({
+                "path": exe_path,
+                "root_dir_name": source_dir_name
+            })
+    logging.info(f"客户端扫描完成：共检查 {len(candidates)} 个可执行文件，"
+                 f"读取版本信息 {index.inspected} 个，命中缓存 {index.cached} 个")
+    return clients
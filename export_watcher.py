@@ -0,0 +1,253 @@
+"""
+导出完成检测 - 监视Telegram Desktop下载目录，根据导出文件夹落盘情况判断导出是否完成
+"""
+
+import os
+import time
+import logging
+import threading
+
+# 有条件导入win32file，用于目录变更通知；不可用时退回定时轮询
+try:
+    import win32file
+    import win32event
+    import win32con
+    WIN32_NOTIFY_AVAILABLE = True
+except ImportError:
+    WIN32_NOTIFY_AVAILABLE = False
+
+# 结果文件及其写完时的结尾（选择了HTML和JSON两种格式）
+# 导出开始时结果文件就会创建并持续写入，只有以对应的结尾收尾时才说明已经写完
+COMPLETION_MARKERS = {
+    "result.json": b"}",
+    "export_results.html": b"</html>",
+}
+MARKER_TAIL_BYTES = 256         # 检查结尾时读取的文件末尾字节数
+
+
+def results_finished(path):
+    """
+    检查导出文件夹中的结果文件是否都已写完（至少存在一个，且每个都以对应的结尾收尾）
+    只读取文件末尾，不受文件大小影响
+    """
+    found = False
+    for marker, ending in COMPLETION_MARKERS.items():
+        marker_path = os.path.join(path, marker)
+        try:
+            with open(marker_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - MARKER_TAIL_BYTES))
+                tail = f.read().rstrip()
+        except FileNotFoundError:
+            continue
+        except OSError:
+            return False
+        if not tail.lower().endswith(ending):
+            return False
+        found = True
+    return found
+
+
+def results_started(path):
+    """检查导出文件夹中是否已经出现结果文件（不论是否写完）"""
+    return any(os.path.exists(os.path.join(path, marker)) for marker in COMPLETION_MARKERS)
+
+
+def folder_signature(path):
+    """
+    统计文件夹内的文件数量、总大小和最新修改时间
+    返回: (int, int, float)
+    """
+    count = 0
+    total_size = 0
+    latest_mtime = 0.0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            stat = entry.stat(follow_symlinks=False)
+                            count += 1
+                            total_size += stat.st_size
+                            latest_mtime = max(latest_mtime, stat.st_mtime)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return count, total_size, latest_mtime
+
+
+class ExportFolderWatcher:
+    """
+    监视下载目录中新出现的导出文件夹
+
+    新文件夹中的结果文件都已写完（result.json以}结尾、export_results.html以</html>结尾），
+    且文件数量和大小在settle_seconds秒内保持不变时，即认为导出已经完整写入磁盘。
+    结果文件始终没有出现时（例如只导出了媒体文件），退回到文件夹在quiet_seconds秒内保持不变即视为完成。
+    Windows下使用目录变更通知在文件变化时立即唤醒，其他平台退回定时轮询。
+
+    多个导出同时写入时，每个导出在开始后认领(claim)自己的文件夹，之后按文件夹分别判断完成。
+    completed_folder可在后台线程中调用；wait_for_change只应在同一个线程中使用。
+    """
+
+    def __init__(self, downloads_path, quiet_seconds=30.0, settle_seconds=3.0, min_interval=0.25):
+        self.downloads_path = downloads_path
+        self.quiet_seconds = quiet_seconds    # 没有结果文件时，文件夹需保持不变的秒数
+        self.settle_seconds = settle_seconds  # 结果文件写完后，文件夹需保持不变的秒数
+        self.min_interval = min_interval  # 两次检查之间的最短间隔，避免写入频繁时空转
+        self.created = set()     # 本次运行期间出现过的所有新文件夹名称
+        self._known = set()      # 快照时已存在的文件夹
+        self._signatures = {}    # 文件夹名称 -> (签名, 签名首次出现时间)
+        self._claimed = set()    # 已被某个导出认领的文件夹
+        self._lock = threading.Lock()
+        self._handle = None
+
+    def _list_folders(self):
+        if not os.path.exists(self.downloads_path):
+            return set()
+        try:
+            return set(f for f in os.listdir(self.downloads_path)
+                       if os.path.isdir(os.path.join(self.downloads_path, f)))
+        except OSError as e:
+            logging.debug(f"读取下载目录失败: {str(e)}")
+            return set()
+
+    def snapshot(self):
+        """记录当前已存在的文件夹，之后出现的文件夹视为本次导出生成"""
+        known = self._list_folders()
+        with self._lock:
+            self._known = known
+            # 已认领的文件夹仍在写入，保留其稳定计时
+            self._signatures = {k: v for k, v in self._signatures.items() if k in self._claimed}
+        logging.info(f"导出前下载文件夹中的文件夹数量: {len(known)}")
+
+    def new_folders(self):
+        """返回快照之后新出现、且未被认领的文件夹名称列表（按创建时间从新到旧）"""
+        current = self._list_folders()
+        with self._lock:
+            self.created.update(current - self._known)
+            folders = current - self._known - self._claimed
+
+        def ctime(folder):
+            try:
+                return os.path.getctime(os.path.join(self.downloads_path, folder))
+            except OSError:
+                return 0
+        return sorted(folders, key=ctime, reverse=True)
+
+    def claim_new_folder(self):
+        """
+        认领最新出现的未认领文件夹，作为刚开始的导出所生成的文件夹
+        返回: str - 文件夹名称；尚未出现新文件夹时返回None
+        """
+        folders = self.new_folders()
+        if not folders:
+            return None
+        with self._lock:
+            self._claimed.add(folders[0])
+        logging.info(f"已识别本次导出的文件夹: {folders[0]}")
+        return folders[0]
+
+    def release(self, folder):
+        """文件夹已处理完毕，不再跟踪"""
+        with self._lock:
+            self._claimed.discard(folder)
+            self._signatures.pop(folder, None)
+
+    def _is_complete(self, folder, now):
+        path = os.path.join(self.downloads_path, folder)
+        # 结果文件写完之前不做完整统计，避免频繁遍历大文件夹
+        finished = results_finished(path)
+        if not finished and results_started(path):
+            with self._lock:
+                self._signatures.pop(folder, None)
+            return False
+        quiet = self.settle_seconds if finished else self.quiet_seconds
+        signature = folder_signature(path)
+        with self._lock:
+            previous = self._signatures.get(folder)
+            if previous is None or previous[0] != signature:
+                self._signatures[folder] = (signature, now)
+                return False
+        if now - previous[1] >= quiet:
+            logging.info(f"导出文件夹已稳定{'' if finished else '（未找到结果文件）'}: {folder} "
+                         f"({signature[0]} 个文件, {signature[1] / 1024 / 1024:.1f} MB)")
+            return True
+        return False
+
+    def completed_folder(self, folder=None):
+        """
+        检查是否有新文件夹已完成写入
+
+        参数:
+            folder: 已认领的文件夹名称；为None时检查所有未认领的新文件夹
+
+        返回: str - 已完成文件夹的完整路径；尚未完成时返回None
+        """
+        now = time.monotonic()
+        candidates = [folder] if folder else self.new_folders()
+        for name in candidates:
+            if self._is_complete(name, now):
+                return os.path.join(self.downloads_path, name)
+        return None
+
+    def results_ready(self, folder=None):
+        """
+        检查结果文件是否已经写完，不等待文件夹稳定；用于界面已确认导出完成的情况
+
+        参数:
+            folder: 已认领的文件夹名称；为None时检查所有未认领的新文件夹
+
+        返回: str - 结果文件已写完的文件夹完整路径；尚未写完时返回None
+        """
+        candidates = [folder] if folder else self.new_folders()
+        for name in candidates:
+            path = os.path.join(self.downloads_path, name)
+            if results_finished(path):
+                return path
+        return None
+
+    def wait_for_change(self, timeout):
+        """
+        等待下载目录发生变化，最长timeout秒
+        可直接作为wait_until的sleep函数使用
+        """
+        start = time.monotonic()
+        if WIN32_NOTIFY_AVAILABLE and os.path.exists(self.downloads_path):
+            try:
+                if self._handle is None:
+                    self._handle = win32file.FindFirstChangeNotification(
+                        self.downloads_path,
+                        True,
+                        win32con.FILE_NOTIFY_CHANGE_FILE_NAME
+                        | win32con.FILE_NOTIFY_CHANGE_DIR_NAME
+                        | win32con.FILE_NOTIFY_CHANGE_SIZE
+                        | win32con.FILE_NOTIFY_CHANGE_LAST_WRITE
+                    )
+                result = win32event.WaitForSingleObject(self._handle, int(timeout * 1000))
+                if result == win32event.WAIT_OBJECT_0:
+                    win32file.FindNextChangeNotification(self._handle)
+                    # 导出写入期间变更非常频繁，限制检查频率
+                    elapsed = time.monotonic() - start
+                    if elapsed < min(self.min_interval, timeout):
+                        time.sleep(min(self.min_interval, timeout) - elapsed)
+                return
+            except Exception as e:
+                logging.debug(f"目录变更通知不可用，改用轮询: {str(e)}")
+                self.close()
+        time.sleep(timeout)
+
+    def close(self):
+        """释放目录变更通知句柄"""
+        if self._handle is not None:
+            try:
+                win32file.FindCloseChangeNotification(self._handle)
+            except Exception:
+                pass
+            self._handle = None
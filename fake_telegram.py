@@ -0,0 +1,226 @@
+"""
+模拟Telegram客户端 - 用于在没有真实客户端和账号的环境中测试整批导出的吞吐量
+
+包含三部分：
+  - build_fake_exe(): 生成带有"Telegram Desktop"版本信息的最小PE文件，可被客户端发现流程识别
+  - make_clients(): 批量生成模拟客户端目录（可执行文件 + fake_client.json配置）
+  - 客户端进程：python fake_telegram.py client <可执行文件> <会话目录> <下载目录>
+    启动后在会话目录中写入pid，等待界面模拟（bench_throughput.VirtualDesktop）写入导出请求，
+    然后在下载目录中逐步写入合成的导出文件夹（媒体文件、result.json、export_results.html），
+    写完后写入完成标记，之后一直运行到被关闭。
+
+本模块只使用标准库，客户端进程启动开销与真实进程管理流程一致，不包含图像处理库的加载时间。
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import struct
+
+CONFIG_NAME = "fake_client.json"
+EXE_NAME = "Telegram.exe"
+PID_NAME = "pid"
+REQUEST_NAME = "export_requested"
+DONE_NAME = "export_done"
+POLL_INTERVAL = 0.05
+
+DEFAULT_CONFIG = {
+    "language": "en",
+    "theme": "light",
+    "logged_in": True,
+    "export_delay": 2.0,        # 从确认导出到写完所有文件的秒数
+    "export_size": 1024 * 1024, # 媒体文件总大小（字节）
+    "files": 10,                # 媒体文件数量
+    "messages": 200,            # result.json中的消息数量
+}
+
+
+def _version_block(key, value=b"", value_type=0, children=(), value_length=None):
+    """编码一个版本信息块（格式见pe_version._parse_block）"""
+    data = bytearray(struct.pack("<HHH", 0, 0, value_type))
+    data += key.encode("utf-16-le") + b"\0\0"
+    data += b"\0" * (-len(data) % 4)
+    data += value
+    for child in children:
+        data += b"\0" * (-len(data) % 4)
+        data += child
+    if value_length is None:
+        value_length = len(value) // 2 if value_type == 1 else len(value)
+    struct.pack_into("<HH", data, 0, len(data), value_length)
+    return bytes(data)
+
+
+def _version_info(strings, version):
+    fixed = struct.pack("<13I", 0xFEEF04BD, 0x10000,
+                        version[0] << 16 | version[1], version[2] << 16 | version[3],
+                        version[0] << 16 | version[1], version[2] << 16 | version[3],
+                        0x3F, 0, 0x40004, 1, 0, 0, 0)
+    entries = [_version_block(name, (text + "\0").encode("utf-16-le"), 1) for name, text in strings.items()]
+    string_info = _version_block("StringFileInfo", children=[_version_block("040904b0", children=entries, value_type=1)],
+                                 value_type=1)
+    var_info = _version_block("VarFileInfo", children=[_version_block("Translation", struct.pack("<HH", 0x409, 0x4B0))],
+                              value_type=1)
+    return _version_block("VS_VERSION_INFO", fixed, 0, [string_info, var_info])
+
+
+def build_fake_exe(path, description="Telegram Desktop", version=(4, 16, 8, 0)):
+    """
+    写入只包含版本资源的最小PE32文件（不能运行，只用于客户端识别）
+
+    资源节位于RVA 0x1000、文件偏移0x200，目录结构为 RT_VERSION -> ID 1 -> 语言0x409 -> 数据。
+    """
+    info = _version_info({"FileDescription": description, "ProductName": description,
+                          "FileVersion": ".".join(map(str, version))}, version)
+    rsrc_rva = 0x1000
+    data_offset = 0x58
+    rsrc = bytearray()
+    rsrc += struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1) + struct.pack("<II", 16, 0x80000000 | 0x18)
+    rsrc += struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1) + struct.pack("<II", 1, 0x80000000 | 0x30)
+    rsrc += struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1) + struct.pack("<II", 0x409, 0x48)
+    rsrc += struct.pack("<IIII", rsrc_rva + data_offset, len(info), 0, 0)
+    rsrc += info
+    rsrc += b"\0" * (-len(rsrc) % 0x200)
+
+    pe_offset = 0x40
+    optional = bytearray(224)
+    struct.pack_into("<H", optional, 0, 0x10B)
+    struct.pack_into("<I", optional, 92, 16)
+    struct.pack_into("<II", optional, 96 + 16, rsrc_rva, len(rsrc))
+    section = struct.pack("<8sIIIIIIHHI", b".rsrc", len(rsrc), rsrc_rva, len(rsrc), 0x200, 0, 0, 0, 0, 0x40000040)
+
+    header = bytearray(0x200)
+    header[0:2] = b"MZ"
+    struct.pack_into("<I", header, 0x3C, pe_offset)
+    header[pe_offset:pe_offset + 4] = b"PE\0\0"
+    struct.pack_into("<HHIIIHH", header, pe_offset + 4, 0x14C, 1, 0, 0, 0, len(optional), 0x102)
+    header[pe_offset + 24:pe_offset + 24 + len(optional)] = optional
+    section_offset = pe_offset + 24 + len(optional)
+    header[section_offset:section_offset + len(section)] = section
+
+    with open(path, "wb") as f:
+        f.write(bytes(header) + bytes(rsrc))
+
+
+def make_clients(root, count, seed=0, **overrides):
+    """
+    在root下生成count个模拟客户端：root/client_0001/Telegram.exe + fake_client.json
+
+    参数:
+        overrides: 覆盖DEFAULT_CONFIG中的字段；取值为可调用对象时以(序号, 随机数生成器)调用，
+                   可为每个客户端生成不同的配置（例如部分客户端未登录、导出大小不同）
+    返回:
+        list - 可执行文件路径
+    """
+    rng = random.Random(seed)
+    paths = []
+    for idx in range(1, count + 1):
+        client_dir = os.path.join(root, f"client_{idx:04d}")
+        os.makedirs(client_dir, exist_ok=True)
+        config = dict(DEFAULT_CONFIG)
+        for key, value in overrides.items():
+            config[key] = value(idx, rng) if callable(value) else value
+        with open(os.path.join(client_dir, CONFIG_NAME), "w", encoding="utf-8") as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        exe_path = os.path.join(client_dir, EXE_NAME)
+        build_fake_exe(exe_path)
+        paths.append(exe_path)
+    return paths
+
+
+def load_config(client_path):
+    """读取可执行文件所在目录中的模拟客户端配置，缺少的字段使用默认值"""
+    config = dict(DEFAULT_CONFIG)
+    path = os.path.join(os.path.dirname(client_path), CONFIG_NAME)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    return config
+
+
+def _write_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def result_json(name, messages, media_files):
+    """生成与Telegram导出格式相同的result.json内容"""
+    chat_messages = []
+    for i in range(1, messages + 1):
+        message = {
+            "id": i,
+            "type": "message",
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(1700000000 + i * 60)),
+            "from": name if i % 2 else "Contact",
+            "from_id": "user1" if i % 2 else "user2",
+            "text": f"message {i} from {name}",
+        }
+        if media_files and i % max(1, messages // len(media_files)) == 0:
+            message["file"] = media_files[(i // max(1, messages // len(media_files)) - 1) % len(media_files)]
+        chat_messages.append(message)
+    return {
+        "about": "Here is the data you requested.",
+        "personal_information": {"user_id": 1, "first_name": name},
+        "chats": {
+            "about": "This page lists all chats from this export.",
+            "list": [{"name": "Contact", "type": "personal_chat", "id": 2, "messages": chat_messages}],
+        },
+    }
+
+
+def write_export(downloads, config, name):
+    """
+    在下载目录中逐步写入一个导出文件夹，总耗时约为export_delay
+
+    文件夹立即创建，媒体文件在export_delay内均匀写出，最后写入result.json和export_results.html。
+    返回: 导出文件夹路径
+    """
+    folder = os.path.join(downloads, f"DataExport_{time.strftime('%Y-%m-%d')} ({os.getpid()})")
+    os.makedirs(os.path.join(folder, "files"), exist_ok=True)
+    files = max(0, int(config["files"]))
+    size = max(0, int(config["export_size"]))
+    interval = float(config["export_delay"]) / (files + 1)
+    media_files = []
+    for i in range(files):
+        time.sleep(interval)
+        relative = f"files/file_{i + 1:04d}.bin"
+        file_size = size // files + (1 if i < size % files else 0)
+        _write_atomic(os.path.join(folder, relative), os.urandom(file_size))
+        media_files.append(relative)
+    time.sleep(interval)
+    result = result_json(name, int(config["messages"]), media_files)
+    _write_atomic(os.path.join(folder, "result.json"), json.dumps(result, ensure_ascii=False).encode("utf-8"))
+    _write_atomic(os.path.join(folder, "export_results.html"),
+                  f"<html><body>Exported Data: {name}</body></html>".encode("utf-8"))
+    return folder
+
+
+def client_main(client_path, session_dir, downloads):
+    """模拟客户端进程：等待导出请求，写入导出文件夹，然后一直运行到被关闭"""
+    config = load_config(client_path)
+    os.makedirs(session_dir, exist_ok=True)
+    _write_atomic(os.path.join(session_dir, PID_NAME), str(os.getpid()).encode("ascii"))
+    request_path = os.path.join(session_dir, REQUEST_NAME)
+    exported = False
+    while os.path.isdir(session_dir):
+        if not exported and os.path.exists(request_path):
+            exported = True
+            os.makedirs(downloads, exist_ok=True)
+            write_export(downloads, config, os.path.basename(os.path.dirname(client_path)))
+            _write_atomic(os.path.join(session_dir, DONE_NAME), b"")
+        time.sleep(POLL_INTERVAL)
+    return 0
+
+
+def main(argv):
+    if len(argv) == 4 and argv[0] == "client":
+        return client_main(*argv[1:])
+    print("用法: python fake_telegram.py client <可执行文件> <会话目录> <下载目录>")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
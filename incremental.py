@@ -0,0 +1,245 @@
+"""
+增量导出 - 将新导出合并到已有的导出目录，并记录每个客户端的导出状态
+
+每个客户端导出目录中保存一个状态文件，记录上次导出时间和每个聊天的最后一条消息ID。
+再次导出时不再删除已有目录：result.json按聊天合并新消息，已存在且大小相同的媒体文件直接跳过；
+新导出中已经没有的聊天和消息（例如已被删除的历史）保留在已有目录中。
+
+导出对话框的日期范围还不能按上次导出的日期设置（缺少对应控件的截图），客户端每次仍导出全部历史，
+增量模式目前不缩短导出时间；状态文件中记录的最后消息ID供之后设置日期范围时使用。
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+import threading
+
+from result_stream import ResultWriter, chat_last_ids, iter_events, read_outline
+
+STATE_NAME = "export_state.json"     # 每个客户端导出目录中的状态文件名
+RESULT_NAME = "result.json"
+CHAT_SECTIONS = ("chats", "left_chats")
+REPLACE_EXTENSIONS = (".html", ".css", ".js")  # 每次导出都会重新生成的页面文件，始终使用最新版本
+
+
+def _spool_messages(path, spool):
+    """
+    将新导出中的消息逐条写入临时文件（每行为消息ID和消息JSON，以制表符分隔），只保留每个聊天在临时文件中的位置
+
+    返回: {分区: [(位置, 消息数), ...]} - 与read_outline中的聊天按顺序一一对应
+    """
+    ranges = {}
+    start = count = None
+    for event, section, data in iter_events(path):
+        if event == "chat":
+            start, count = spool.tell(), 0
+        elif event == "message":
+            message_id = data.get("id")
+            spool.write(f"{message_id if isinstance(message_id, int) else ''}\t"
+                        f"{json.dumps(data, ensure_ascii=False)}\n".encode("utf-8"))
+            count += 1
+        elif event == "chat_end":
+            ranges.setdefault(section, []).append((start, count))
+    return ranges
+
+
+def _spooled(spool, position, after_id=None):
+    """读取临时文件中一个聊天的消息，after_id不为None时只返回ID大于after_id的消息  产生: 消息JSON文本"""
+    start, count = position
+    spool.seek(start)
+    for _ in range(count):
+        message_id, encoded = spool.readline().decode("utf-8").rstrip("\n").split("\t", 1)
+        if after_id is None or (message_id and int(message_id) > after_id):
+            yield encoded
+
+
+def merge_results(old_path, new_path, output_path):
+    """
+    将新导出的result.json合并到已有的result.json，流式读写，内存占用与文件大小无关
+
+    聊天按ID对应，只追加ID大于已有最后一条消息的新消息；新出现的聊天整体追加；
+    聊天信息和其余顶层字段（个人信息、联系人等）使用新导出的内容。
+    新导出的消息先写入output_path旁的临时文件，再随已有聊天的消息一起写入output_path。
+
+    返回: (新消息数, 新聊天数)
+    """
+    old = read_outline(old_path)
+    new = read_outline(new_path)
+    new_messages = new_chats = 0
+    with tempfile.TemporaryFile(dir=os.path.dirname(output_path) or None) as spool:
+        spooled = _spool_messages(new_path, spool)
+        with open(output_path, "w", encoding="utf-8") as f:
+            writer = ResultWriter(f)
+            order = new["order"] + [key for key in old["order"] if key not in new["order"]]
+            for key in order:
+                if key not in CHAT_SECTIONS or (key not in old["sections"] and key not in new["sections"]):
+                    writer.field(key, new["fields"][key] if key in new["fields"] else old["fields"][key])
+                    continue
+                old_section = old["sections"].get(key, {"fields": {}, "chats": []})
+                new_section = new["sections"].get(key, {"fields": {}, "chats": []})
+                new_ids = {chat.get("id"): index for index, chat in enumerate(new_section["chats"])}
+                positions = spooled.get(key, [])
+                writer.begin_section(key, dict(old_section["fields"], **new_section["fields"]))
+
+                # 已有的聊天：先写已有消息，再追加新导出中ID更大的消息
+                merged = set()
+                chat_index = -1
+                current = None
+                last_id = 0
+                for event, _, data in (iter_events(old_path, sections=(key,)) if old_section["chats"] else ()):
+                    if event == "chat":
+                        chat_index += 1
+                        header = old_section["chats"][chat_index]
+                        current = new_ids.get(header.get("id"))
+                        writer.begin_chat(new_section["chats"][current] if current is not None else header)
+                        last_id = 0
+                    elif event == "message":
+                        writer.message(data)
+                        if isinstance(data.get("id"), int):
+                            last_id = max(last_id, data["id"])
+                    elif event == "chat_end":
+                        if current is not None and current < len(positions):
+                            merged.add(current)
+                            for encoded in _spooled(spool, positions[current], last_id):
+                                writer.message(None, encoded)
+                                new_messages += 1
+                        writer.end_chat()
+
+                # 新出现的聊天整体追加
+                for index, header in enumerate(new_section["chats"]):
+                    if index in merged or index >= len(positions):
+                        continue
+                    writer.begin_chat(header)
+                    for encoded in _spooled(spool, positions[index]):
+                        writer.message(None, encoded)
+                        new_messages += 1
+                    writer.end_chat()
+                    new_chats += 1
+                writer.end_section()
+            writer.close()
+    return new_messages, new_chats
+
+
+def _move_file(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+
+
+class IncrementalMerger:
+    """
+    增量导出的合并与状态记录
+
+    configure(True)后启用；目标目录已有上次的导出时merge_export合并新导出，否则按完整导出处理。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def configure(self, enabled):
+        """启用或停用增量模式"""
+        self.enabled = bool(enabled)
+
+    def reset_stats(self):
+        """重置统计计数（每次运行开始时调用）"""
+        with self._lock:
+            self.merged = 0          # 合并到已有目录的客户端数
+            self.new_messages = 0    # 合并的新消息数
+            self.skipped_files = 0   # 已存在而跳过的媒体文件数
+            self.skipped_bytes = 0
+
+    def stats(self):
+        """返回增量合并统计"""
+        with self._lock:
+            return {
+                "merged": self.merged,
+                "new_messages": self.new_messages,
+                "skipped_files": self.skipped_files,
+                "skipped_bytes": self.skipped_bytes,
+            }
+
+    @staticmethod
+    def load_state(export_path):
+        """读取客户端导出目录中的状态文件，不存在或损坏时返回None"""
+        path = os.path.join(export_path, STATE_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logging.warning(f"读取导出状态失败，将重新完整导出: {path} - {str(e)}")
+            return None
+
+    def can_merge(self, export_path):
+        """增量模式已启用且目标目录中已有上次的导出（有状态文件或result.json）"""
+        if not self.enabled:
+            return False
+        return (self.load_state(export_path) is not None
+                or os.path.exists(os.path.join(export_path, RESULT_NAME)))
+
+    @staticmethod
+    def write_state(export_path):
+        """根据导出目录中的result.json写入状态文件（流式读取，不整体加载result.json）"""
+        result_path = os.path.join(export_path, RESULT_NAME)
+        state = {"last_export": time.strftime("%Y-%m-%d %H:%M:%S"), "chats": {}}
+        if os.path.exists(result_path):
+            state["chats"] = chat_last_ids(result_path)
+        tmp_path = os.path.join(export_path, STATE_NAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, os.path.join(export_path, STATE_NAME))
+        return state
+
+    def merge_export(self, source, target):
+        """
+        将新导出的文件夹source合并到已有的导出目录target，完成后删除source
+
+        返回: dict - new_messages, new_chats, added_files, skipped_files
+        """
+        new_messages = new_chats = added = skipped = skipped_bytes = 0
+
+        # 合并result.json
+        new_result_path = os.path.join(source, RESULT_NAME)
+        old_result_path = os.path.join(target, RESULT_NAME)
+        if os.path.exists(new_result_path):
+            if os.path.exists(old_result_path):
+                tmp_path = old_result_path + ".tmp"
+                new_messages, new_chats = merge_results(old_result_path, new_result_path, tmp_path)
+                os.replace(tmp_path, old_result_path)
+                os.remove(new_result_path)
+            else:
+                _move_file(new_result_path, old_result_path)
+
+        # 合并其余文件：页面文件始终替换，已存在且大小相同的媒体文件跳过
+        for current, dirs, names in os.walk(source):
+            for name in names:
+                path = os.path.join(current, name)
+                target_path = os.path.join(target, os.path.relpath(path, source))
+                size = os.path.getsize(path)
+                if (not name.lower().endswith(REPLACE_EXTENSIONS) and os.path.exists(target_path)
+                        and os.path.getsize(target_path) == size):
+                    os.remove(path)
+                    skipped += 1
+                    skipped_bytes += size
+                    continue
+                _move_file(path, target_path)
+                added += 1
+        shutil.rmtree(source, ignore_errors=True)
+
+        self.write_state(target)
+        with self._lock:
+            self.merged += 1
+            self.new_messages += new_messages
+            self.skipped_files += skipped
+            self.skipped_bytes += skipped_bytes
+        return {
+            "new_messages": new_messages,
+            "new_chats": new_chats,
+            "added_files": added,
+            "skipped_files": skipped,
+        }
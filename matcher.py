@@ -0,0 +1,120 @@
+"""
+模板匹配引擎 - 在一帧屏幕截图上匹配一个或多个界面元素截图
+
+本模块只处理内存中的图像数组，不负责截屏和点击，便于在无显示环境下复用。
+"""
+
+from collections import namedtuple
+
+import cv2
+
+# 与pyautogui.locateOnScreen返回值兼容的位置结构，可直接传给pyautogui.center
+Box = namedtuple("Box", ["left", "top", "width", "height"])
+
+
+def to_gray(frame):
+    """将BGR/BGRA/灰度帧统一转换为灰度图"""
+    if frame.ndim == 2:
+        return frame
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def match_score(haystack_gray, needle_gray):
+    """
+    返回needle在haystack中的最佳匹配得分和位置
+    返回: (float, (x, y)) - 归一化相关系数得分和左上角坐标；needle大于haystack时返回(-1.0, None)
+    """
+    if (needle_gray.shape[0] > haystack_gray.shape[0]
+            or needle_gray.shape[1] > haystack_gray.shape[1]):
+        return -1.0, None
+    result = cv2.matchTemplate(haystack_gray, needle_gray, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_val, max_loc
+
+
+def match_template(haystack_gray, needle_gray, confidence=0.7, offset=(0, 0)):
+    """
+    在灰度帧中查找单个模板
+
+    参数:
+        haystack_gray: 灰度屏幕帧
+        needle_gray: 灰度模板
+        confidence: 最低匹配得分
+        offset: 帧左上角在屏幕上的坐标，用于把结果换算为屏幕坐标
+
+    返回:
+        Box或None
+    """
+    score, loc = match_score(haystack_gray, needle_gray)
+    if loc is None or score < confidence:
+        return None
+    height, width = needle_gray.shape[:2]
+    return Box(loc[0] + offset[0], loc[1] + offset[1], width, height)
+
+
+def match_templates(haystack_gray, needles, confidence=0.7, offset=(0, 0)):
+    """
+    在同一帧上批量匹配多个模板
+
+    参数:
+        haystack_gray: 灰度屏幕帧（只截屏一次）
+        needles: dict - 名称 -> 灰度模板
+        confidence: 最低匹配得分
+        offset: 帧左上角在屏幕上的坐标
+
+    返回:
+        dict: 名称 -> Box，只包含找到的模板
+    """
+    found = {}
+    for name, needle_gray in needles.items():
+        box = match_template(haystack_gray, needle_gray, confidence, offset)
+        if box is not None:
+            found[name] = box
+    return found
+
+
+def match_scales(haystack_gray, needles_at, scales, confidence=0.7, offset=(0, 0), coarse=2, candidates=2):
+    """
+    在多个缩放比例上查找模板（屏幕缩放比例与截图时不同）
+
+    先把帧缩小coarse倍，用同样缩小的模板在所有比例上粗搜，
+    再按粗搜得分从高到低，在原分辨率上、粗搜位置附近验证最多candidates个比例。
+
+    参数:
+        haystack_gray: 灰度屏幕帧
+        needles_at: 可调用对象，以缩放比例调用，返回 dict - 名称 -> 该比例下的灰度模板
+        scales: 需要搜索的缩放比例
+        confidence: 最低匹配得分（原分辨率验证时使用）
+        offset: 帧左上角在屏幕上的坐标
+        coarse: 粗搜时的缩小倍数
+        candidates: 在原分辨率上验证的比例数量上限
+
+    返回:
+        (名称, Box, 缩放比例, 得分) 或 None
+    """
+    if not scales:
+        return None
+    height, width = haystack_gray.shape[:2]
+    small = cv2.resize(haystack_gray, (max(1, width // coarse), max(1, height // coarse)),
+                       interpolation=cv2.INTER_AREA)
+    ranked = []
+    for scale in scales:
+        for name, needle in needles_at(scale / coarse).items():
+            score, loc = match_score(small, needle)
+            if loc is not None:
+                ranked.append((score, scale, name, loc))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    margin = 2 * coarse
+    for _, scale, name, loc in ranked[:candidates]:
+        # 只在粗搜位置附近验证
+        needle = needles_at(scale)[name]
+        x = max(0, loc[0] * coarse - margin)
+        y = max(0, loc[1] * coarse - margin)
+        window = haystack_gray[y:y + needle.shape[0] + 2 * margin, x:x + needle.shape[1] + 2 * margin]
+        score, loc = match_score(window, needle)
+        if loc is not None and score >= confidence:
+            box = Box(offset[0] + x + loc[0], offset[1] + y + loc[1], needle.shape[1], needle.shape[0])
+            return name, box, scale, score
+    return None
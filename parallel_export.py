@@ -0,0 +1,340 @@
+"""
+并行导出 - 为每个工作进程启动独立的虚拟显示（Xvfb），多个客户端同时导出
+
+每个工作进程拥有独立的显示、鼠标键盘输入和HOME目录（下载目录、wine前缀互不干扰），
+只关闭自己启动的客户端进程。仅支持Linux；Windows的模拟输入只能作用于当前活动桌面，
+无法为多个客户端提供互相隔离的输入。
+"""
+
+import os
+import sys
+import time
+import queue
+import shutil
+import logging
+import threading
+import subprocess
+import multiprocessing
+
+from retry import ExportFailure, ERROR
+
+WORKER_SCREEN = "1920x1080x24"          # 虚拟显示的分辨率和色深，应与截图时的分辨率一致
+WORKER_HOME_DIR = "worker_sessions"     # 工作进程独立HOME目录的存放位置（保留登录状态和wine前缀）
+FIRST_DISPLAY = 90                      # 从该编号开始查找空闲的显示编号
+DISPLAY_START_TIMEOUT = 10              # 等待虚拟显示启动的超时（秒）
+WORKER_POLL_INTERVAL = 1.0              # 父进程检查工作进程状态的间隔（秒）
+
+# 启动工作进程时需要临时修改os.environ，子进程在导入pyautogui之前就要拿到正确的DISPLAY
+_environ_lock = threading.Lock()
+
+
+def parallel_supported():
+    """当前环境是否支持为每个工作进程提供独立的显示会话"""
+    return sys.platform != "win32" and shutil.which("Xvfb") is not None
+
+
+def _free_display(start=FIRST_DISPLAY):
+    """查找未被占用的X显示编号"""
+    number = start
+    while os.path.exists(f"/tmp/.X{number}-lock") or os.path.exists(f"/tmp/.X11-unix/X{number}"):
+        number += 1
+    return number
+
+
+class XvfbDisplay:
+    """一个虚拟X显示，启动后可通过DISPLAY环境变量使用"""
+
+    def __init__(self, number, screen=WORKER_SCREEN):
+        self.number = number
+        self.screen = screen
+        self.process = None
+
+    @property
+    def name(self):
+        return f":{self.number}"
+
+    def start(self, timeout=DISPLAY_START_TIMEOUT):
+        """启动Xvfb并等待其开始监听，失败时抛出RuntimeError"""
+        self.process = subprocess.Popen(
+            ["Xvfb", self.name, "-screen", "0", self.screen, "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        socket_path = f"/tmp/.X11-unix/X{self.number}"
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"虚拟显示 {self.name} 启动失败（退出码 {self.process.returncode}）")
+            if os.path.exists(socket_path):
+                logging.info(f"虚拟显示已启动: {self.name} ({self.screen})")
+                return self
+            time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f"等待虚拟显示 {self.name} 启动超时")
+
+    def stop(self):
+        """关闭虚拟显示"""
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def _worker_main(worker_id, export_dir, tasks, results, dedup_root=None, incremental=False, pack=None,
+                 journal=None, attempt=1, trace=None):
+    """
+    工作进程入口：在自己的显示会话中依次导出分配到的客户端
+
+    DISPLAY和HOME已由父进程在启动前设置好，这里才导入主模块，
+    使pyautogui和下载目录都指向本工作进程的会话。
+    """
+    import TG_DataExporter as exporter
+
+    # 只关闭本进程启动的客户端，不影响其他工作进程
+    exporter.PROCESS_TRACKER.only_spawned = True
+    exporter.TEMPLATES.reset_stats()
+    exporter.ROI_HINTS.reset_stats()
+    exporter.SCALE_HINTS.reset_stats()
+    exporter.TRANSFERS.reset_stats()
+    exporter.POSTPROCESS.reset_stats()
+    exporter.DEDUP_STORE.configure(dedup_root)
+    exporter.INCREMENTAL.configure(incremental)
+    exporter.PACKER.reset_stats()
+    if pack:
+        exporter.PACKER.configure(True, pack["remove_source"], pack["segment_size"])
+    # 与父进程写入同一个运行日志
+    if journal:
+        exporter.JOURNAL.configure(*journal)
+    # 重试轮次中同样放宽界面元素的匹配条件
+    exporter.RETRY.reset_stats()
+    exporter.RETRY.attempt = attempt
+    # 与父进程写入同一个追踪文件
+    exporter.TRACER.reset_stats()
+    exporter.CAPTURE.reset_stats()
+    if trace:
+        exporter.TRACER.configure(*trace)
+
+    def callback(message):
+        results.put(("log", worker_id, message))
+
+    try:
+        for language in exporter.SUPPORTED_LANGUAGES:
+            exporter.check_screenshot_dir(language)
+    except Exception as e:
+        results.put(("log", worker_id, f"截图文件检查失败: {str(e)}"))
+        results.put(("exit", worker_id, None))
+        return
+
+    watcher = exporter.ExportFolderWatcher(exporter.DOWNLOADS_PATH, exporter.EXPORT_QUIET_SECONDS,
+                                           exporter.EXPORT_SETTLE_SECONDS)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            idx, client_info = task
+            results.put(("start", worker_id, idx))
+            success, entry = exporter.export_client(client_info, export_dir, watcher, callback)
+            results.put(("done", worker_id, idx, success, entry))
+            exporter.wait_for_settle(timeout=5)
+    finally:
+        watcher.close()
+        exporter.cleanup_download_folders(watcher)
+        results.put(("exit", worker_id, {
+            "template_cache": exporter.TEMPLATES.stats(),
+            "roi_hints": exporter.ROI_HINTS.stats(),
+            "scale_hints": exporter.SCALE_HINTS.stats(),
+            "transfers": exporter.TRANSFERS.stats(),
+            "postprocess": exporter.POSTPROCESS.outcomes(),
+            "dedup": exporter.DEDUP_STORE.stats(),
+            "incremental": exporter.INCREMENTAL.stats(),
+            "pack": exporter.PACKER.stats(),
+            "failures": exporter.RETRY.failures(),
+            "hints": exporter.ROI_HINTS.snapshot(),
+            "scales": exporter.SCALE_HINTS.snapshot(),
+            "timings": exporter.HISTORY.snapshot(),
+            "trace": exporter.TRACER.stats(),
+            "capture": exporter.CAPTURE.stats(),
+        }))
+
+
+def merge_stats(total, stats):
+    """累加工作进程的统计数据（模板数量、提示数量取最大值，吞吐量按累计值重新计算）"""
+    for key, value in stats.items():
+        if key in ("templates", "hints"):
+            total[key] = max(total.get(key, 0), value)
+        elif key != "mbps":
+            total[key] = total.get(key, 0) + value
+    if "mbps" in stats:
+        seconds = total.get("seconds", 0)
+        total["mbps"] = total.get("bytes", 0) / 1024 / 1024 / seconds if seconds > 0 else 0.0
+
+
+def run_parallel(clients, export_dir, workers, callback=None, on_start=None, dedup_root=None,
+                 incremental=False, pack=None, journal=None, attempt=1, trace=None):
+    """
+    使用多个工作进程并行导出客户端
+
+    参数:
+        clients: [{"path": 可执行文件路径, "root_dir_name": 根目录名称}]
+        export_dir: 导出目录
+        workers: 工作进程数
+        callback: 可选的回调函数，接收日志消息
+        on_start: 可选的回调函数，客户端开始处理时以(序号, 客户端信息)调用
+        dedup_root: 去重存储目录，为None时不去重
+        incremental: 是否启用增量模式
+        pack: 打包配置 {"remove_source", "segment_size"}，为None时不打包
+        journal: 运行日志 (文件路径, 运行编号)，为None时不记录
+        attempt: 当前导出轮次（重试轮次大于1）
+        trace: 追踪文件 (文件路径, 格式)，为None时只汇总统计
+
+    返回:
+        dict: success_list, failed_list, template_cache, roi_hints, scale_hints, transfers, postprocess, dedup, incremental, pack, capture, failures, hints, scales, timings, trace
+    """
+    workers = max(1, min(workers, len(clients)))
+    context = multiprocessing.get_context("spawn")
+    tasks = context.Queue()
+    results = context.Queue()
+    for idx, client_info in enumerate(clients, 1):
+        tasks.put((idx, client_info))
+    for _ in range(workers):
+        tasks.put(None)
+
+    displays = []
+    processes = {}
+    outcomes = {}                   # 序号 -> (是否成功, 结果条目)
+    in_flight = {}                  # 工作进程编号 -> 正在处理的客户端序号
+    stats = {"template_cache": {}, "roi_hints": {}, "scale_hints": {}, "transfers": {}, "dedup": {}, "incremental": {},
+             "pack": {}, "capture": {}}
+    hints = {}
+    scales = {}
+    timings = []
+    traces = []                     # 各工作进程按步骤汇总的耗时统计
+    postprocess = []
+    failures = {}                   # 客户端路径 -> ExportFailure
+    try:
+        display_number = FIRST_DISPLAY
+        for worker_id in range(1, workers + 1):
+            display_number = _free_display(display_number)
+            try:
+                display = XvfbDisplay(display_number).start()
+            except RuntimeError as e:
+                # 已启动的工作进程会处理完队列中的全部客户端
+                logging.error(f"{str(e)}，使用已启动的 {len(processes)} 个工作进程继续")
+                break
+            displays.append(display)
+            display_number += 1
+
+            home = os.path.abspath(os.path.join(WORKER_HOME_DIR, f"worker_{worker_id}"))
+            os.makedirs(home, exist_ok=True)
+
+            process = context.Process(
+                target=_worker_main,
+                args=(worker_id, export_dir, tasks, results, dedup_root, incremental, pack, journal, attempt, trace),
+                name=f"export-worker-{worker_id}",
+                daemon=True
+            )
+            with _environ_lock:
+                saved = {k: os.environ.get(k) for k in ("DISPLAY", "HOME")}
+                os.environ["DISPLAY"] = display.name
+                os.environ["HOME"] = home
+                try:
+                    process.start()
+                finally:
+                    for k, v in saved.items():
+                        if v is None:
+                            os.environ.pop(k, None)
+                        else:
+                            os.environ[k] = v
+            processes[worker_id] = process
+            message = f"工作进程 {worker_id} 已启动（显示 {display.name}）"
+            if callback:
+                callback(message)
+            logging.info(message)
+
+        if not processes:
+            raise RuntimeError("无法启动任何虚拟显示")
+
+        running = set(processes)
+        while running:
+            try:
+                message = results.get(timeout=WORKER_POLL_INTERVAL)
+            except queue.Empty:
+                # 工作进程异常退出时，将其正在处理的客户端记为失败
+                for worker_id in list(running):
+                    if not processes[worker_id].is_alive():
+                        running.discard(worker_id)
+                        idx = in_flight.pop(worker_id, None)
+                        logging.error(f"工作进程 {worker_id} 异常退出（退出码 {processes[worker_id].exitcode}）")
+                        if idx is not None:
+                            outcomes[idx] = (False, os.path.dirname(clients[idx - 1]["path"]))
+                continue
+
+            kind, worker_id = message[0], message[1]
+            if kind == "log":
+                if callback:
+                    callback(f"[工作进程 {worker_id}] {message[2]}")
+            elif kind == "start":
+                in_flight[worker_id] = message[2]
+                if on_start:
+                    on_start(message[2], clients[message[2] - 1])
+            elif kind == "done":
+                _, _, idx, success, entry = message
+                in_flight.pop(worker_id, None)
+                outcomes[idx] = (success, entry)
+            elif kind == "exit":
+                running.discard(worker_id)
+                if message[2]:
+                    merge_stats(stats["template_cache"], message[2]["template_cache"])
+                    merge_stats(stats["roi_hints"], message[2]["roi_hints"])
+                    merge_stats(stats["scale_hints"], message[2]["scale_hints"])
+                    merge_stats(stats["transfers"], message[2]["transfers"])
+                    postprocess.extend(message[2]["postprocess"])
+                    merge_stats(stats["dedup"], message[2]["dedup"])
+                    merge_stats(stats["incremental"], message[2]["incremental"])
+                    merge_stats(stats["pack"], message[2]["pack"])
+                    merge_stats(stats["capture"], message[2]["capture"])
+                    failures.update(message[2]["failures"])
+                    hints.update(message[2]["hints"])
+                    scales.update(message[2]["scales"])
+                    timings.extend(message[2]["timings"])
+                    traces.append(message[2]["trace"])
+    finally:
+        for process in processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for display in displays:
+            display.stop()
+
+    # 队列中未被取走的客户端（所有工作进程都已退出）同样记为失败
+    success_list = []
+    failed_list = []
+    for idx, client_info in enumerate(clients, 1):
+        success, entry = outcomes.get(idx, (False, os.path.dirname(client_info["path"])))
+        (success_list if success else failed_list).append(entry)
+        if not success and client_info["path"] not in failures:
+            failures[client_info["path"]] = ExportFailure(ERROR, "工作进程异常退出")
+
+    return {
+        "success_list": success_list,
+        "failed_list": failed_list,
+        "template_cache": stats["template_cache"],
+        "roi_hints": stats["roi_hints"],
+        "scale_hints": stats["scale_hints"],
+        "transfers": stats["transfers"],
+        "postprocess": postprocess,
+        "dedup": stats["dedup"],
+        "incremental": stats["incremental"],
+        "pack": stats["pack"],
+        "capture": stats["capture"],
+        "failures": failures,
+        "hints": hints,
+        "scales": scales,
+        "timings": timings,
+        "trace": traces,
+    }
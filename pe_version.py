@@ -0,0 +1,223 @@
+"""
+PE版本信息读取 - 纯Python解析Windows可执行文件中的VS_VERSIONINFO资源
+
+只按需读取文件头和版本资源所在的少量字节，不依赖win32api，可在任何平台上运行。
+"""
+
+import struct
+
+RT_VERSION = 16                 # 版本信息资源类型
+VS_FIXEDFILEINFO_SIGNATURE = 0xFEEF04BD
+MAX_VERSION_RESOURCE_SIZE = 1024 * 1024  # 版本资源大小上限，防止读取损坏文件时占用过多内存
+
+
+class PEFormatError(ValueError):
+    """文件不是有效的PE文件或结构损坏"""
+
+
+def _align4(offset):
+    return (offset + 3) & ~3
+
+
+class _PEReader:
+    """按需从文件中读取PE结构"""
+
+    def __init__(self, f):
+        self.f = f
+        self.sections = []      # [(虚拟地址, 虚拟大小, 文件偏移, 文件大小)]
+        self.resource_rva = 0
+        self._parse_headers()
+
+    def _read(self, offset, size):
+        self.f.seek(offset)
+        data = self.f.read(size)
+        if len(data) != size:
+            raise PEFormatError("文件被截断")
+        return data
+
+    def _parse_headers(self):
+        dos_header = self._read(0, 64)
+        if dos_header[:2] != b"MZ":
+            raise PEFormatError("缺少MZ文件头")
+        pe_offset = struct.unpack_from("<I", dos_header, 0x3C)[0]
+        if self._read(pe_offset, 4) != b"PE\0\0":
+            raise PEFormatError("缺少PE签名")
+
+        coff = self._read(pe_offset + 4, 20)
+        num_sections, optional_size = struct.unpack_from("<H12xH", coff, 2)
+        optional_offset = pe_offset + 24
+        optional = self._read(optional_offset, optional_size)
+        magic = struct.unpack_from("<H", optional, 0)[0]
+        if magic == 0x10B:      # PE32
+            count_offset, dirs_offset = 92, 96
+        elif magic == 0x20B:    # PE32+
+            count_offset, dirs_offset = 108, 112
+        else:
+            raise PEFormatError(f"未知的可选头类型: {magic:#x}")
+
+        num_dirs = struct.unpack_from("<I", optional, count_offset)[0]
+        if num_dirs > 2 and dirs_offset + 24 <= len(optional):
+            self.resource_rva = struct.unpack_from("<I", optional, dirs_offset + 16)[0]
+
+        section_table = self._read(optional_offset + optional_size, num_sections * 40)
+        for i in range(num_sections):
+            virtual_size, virtual_address, raw_size, raw_pointer = struct.unpack_from(
+                "<IIII", section_table, i * 40 + 8
+            )
+            self.sections.append((virtual_address, max(virtual_size, raw_size), raw_pointer, raw_size))
+
+    def read_rva(self, rva, size):
+        """按RVA读取数据"""
+        for virtual_address, virtual_size, raw_pointer, raw_size in self.sections:
+            if virtual_address <= rva < virtual_address + virtual_size:
+                delta = rva - virtual_address
+                if delta + size > raw_size:
+                    raise PEFormatError("资源数据超出节范围")
+                return self._read(raw_pointer + delta, size)
+        raise PEFormatError(f"RVA不在任何节中: {rva:#x}")
+
+    def _directory_entries(self, offset):
+        """读取资源目录，返回[(名称或ID, 是否为ID, 是否子目录, 偏移)]"""
+        header = self.read_rva(self.resource_rva + offset, 16)
+        named, ids = struct.unpack_from("<HH", header, 12)
+        count = named + ids
+        raw = self.read_rva(self.resource_rva + offset + 16, count * 8)
+        entries = []
+        for i in range(count):
+            name, target = struct.unpack_from("<II", raw, i * 8)
+            entries.append((name & 0x7FFFFFFF, not name & 0x80000000,
+                            bool(target & 0x80000000), target & 0x7FFFFFFF))
+        return entries
+
+    def version_resource(self):
+        """返回版本资源的原始字节，不存在时返回None"""
+        if not self.resource_rva:
+            return None
+        entry = None
+        for name, is_id, is_dir, target in self._directory_entries(0):
+            if is_id and name == RT_VERSION and is_dir:
+                entry = target
+                break
+        if entry is None:
+            return None
+        # 第二层为资源名称，第三层为语言，均取第一个条目
+        is_dir = True
+        for _ in range(2):
+            entries = self._directory_entries(entry)
+            if not entries:
+                return None
+            _, _, is_dir, entry = entries[0]
+            if not is_dir:
+                break
+        if is_dir:
+            raise PEFormatError("资源目录层级无效")
+        data_rva, size = struct.unpack_from("<II", self.read_rva(self.resource_rva + entry, 16), 0)
+        if size > MAX_VERSION_RESOURCE_SIZE:
+            raise PEFormatError("版本资源过大")
+        return self.read_rva(data_rva, size)
+
+
+def _parse_block(data, offset):
+    """
+    解析一个版本信息块（VS_VERSIONINFO/StringFileInfo/StringTable/String/Var）
+    返回: (键, 值类型, 值字节, 子块起始偏移, 块结束偏移)
+    """
+    if offset + 6 > len(data):
+        raise PEFormatError("版本信息块被截断")
+    length, value_length, value_type = struct.unpack_from("<HHH", data, offset)
+    if length < 6:
+        raise PEFormatError("版本信息块长度无效")
+    end = min(offset + length, len(data))
+
+    key_start = offset + 6
+    key_end = key_start
+    while key_end + 1 < end and data[key_end:key_end + 2] != b"\0\0":
+        key_end += 2
+    key = data[key_start:key_end].decode("utf-16-le", errors="replace")
+
+    value_start = _align4(key_end + 2)
+    value_size = value_length * 2 if value_type == 1 else value_length
+    value_end = min(value_start + value_size, end)
+    value = data[value_start:value_end]
+    return key, value_type, value, _align4(value_end), end
+
+
+def _children(data, start, end):
+    """遍历子块"""
+    offset = start
+    while offset < end:
+        block = _parse_block(data, offset)
+        yield block
+        offset = _align4(block[4])
+
+
+def parse_version_info(data):
+    """
+    解析VS_VERSIONINFO资源
+
+    返回:
+        dict: file_version - 文件版本元组；translations - [(语言, 代码页)]；
+              string_tables - {"040904b0": {字段名: 值}}；strings - 首个语言对应的字段
+    """
+    key, _, value, children_start, end = _parse_block(data, 0)
+    if key != "VS_VERSION_INFO":
+        raise PEFormatError(f"版本资源键名无效: {key}")
+
+    file_version = None
+    if len(value) >= 16:
+        signature, _, version_ms, version_ls = struct.unpack_from("<IIII", value, 0)
+        if signature == VS_FIXEDFILEINFO_SIGNATURE:
+            file_version = (version_ms >> 16, version_ms & 0xFFFF, version_ls >> 16, version_ls & 0xFFFF)
+
+    translations = []
+    string_tables = {}
+    for child_key, _, _, child_start, child_end in _children(data, children_start, end):
+        if child_key == "StringFileInfo":
+            for table_key, _, _, table_start, table_end in _children(data, child_start, child_end):
+                table = {}
+                for name, _, text, _, _ in _children(data, table_start, table_end):
+                    table[name] = text.decode("utf-16-le", errors="replace").split("\0", 1)[0]
+                string_tables[table_key.lower()] = table
+        elif child_key == "VarFileInfo":
+            for var_key, _, var_value, _, _ in _children(data, child_start, child_end):
+                if var_key == "Translation":
+                    for i in range(0, len(var_value) - 3, 4):
+                        translations.append(struct.unpack_from("<HH", var_value, i))
+
+    strings = {}
+    for lang, codepage in translations:
+        strings = string_tables.get(f"{lang:04x}{codepage:04x}", {})
+        if strings:
+            break
+    if not strings and string_tables:
+        strings = next(iter(string_tables.values()))
+
+    return {
+        "file_version": file_version,
+        "translations": translations,
+        "string_tables": string_tables,
+        "strings": strings,
+    }
+
+
+def read_version_info(path):
+    """
+    读取可执行文件的版本信息
+
+    返回:
+        dict（见parse_version_info）；文件没有版本资源时返回None
+    异常:
+        PEFormatError - 不是有效的PE文件；OSError - 文件无法读取
+    """
+    with open(path, "rb") as f:
+        data = _PEReader(f).version_resource()
+    if data is None:
+        return None
+    return parse_version_info(data)
+
+
+def format_version(file_version):
+    """将版本元组格式化为a.b.c.d字符串"""
+    if not file_version:
+        return ""
+    return ".".join(str(part) for part in file_version)
@@ -0,0 +1,78 @@
+"""
+后台后处理队列 - 导出文件转移、截图移动和下载目录清理在线程池中执行，界面自动化线程不再等待
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
+
+DEFAULT_WORKERS = 2        # 同时执行的后处理任务数（主要是磁盘I/O）
+DEFAULT_MAX_PENDING = 4    # 排队和执行中的任务上限，超过时提交方等待，避免积压过多导出占用下载目录空间
+
+
+class PostProcessQueue:
+    """
+    有界的后处理任务队列
+
+    submit提交任务后立即返回（队列已满时等待空位）；drain等待所有已提交任务完成，
+    outcomes返回每个任务的执行结果。
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="postprocess")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._futures = []
+        self._outcomes = []
+
+    def _run(self, name, kind, func, args):
+        start = time.monotonic()
+        outcome = {"name": name, "kind": kind, "ok": True, "error": None}
+        try:
+            func(*args)
+        except Exception as e:
+            outcome.update(ok=False, error=str(e))
+            logging.error(f"后处理任务失败 [{kind}] {name}: {str(e)}")
+        finally:
+            outcome["seconds"] = time.monotonic() - start
+            with self._lock:
+                self._outcomes.append(outcome)
+            self._slots.release()
+        return outcome
+
+    def submit(self, name, kind, func, *args):
+        """
+        提交后处理任务
+
+        参数:
+            name: 任务对象名称（通常为客户端目录名或文件夹名）
+            kind: 任务类型，如"relocate"、"cleanup"
+            func: 任务函数，抛出异常表示失败
+            args: 传给func的参数
+        """
+        self._slots.acquire()
+        future = self._pool.submit(self._run, name, kind, func, args)
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def drain(self):
+        """等待所有已提交的任务完成"""
+        while True:
+            with self._lock:
+                futures = [f for f in self._futures if not f.done()]
+                self._futures = futures
+            if not futures:
+                return
+            futures_wait(futures)
+
+    def outcomes(self):
+        """返回已完成任务的结果列表：name, kind, ok, error, seconds"""
+        with self._lock:
+            return list(self._outcomes)
+
+    def reset_stats(self):
+        """清空任务结果（每次运行开始时调用）"""
+        with self._lock:
+            self._outcomes = []
@@ -0,0 +1,286 @@
+"""
+进程管理 - 记录由本程序启动的客户端进程，通过原生接口枚举进程并按PID关闭
+
+Windows下通过Toolhelp快照和QueryFullProcessImageNameW枚举进程，Linux下读取/proc，
+替代已弃用且很慢的wmic。
+"""
+
+import os
+import sys
+import time
+import signal
+import logging
+import threading
+import subprocess
+from collections import namedtuple
+
+ProcessInfo = namedtuple("ProcessInfo", ["pid", "ppid", "exe_path"])
+
+
+def _list_processes_windows():
+    """通过Toolhelp快照枚举进程（Windows）"""
+    import ctypes
+    from ctypes import wintypes
+
+    TH32CS_SNAPPROCESS = 0x00000002
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+
+    class PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [
+            ("dwSize", wintypes.DWORD),
+            ("cntUsage", wintypes.DWORD),
+            ("th32ProcessID", wintypes.DWORD),
+            ("th32DefaultHeapID", ctypes.c_size_t),
+            ("th32ModuleID", wintypes.DWORD),
+            ("cntThreads", wintypes.DWORD),
+            ("th32ParentProcessID", wintypes.DWORD),
+            ("pcPriClassBase", ctypes.c_long),
+            ("dwFlags", wintypes.DWORD),
+            ("szExeFile", wintypes.WCHAR * 260),
+        ]
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+
+    snapshot = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+    if not snapshot or snapshot == INVALID_HANDLE_VALUE:
+        raise OSError(ctypes.get_last_error(), "CreateToolhelp32Snapshot失败")
+
+    processes = []
+    try:
+        entry = PROCESSENTRY32W()
+        entry.dwSize = ctypes.sizeof(PROCESSENTRY32W)
+        ok = kernel32.Process32FirstW(snapshot, ctypes.byref(entry))
+        while ok:
+            pid = entry.th32ProcessID
+            exe_path = None
+            handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+            if handle:
+                try:
+                    size = wintypes.DWORD(32768)
+                    buffer = ctypes.create_unicode_buffer(size.value)
+                    if kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size)):
+                        exe_path = buffer.value
+                finally:
+                    kernel32.CloseHandle(handle)
+            processes.append(ProcessInfo(pid, entry.th32ParentProcessID, exe_path))
+            ok = kernel32.Process32NextW(snapshot, ctypes.byref(entry))
+    finally:
+        kernel32.CloseHandle(snapshot)
+    return processes
+
+
+def _list_processes_proc():
+    """通过/proc枚举进程（Linux）"""
+    processes = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        pid = int(name)
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                # comm字段可能包含空格和括号，从最后一个右括号之后解析
+                ppid = int(f.read().rsplit(b")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        try:
+            exe_path = os.readlink(f"/proc/{pid}/exe")
+        except OSError:
+            exe_path = None
+        processes.append(ProcessInfo(pid, ppid, exe_path))
+    return processes
+
+
+def list_processes():
+    """
+    枚举当前所有进程
+    返回: list of ProcessInfo - 无权限读取路径的进程exe_path为None
+    """
+    try:
+        if sys.platform == "win32":
+            return _list_processes_windows()
+        if os.path.isdir("/proc"):
+            return _list_processes_proc()
+    except Exception as e:
+        logging.error(f"枚举进程失败: {str(e)}")
+        return []
+    logging.warning(f"当前平台不支持进程枚举: {sys.platform}")
+    return []
+
+
+def _descendants(processes, root_pids):
+    """返回root_pids及其所有子孙进程的PID集合"""
+    children = {}
+    for p in processes:
+        children.setdefault(p.ppid, []).append(p.pid)
+    result = set()
+    stack = list(root_pids)
+    while stack:
+        pid = stack.pop()
+        if pid in result:
+            continue
+        result.add(pid)
+        stack.extend(children.get(pid, []))
+    return result
+
+
+def _pid_alive(pid):
+    """检查进程是否仍然存在"""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            code = wintypes.DWORD()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return False
+            return code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def kill_pid(pid, force=False, tree=True):
+    """
+    按PID关闭进程
+
+    参数:
+        pid: 进程ID
+        force: 是否强制结束
+        tree: 是否同时结束子进程
+    """
+    if sys.platform == "win32":
+        args = ["taskkill", "/PID", str(pid)]
+        if tree:
+            args.append("/T")
+        if force:
+            args.append("/F")
+        subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return
+    pids = [pid]
+    if tree:
+        pids = sorted(_descendants(list_processes(), [pid]), reverse=True)
+    for target in pids:
+        try:
+            os.kill(target, signal.SIGKILL if force else signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+class ProcessTracker:
+    """
+    客户端进程跟踪器
+
+    记录通过spawn启动的进程PID，并按可执行文件路径缓存"是否为Telegram"的判断结果，
+    查找残留进程时不再对每个进程重复读取文件版本信息。
+    """
+
+    def __init__(self, is_target):
+        self.is_target = is_target  # 可执行文件路径 -> bool
+        self._spawned = {}          # PID -> Popen
+        self._verdicts = {}         # 规范化路径 -> bool
+        self._protected = set()     # 暂不关闭的进程PID（其子进程同样跳过）
+        self._lock = threading.Lock()
+        self.only_spawned = False   # 为True时只处理本程序启动的进程（多个导出进程并行时互不干扰）
+
+    def spawn(self, args, **kwargs):
+        """启动进程并记录其PID"""
+        process = subprocess.Popen(args, **kwargs)
+        with self._lock:
+            self._spawned[process.pid] = process
+        logging.info(f"已启动进程 PID={process.pid}: {args[0]}")
+        return process
+
+    def protect(self, pid):
+        """在find_targets中跳过该进程及其子进程（例如仍在后台写入导出文件的客户端）"""
+        with self._lock:
+            self._protected.add(pid)
+
+    def unprotect(self, pid):
+        """取消protect"""
+        with self._lock:
+            self._protected.discard(pid)
+
+    def _is_target_path(self, exe_path):
+        key = os.path.normcase(exe_path)
+        with self._lock:
+            verdict = self._verdicts.get(key)
+        if verdict is None:
+            try:
+                verdict = bool(self.is_target(exe_path))
+            except Exception as e:
+                logging.debug(f"判断进程可执行文件失败: {exe_path} - {str(e)}")
+                verdict = False
+            with self._lock:
+                self._verdicts[key] = verdict
+        return verdict
+
+    def find_targets(self):
+        """
+        查找正在运行的目标进程：本程序启动的进程及其子进程，以及可执行文件为Telegram的进程
+        （only_spawned为True时不包括后者），跳过受保护的进程
+        返回: list of ProcessInfo
+        """
+        processes = list_processes()
+        with self._lock:
+            spawned = set(self._spawned)
+            protected = set(self._protected)
+        alive_pids = set(p.pid for p in processes)
+        tracked = _descendants(processes, spawned & alive_pids)
+        skipped = _descendants(processes, protected & alive_pids)
+        return [p for p in processes
+                if p.pid != os.getpid() and p.pid not in skipped and (
+                    p.pid in tracked or (not self.only_spawned and p.exe_path
+                                         and self._is_target_path(p.exe_path))
+                )]
+
+    def terminate(self, process, timeout=2):
+        """
+        关闭本程序启动的进程（含子进程），超时后强制结束
+        返回: bool - 进程是否已退出
+        """
+        pid = process.pid
+        if process.poll() is None:
+            kill_pid(pid)
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                logging.info(f"进程未在{timeout}秒内退出，强制结束 PID={pid}")
+                kill_pid(pid, force=True)
+                try:
+                    process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    pass
+        exited = process.poll() is not None
+        if exited:
+            with self._lock:
+                self._spawned.pop(pid, None)
+        return exited
+
+    def kill(self, info, timeout=2):
+        """
+        关闭一个枚举到的进程，超时后强制结束
+        返回: bool - 进程是否已退出
+        """
+        kill_pid(info.pid)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not _pid_alive(info.pid):
+                return True
+            time.sleep(0.1)
+        kill_pid(info.pid, force=True)
+        return not _pid_alive(info.pid)
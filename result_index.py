@@ -0,0 +1,136 @@
+"""
+导出索引 - 流式读取result.json，为每个导出生成按聊天组织的SQLite消息索引
+
+索引文件保存在导出目录中，之后在大量导出中检索时直接查询索引，不再重新解析result.json。
+"""
+
+import os
+import time
+import sqlite3
+import logging
+
+from result_stream import iter_events
+
+INDEX_NAME = "result_index.sqlite"   # 导出目录中的索引文件名
+RESULT_NAME = "result.json"
+BATCH_SIZE = 2000                    # 每批写入的消息数
+
+SCHEMA = """
+CREATE TABLE chats (
+    id INTEGER PRIMARY KEY,
+    chat_id TEXT,
+    section TEXT,
+    name TEXT,
+    type TEXT,
+    message_count INTEGER,
+    first_message_id INTEGER,
+    last_message_id INTEGER,
+    first_date TEXT,
+    last_date TEXT
+);
+CREATE TABLE messages (
+    chat INTEGER NOT NULL,
+    message_id INTEGER,
+    date TEXT,
+    type TEXT,
+    from_name TEXT,
+    from_id TEXT,
+    text TEXT,
+    media TEXT
+);
+CREATE INDEX messages_by_chat ON messages (chat, message_id);
+CREATE INDEX messages_by_date ON messages (date);
+"""
+
+MEDIA_FIELDS = ("photo", "file", "thumbnail")
+
+
+def message_text(message):
+    """将消息的text字段（字符串或文本实体列表）展开为纯文本"""
+    text = message.get("text", "")
+    if isinstance(text, str):
+        return text
+    parts = []
+    for part in text:
+        parts.append(part if isinstance(part, str) else part.get("text", ""))
+    return "".join(parts)
+
+
+def message_media(message):
+    """返回消息引用的媒体文件相对路径，没有时返回None"""
+    for field in MEDIA_FIELDS:
+        value = message.get(field)
+        if isinstance(value, str) and value:
+            return value
+    return None
+
+
+def build_index(export_path):
+    """
+    为导出目录生成消息索引（已存在时重新生成）
+
+    返回:
+        dict: chats, messages, seconds；导出目录中没有result.json时返回None
+    """
+    result_path = os.path.join(export_path, RESULT_NAME)
+    if not os.path.exists(result_path):
+        return None
+    start = time.monotonic()
+    index_path = os.path.join(export_path, INDEX_NAME)
+    tmp_path = index_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF;")
+        conn.executescript(SCHEMA)
+        chat_count = 0
+        message_count = 0
+        batch = []
+        chat_row = None
+        stats = None
+        for event, section, data in iter_events(result_path):
+            if event == "chat":
+                chat_count += 1
+                chat_row = chat_count
+                stats = {"count": 0, "first_id": None, "last_id": None, "first_date": None, "last_date": None}
+            elif event == "message":
+                message_id = data.get("id")
+                date = data.get("date")
+                batch.append((
+                    chat_row,
+                    message_id,
+                    date,
+                    data.get("type"),
+                    data.get("from") or data.get("actor"),
+                    data.get("from_id") or data.get("actor_id"),
+                    message_text(data),
+                    message_media(data),
+                ))
+                stats["count"] += 1
+                if stats["first_id"] is None:
+                    stats["first_id"], stats["first_date"] = message_id, date
+                stats["last_id"], stats["last_date"] = message_id, date
+                if len(batch) >= BATCH_SIZE:
+                    conn.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    message_count += len(batch)
+                    batch = []
+            elif event == "chat_end":
+                conn.execute(
+                    "INSERT INTO chats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (chat_row, str(data.get("id")), section, data.get("name"), data.get("type"),
+                     stats["count"], stats["first_id"], stats["last_id"],
+                     stats["first_date"], stats["last_date"])
+                )
+        if batch:
+            conn.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            message_count += len(batch)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, index_path)
+
+    seconds = time.monotonic() - start
+    logging.info(f"已生成导出索引: {index_path} ({chat_count} 个聊天, {message_count} 条消息, {seconds:.1f} 秒)")
+    return {"chats": chat_count, "messages": message_count, "seconds": seconds}
@@ -0,0 +1,289 @@
+"""
+result.json流式解析 - 逐条读取导出文件中的聊天和消息，内存占用与文件大小无关
+
+Telegram导出的result.json可达数GB，json.load会将整个文件读入内存。这里按块读取文件，
+只在 chats/left_chats -> list -> 每个聊天 -> messages 这一路径上逐层展开，
+每条消息单独用json解码，其余字段整体跳过或按小对象解码。
+"""
+
+import re
+import json
+
+CHUNK_SIZE = 1024 * 1024
+CHAT_SECTIONS = ("chats", "left_chats")
+_WHITESPACE = " \t\r\n"
+_STRUCTURE_SPECIAL = re.compile(r'["\[\]{}]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class ResultFormatError(ValueError):
+    """result.json结构不符合预期"""
+
+
+class _StreamReader:
+    """在按块读取的文本上逐个解码JSON值"""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """读入下一块，丢弃已经处理过的部分"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """跳过空白并返回下一个字符，文件结束时返回空字符串"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ResultFormatError(f"期望 {char!r}，实际为 {self.peek()!r}（位置 {self.pos}）")
+        self.pos += 1
+
+    def value(self):
+        """解码下一个完整的JSON值（应为较小的值，例如单条消息）"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # 数字等值可能恰好被块边界截断，后面必须还有字符才能确认已完整
+            if end < len(self.buffer) or self.eof or not self._fill():
+                self.pos = end
+                return value
+
+    def skip(self):
+        """跳过下一个JSON值，不构造对象（用于可能很大、但不需要的字段）"""
+        char = self.peek()
+        if char not in "[{":
+            self.value()
+            return
+        depth = 0
+        in_string = False
+        while True:
+            pattern = _STRING_SPECIAL if in_string else _STRUCTURE_SPECIAL
+            match = pattern.search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                if not self._fill():
+                    raise ResultFormatError("文件在跳过字段时意外结束")
+                continue
+            char = match.group()
+            self.pos = match.end()
+            if in_string:
+                if char == "\\":
+                    # 转义字符：需要确保被转义的字符已读入
+                    if self.pos >= len(self.buffer) and not self._fill():
+                        raise ResultFormatError("文件在跳过字段时意外结束")
+                    self.pos += 1
+                else:
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def members(self):
+        """遍历对象的键，调用方需在每次迭代中消费对应的值"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ResultFormatError(f"对象中出现意外字符 {char!r}")
+
+    def items(self):
+        """遍历数组元素，调用方需在每次迭代中消费对应的元素"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ResultFormatError(f"数组中出现意外字符 {char!r}")
+
+
+def iter_events(path, chunk_size=CHUNK_SIZE, sections=CHAT_SECTIONS):
+    """
+    流式读取result.json中的聊天和消息
+
+    产生的事件:
+        ("chat", 分区, 聊天信息)      - 开始读取某个聊天的消息（聊天信息为messages之前的字段）
+        ("message", 分区, 消息)       - 一条消息
+        ("chat_end", 分区, 聊天信息)  - 聊天结束（包含全部非消息字段）
+    分区为"chats"或"left_chats"，sections之外的分区整体跳过。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _StreamReader(f, chunk_size)
+        for key in reader.members():
+            if key not in sections or reader.peek() != "{":
+                reader.skip()
+                continue
+            section = key
+            for section_key in reader.members():
+                if section_key != "list":
+                    reader.skip()
+                    continue
+                for _ in reader.items():
+                    header = {}
+                    started = False
+                    for chat_key in reader.members():
+                        if chat_key == "messages":
+                            started = True
+                            yield "chat", section, dict(header)
+                            for _ in reader.items():
+                                yield "message", section, reader.value()
+                        else:
+                            header[chat_key] = reader.value()
+                    if not started:
+                        yield "chat", section, dict(header)
+                    yield "chat_end", section, header
+
+
+def chat_last_ids(path):
+    """流式统计 {聊天ID: 最后一条消息ID}"""
+    last_ids = {}
+    current = None
+    for event, _, data in iter_events(path):
+        if event == "chat":
+            current = str(data.get("id"))
+        elif event == "message":
+            message_id = data.get("id")
+            if isinstance(message_id, int) and message_id > last_ids.get(current, 0):
+                last_ids[current] = message_id
+        elif event == "chat_end":
+            # id字段可能出现在messages之后
+            chat_id = str(data.get("id"))
+            if current != chat_id and current in last_ids:
+                last_ids[chat_id] = last_ids.pop(current)
+    return last_ids
+
+
+def read_outline(path, chunk_size=CHUNK_SIZE):
+    """
+    读取result.json中除消息以外的内容（消息只跳过，不解码）
+
+    返回:
+        dict - order: 顶层字段顺序; fields: {顶层字段: 值}（聊天分区除外）;
+               sections: {分区: {"fields": 分区中list以外的字段, "chats": [聊天信息, ...]}}
+    """
+    outline = {"order": [], "fields": {}, "sections": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _StreamReader(f, chunk_size)
+        for key in reader.members():
+            outline["order"].append(key)
+            if key not in CHAT_SECTIONS or reader.peek() != "{":
+                outline["fields"][key] = reader.value()
+                continue
+            section = outline["sections"][key] = {"fields": {}, "chats": []}
+            for section_key in reader.members():
+                if section_key != "list":
+                    section["fields"][section_key] = reader.value()
+                    continue
+                for _ in reader.items():
+                    header = {}
+                    for chat_key in reader.members():
+                        if chat_key == "messages":
+                            reader.skip()
+                        else:
+                            header[chat_key] = reader.value()
+                    section["chats"].append(header)
+    return outline
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+class ResultWriter:
+    """
+    流式写入result.json：顶层字段和聊天信息整体写入，消息逐条写入（每条一行）
+
+    调用顺序: field()/begin_section() ... begin_chat() message()... end_chat() ... end_section() ... close()
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self._first = [True]   # 每一层对象/数组是否还没有写入元素
+        f.write("{")
+
+    def _separator(self, indent):
+        self.f.write("\n" if self._first[-1] else ",\n")
+        self._first[-1] = False
+        self.f.write(" " * indent)
+
+    def field(self, key, value):
+        """写入顶层字段"""
+        self._separator(1)
+        self.f.write(f"{_dumps(key)}: {_dumps(value)}")
+
+    def begin_section(self, section, fields):
+        """开始写入聊天分区，fields为list以外的字段"""
+        self._separator(1)
+        self.f.write(f"{_dumps(section)}: {{")
+        for key, value in fields.items():
+            self.f.write(f"{_dumps(key)}: {_dumps(value)}, ")
+        self.f.write('"list": [')
+        self._first.append(True)
+
+    def begin_chat(self, header):
+        """开始写入一个聊天，header为messages以外的字段"""
+        self._separator(2)
+        self.f.write("{")
+        for key, value in header.items():
+            if key != "messages":
+                self.f.write(f"{_dumps(key)}: {_dumps(value)}, ")
+        self.f.write('"messages": [')
+        self._first.append(True)
+
+    def message(self, message, encoded=None):
+        """写入一条消息，encoded为已编码的JSON文本（直接写入，不再重新编码）"""
+        self._separator(3)
+        self.f.write(encoded if encoded is not None else _dumps(message))
+
+    def end_chat(self):
+        self.f.write("]}" if self._first.pop() else "\n   ]}")
+
+    def end_section(self):
+        self.f.write("]}" if self._first.pop() else "\n ]}")
+
+    def close(self):
+        self.f.write("\n}\n")
@@ -0,0 +1,158 @@
+"""
+失败分类与重试 - 记录每个客户端的失败原因，一轮导出结束后按退避间隔重新处理可重试的客户端
+
+未登录、不是Telegram客户端等失败重试也不会成功，直接记为失败；找不到界面元素、导出超时和
+转移失败等可能是偶发情况，在本轮结束后重新排队。重试轮次中放宽界面元素的匹配条件
+（降低置信度、延长等待时间）；转移失败的客户端不重新导出，直接从下载目录中的导出文件夹继续转移。
+"""
+
+import threading
+
+# 失败原因
+NOT_TELEGRAM = "not_telegram"              # 不是有效的Telegram客户端
+NOT_LOGGED_IN = "not_logged_in"            # 客户端未登录
+ELEMENT_NOT_FOUND = "element_not_found"    # 找不到界面元素
+EXPORT_TIMEOUT = "export_timeout"          # 等待导出完成超时，或找不到导出文件夹
+COPY_FAILED = "copy_failed"                # 转移导出文件夹失败
+POSTPROCESS_FAILED = "postprocess_failed"  # 转移后生成索引或打包失败
+ERROR = "error"                            # 其他异常
+
+REASON_LABELS = {
+    NOT_TELEGRAM: "不是有效的Telegram客户端",
+    NOT_LOGGED_IN: "未登录",
+    ELEMENT_NOT_FOUND: "找不到界面元素",
+    EXPORT_TIMEOUT: "导出未完成",
+    COPY_FAILED: "转移导出文件夹失败",
+    POSTPROCESS_FAILED: "生成索引或打包失败",
+    ERROR: "处理异常",
+}
+
+RETRYABLE = (ELEMENT_NOT_FOUND, EXPORT_TIMEOUT, COPY_FAILED, POSTPROCESS_FAILED, ERROR)
+RELOCATION = (COPY_FAILED, POSTPROCESS_FAILED)   # 导出文件已写完，只需重新转移
+
+MAX_ATTEMPTS = 3                # 每个客户端最多处理的轮数（含首轮）
+BACKOFF = (30, 2.0, 300)        # 重试前的等待：首次等待秒数、每轮倍数、最长等待秒数
+CONFIDENCE_STEP = 0.05          # 每轮重试降低的匹配置信度
+MIN_CONFIDENCE = 0.5
+TIMEOUT_FACTOR = 1.5            # 每轮重试延长界面元素等待时间的倍数
+
+
+class ExportFailure:
+    """
+    导出失败的原因，作为export_telegram_data等函数的返回值
+
+    布尔值为False，沿用原来"返回值为假表示失败"的判断方式。
+    """
+
+    def __init__(self, reason, detail=""):
+        self.reason = reason
+        self.detail = detail
+
+    def __bool__(self):
+        return False
+
+    @property
+    def label(self):
+        return REASON_LABELS.get(self.reason, self.reason)
+
+    @property
+    def retryable(self):
+        return self.reason in RETRYABLE
+
+    @property
+    def relocation(self):
+        return self.reason in RELOCATION
+
+    def __str__(self):
+        return f"{self.label}: {self.detail}" if self.detail else self.label
+
+    def __repr__(self):
+        return f"ExportFailure({self.reason!r}, {self.detail!r})"
+
+
+class RetryScheduler:
+    """
+    记录每个客户端最近一次的失败，并决定下一轮重试哪些客户端
+
+    attempt为当前轮次（首轮为1），confidence()和timeout()按轮次放宽界面元素的匹配条件。
+    """
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, backoff=BACKOFF):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.attempt = 1
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def configure(self, max_attempts):
+        """设置每个客户端最多处理的轮数（1表示不重试）"""
+        self.max_attempts = max(1, int(max_attempts))
+
+    def reset_stats(self):
+        """清空失败记录（每次运行开始时调用）"""
+        with self._lock:
+            self.attempt = 1
+            self._failures = {}    # 客户端路径 -> ExportFailure
+            self._retried = set()  # 重试过的客户端路径
+            self.rounds = 0
+
+    def record_failure(self, client, failure):
+        """记录客户端的失败（覆盖之前的记录）"""
+        with self._lock:
+            self._failures[client] = failure
+
+    def failures(self):
+        """返回 {客户端路径: ExportFailure}"""
+        with self._lock:
+            return dict(self._failures)
+
+    def merge(self, failures):
+        """合并工作进程记录的失败"""
+        with self._lock:
+            self._failures.update(failures)
+
+    def take_retryable(self):
+        """
+        取出下一轮需要重试的客户端（从失败记录中移除，重试再失败时重新记录）
+        返回: {客户端路径: ExportFailure}；已达到最大轮数或没有可重试的客户端时为空
+        """
+        with self._lock:
+            if self.attempt >= self.max_attempts:
+                return {}
+            retry = {client: failure for client, failure in self._failures.items() if failure.retryable}
+            for client in retry:
+                del self._failures[client]
+            if retry:
+                self.attempt += 1
+                self.rounds += 1
+                self._retried.update(retry)
+            return retry
+
+    def delay(self):
+        """当前轮次重试前的等待时间（秒）"""
+        first, factor, limit = self.backoff
+        return min(limit, first * factor ** max(0, self.attempt - 2))
+
+    def confidence(self, base):
+        """当前轮次使用的匹配置信度"""
+        if self.attempt <= 1:
+            return base
+        return max(min(base, MIN_CONFIDENCE), base - CONFIDENCE_STEP * (self.attempt - 1))
+
+    def timeout(self, base):
+        """当前轮次使用的界面元素等待时间"""
+        return base * TIMEOUT_FACTOR ** (self.attempt - 1)
+
+    def stats(self):
+        """返回重试轮数、重试的客户端数、重试后成功的客户端数和按原因统计的最终失败数"""
+        with self._lock:
+            reasons = {}
+            for failure in self._failures.values():
+                reasons[failure.reason] = reasons.get(failure.reason, 0) + 1
+            return {
+                "rounds": self.rounds,
+                "retried": len(self._retried),
+                "recovered": len(self._retried - set(self._failures)),
+                "failed": len(self._failures),
+                "reasons": reasons,
+            }
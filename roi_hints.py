@@ -0,0 +1,110 @@
+"""
+区域提示存储 - 记录每个界面元素上次被找到的位置，后续优先在该位置附近搜索
+"""
+
+import os
+import json
+import logging
+import threading
+
+
+class RoiHintStore:
+    """
+    按 语言 + 屏幕分辨率 + 截图名称 记录元素最近一次出现的位置
+
+    定位时先在带边距的区域(ROI)内匹配，未命中再退回全屏匹配。
+    提示数据保存为JSON文件，跨运行复用。
+    """
+
+    def __init__(self, path, padding=100):
+        self.path = path
+        self.padding = padding  # ROI在元素四周额外扩展的像素
+        self._hints = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.roi_hits = 0     # ROI内命中次数
+        self.roi_misses = 0   # ROI未命中、退回全屏的次数
+        self.load()
+
+    @staticmethod
+    def _key(language, resolution, image_name):
+        return f"{language}|{resolution[0]}x{resolution[1]}|{image_name}"
+
+    def load(self):
+        """从文件加载提示数据，文件不存在或损坏时从空白开始"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._hints = json.load(f)
+        except Exception as e:
+            logging.warning(f"读取区域提示文件失败，将重新记录: {str(e)}")
+            self._hints = {}
+
+    def save(self):
+        """将提示数据写回文件（无变化时跳过）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            hints = dict(self._hints)
+            self._dirty = False
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(hints, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning(f"保存区域提示文件失败: {str(e)}")
+
+    def region_for(self, language, resolution, image_name):
+        """
+        返回应优先搜索的屏幕区域
+        返回: (left, top, width, height) 或 None（没有记录时）
+        """
+        hint = self._hints.get(self._key(language, resolution, image_name))
+        if not hint:
+            return None
+        left, top, width, height = hint
+        screen_w, screen_h = resolution
+        x0 = max(0, left - self.padding)
+        y0 = max(0, top - self.padding)
+        x1 = min(screen_w, left + width + self.padding)
+        y1 = min(screen_h, top + height + self.padding)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def record(self, language, resolution, image_name, box):
+        """记录元素最新找到的位置"""
+        value = [int(box[0]), int(box[1]), int(box[2]), int(box[3])]
+        key = self._key(language, resolution, image_name)
+        with self._lock:
+            if self._hints.get(key) != value:
+                self._hints[key] = value
+                self._dirty = True
+
+    def snapshot(self):
+        """返回当前提示数据的副本"""
+        with self._lock:
+            return dict(self._hints)
+
+    def merge(self, hints):
+        """合并其他进程记录的提示数据"""
+        with self._lock:
+            for key, value in hints.items():
+                if self._hints.get(key) != value:
+                    self._hints[key] = value
+                    self._dirty = True
+
+    def reset_stats(self):
+        """重置命中统计（每次运行开始时调用）"""
+        self.roi_hits = 0
+        self.roi_misses = 0
+
+    def stats(self):
+        """返回ROI命中统计"""
+        return {
+            "hints": len(self._hints),
+            "roi_hits": self.roi_hits,
+            "roi_misses": self.roi_misses,
+        }
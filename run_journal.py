@@ -0,0 +1,123 @@
+"""
+运行日志 - 在导出目录中以追加方式记录每个客户端的处理状态，中断后可从上次的进度继续
+
+每行一条JSON记录。每次新的运行先写入一条run记录，之后的记录都带有该运行的编号；
+恢复运行时沿用上次的运行编号，按客户端取最后的状态：已完成的跳过，导出文件已写完但未转移完的
+直接继续转移，其余重新导出。
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+JOURNAL_NAME = "run_journal.jsonl"
+
+# 客户端状态，按处理顺序排列
+DISCOVERED = "discovered"   # 已发现
+LAUNCHED = "launched"       # 已启动客户端
+EXPORTING = "exporting"     # 已确认保存，客户端正在写入导出文件
+WRITTEN = "written"         # 导出文件已写完，等待转移（记录下载目录中的文件夹）
+RELOCATED = "relocated"     # 已转移到导出目录，等待生成索引和打包
+DONE = "done"
+FAILED = "failed"
+
+
+def load_records(path):
+    """读取运行日志中的全部记录，忽略中断时写了一半的行"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logging.warning(f"运行日志第 {line_number} 行无法解析，已忽略: {path}")
+    return records
+
+
+class RunJournal:
+    """
+    追加写入的运行日志
+
+    start()后启用；每条记录以一次write追加到文件末尾，多个线程和工作进程可以同时写入同一个文件。
+    """
+
+    def __init__(self):
+        self.path = None
+        self.run_id = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def configure(self, path, run_id=None):
+        """指定日志文件和运行编号（工作进程使用父进程的配置），path为None时停用"""
+        self.path = path
+        self.run_id = run_id
+
+    def start(self, export_dir, resume=False):
+        """
+        开始一次运行
+
+        参数:
+            export_dir: 导出目录，日志文件保存在其中
+            resume: 为True时继续上次的运行，否则开始新的运行
+
+        返回:
+            dict - {客户端路径: 该客户端最后的记录（包含此前各记录的全部字段）}，新运行时为空
+        """
+        path = os.path.join(export_dir, JOURNAL_NAME)
+        records = load_records(path) if resume else []
+        run_ids = [r["run"] for r in records if r.get("event") == "run"]
+        if run_ids:
+            self.configure(path, run_ids[-1])
+            clients = self.client_states(records)
+            logging.info(f"继续上次的运行 {self.run_id}：已记录 {len(clients)} 个客户端")
+            return clients
+        if resume:
+            logging.info(f"没有可以继续的运行记录: {path}")
+        self.configure(path, time.strftime("%Y%m%d-%H%M%S"))
+        self._append({"event": "run", "run": self.run_id, "time": time.strftime("%Y-%m-%d %H:%M:%S")})
+        return {}
+
+    def client_states(self, records):
+        """按客户端合并本次运行的记录，后面的字段覆盖前面的"""
+        clients = {}
+        for record in records:
+            if record.get("run") != self.run_id or "client" not in record:
+                continue
+            clients.setdefault(record["client"], {}).update(record)
+        return clients
+
+    def states(self):
+        """重新读取日志文件，返回本次运行中每个客户端的最后记录"""
+        if not self.enabled:
+            return {}
+        return self.client_states(load_records(self.path))
+
+    def record(self, client, state, **fields):
+        """记录客户端进入新的状态，未启用时不做任何事"""
+        if not self.enabled:
+            return
+        entry = {"run": self.run_id, "time": time.strftime("%Y-%m-%d %H:%M:%S"), "client": client, "state": state}
+        entry.update(fields)
+        try:
+            self._append(entry)
+        except OSError as e:
+            logging.error(f"写入运行日志失败: {str(e)}")
+
+    def _append(self, entry):
+        data = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
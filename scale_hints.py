@@ -0,0 +1,170 @@
+"""
+缩放比例记录 - 记录本机屏幕上界面元素相对于截图的缩放比例，定位时直接使用该比例的截图
+
+操作员电脑的Windows缩放比例与截图时不同时，界面元素在屏幕上的大小与截图不一致，
+原尺寸的截图无法匹配。在其他比例上找到元素后先作为待确认的比例，以足够高的得分多次命中后才保存为
+该分辨率的比例，之后的定位只在该比例上匹配，未命中时才按时间间隔限制在其他比例上搜索。
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+# 待搜索的缩放比例（屏幕上的元素尺寸 / 截图尺寸），覆盖Windows常用的100%~200%缩放
+SCALES = (1.0, 1.25, 1.5, 1.75, 2.0, 0.8, 0.667, 0.5)
+CONFIRM_HITS = 3            # 在同一比例上命中多少次后改用该比例
+CONFIRM_SCORE = 0.8         # 计入命中次数的最低得分（重试时放宽的置信度下的命中不计入）
+
+
+class ScaleHintStore:
+    """
+    按屏幕分辨率记录最近一次匹配成功的缩放比例
+
+    还没有记录时每search_interval秒最多搜索一次；已有记录时未命中也可能是元素尚未出现，
+    每rescan_interval秒最多搜索一次，以便在缩放设置改变后重新找到正确的比例。
+    在其他比例上找到元素后该比例成为待确认的比例，以得分不低于confirm_score的命中累计confirm_hits次
+    才会替换当前比例；期间调用方可以用candidate_for()只在这一个比例上匹配，不必重复全部比例的搜索。
+    """
+
+    def __init__(self, path, scales=SCALES, search_interval=1.0, rescan_interval=30.0,
+                 confirm_hits=CONFIRM_HITS, confirm_score=CONFIRM_SCORE):
+        self.path = path
+        self.scales = tuple(scales)
+        self.search_interval = search_interval
+        self.rescan_interval = rescan_interval
+        self.confirm_hits = confirm_hits
+        self.confirm_score = confirm_score
+        self._hints = {}              # "宽x高" -> 缩放比例
+        self._candidates = {}         # "宽x高" -> [待确认的缩放比例, 命中次数]
+        self._last_search = {}        # "宽x高" -> 上次搜索的时间
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.searches = 0             # 多比例搜索次数
+        self.found = 0                # 搜索后在其他比例上找到的次数
+        self.load()
+
+    @staticmethod
+    def _key(resolution):
+        return f"{resolution[0]}x{resolution[1]}"
+
+    def load(self):
+        """从文件加载记录，文件不存在或损坏时从空白开始"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._hints = json.load(f)
+        except Exception as e:
+            logging.warning(f"读取缩放比例记录失败，将重新搜索: {str(e)}")
+            self._hints = {}
+
+    def save(self):
+        """将记录写回文件（无变化时跳过）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            hints = dict(self._hints)
+            self._dirty = False
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(hints, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning(f"保存缩放比例记录失败: {str(e)}")
+
+    def scale_for(self, resolution):
+        """返回该分辨率下记录的缩放比例，没有记录时为1"""
+        return self._hints.get(self._key(resolution), 1.0)
+
+    def candidate_for(self, resolution):
+        """返回该分辨率下待确认的缩放比例，没有时为None"""
+        candidate = self._candidates.get(self._key(resolution))
+        return candidate[0] if candidate else None
+
+    def begin_search(self, resolution):
+        """
+        判断当前是否应在其他比例上搜索（按间隔限制），需要搜索时返回待搜索的比例列表，否则返回None
+        """
+        key = self._key(resolution)
+        now = time.monotonic()
+        with self._lock:
+            interval = self.rescan_interval if key in self._hints else self.search_interval
+            last = self._last_search.get(key)
+            if last is not None and now - last < interval:
+                return None
+            self._last_search[key] = now
+            self.searches += 1
+            current = self._hints.get(key, 1.0)
+        return [scale for scale in self.scales if scale != current]
+
+    def confirm(self, resolution, scale):
+        """
+        在当前比例上找到元素时调用：还没有记录时记下该比例，之后未命中按rescan_interval限制搜索；
+        同时放弃待确认的其他比例
+        """
+        key = self._key(resolution)
+        if key in self._hints and key not in self._candidates:
+            return
+        with self._lock:
+            self._candidates.pop(key, None)
+            if key not in self._hints:
+                self._hints[key] = scale
+                self._dirty = True
+
+    def record(self, resolution, scale, score):
+        """
+        记录在其他比例上找到元素（得分为score）
+
+        返回: bool - 该比例是否已确认并替换为当前比例
+        """
+        key = self._key(resolution)
+        with self._lock:
+            self.found += 1
+            if self._hints.get(key) == scale:
+                self._candidates.pop(key, None)
+                return True
+            candidate = self._candidates.get(key)
+            if score < self.confirm_score:
+                # 得分较低的命中不计入次数，没有其他待确认的比例时仍作为下次优先尝试的比例
+                if candidate is None:
+                    self._candidates[key] = [scale, 0]
+                return False
+            if candidate is None or candidate[0] != scale:
+                candidate = self._candidates[key] = [scale, 0]
+            candidate[1] += 1
+            if candidate[1] < self.confirm_hits:
+                logging.info(f"屏幕 {key} 上在缩放比例 {scale} 找到界面元素（{candidate[1]}/{self.confirm_hits}）")
+                return False
+            logging.info(f"屏幕 {key} 上的界面缩放比例为 {scale}")
+            del self._candidates[key]
+            self._hints[key] = scale
+            self._dirty = True
+            return True
+
+    def snapshot(self):
+        """返回当前记录的副本"""
+        with self._lock:
+            return dict(self._hints)
+
+    def merge(self, hints):
+        """合并其他进程记录的缩放比例"""
+        with self._lock:
+            for key, value in hints.items():
+                if self._hints.get(key) != value:
+                    self._hints[key] = value
+                    self._dirty = True
+
+    def reset_stats(self):
+        """重置搜索统计（每次运行开始时调用）"""
+        self.searches = 0
+        self.found = 0
+
+    def stats(self):
+        """返回多比例搜索统计"""
+        return {
+            "scale_searches": self.searches,
+            "scale_found": self.found,
+        }
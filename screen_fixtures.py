@@ -0,0 +1,219 @@
+"""
+界面截图样本 - 用界面元素截图合成导出流程中各个界面的整屏画面，或读取录制的整屏截图
+
+合成画面按固定的布局把元素截图贴到带有伪文字的背景上，内容只由语言、界面和滚动位置决定，
+每次生成的结果完全相同，可在不同提交之间对比匹配结果。录制的截图保存为
+目录/manifest.json + PNG文件，格式与save_fixtures()写出的相同，可以用真实客户端的截图替换合成画面。
+
+本模块只处理内存中的图像数组，不依赖pyautogui，可在没有显示的环境中使用。
+"""
+
+import os
+import json
+import zlib
+
+import cv2
+import numpy as np
+
+from matcher import Box
+
+SCREEN_SIZE = (1280, 800)   # 合成画面的分辨率 (宽, 高)
+SCROLL_STEP = 210           # 滚动一次内容移动的像素
+
+LIGHT = "light"
+DARK = "dark"               # 深色主题：背景反色，元素使用对应的_dark截图（没有时与浅色主题相同）
+THEMES = (LIGHT, DARK)
+
+MANIFEST_NAME = "manifest.json"
+
+# 导出选项截图，与TG_DataExporter.EXPORT_OPTIONS的顺序一致
+OPTION_IMAGES = [
+    "option_only_my_messages.png",
+    "option_videos.png",
+    "option_voice_messages.png",
+    "option_video_messages.png",
+    "option_stickers.png",
+    "option_gifs.png",
+    "option_files.png",
+    "option_both.png",
+]
+
+# 各界面的布局：
+#   fixed: [(截图名称, x, y)]，x为None时水平居中
+#   scrolled: 随滚动移动的元素，只绘制viewport (上边界, 下边界) 范围内的部分
+#   scrolls: 需要合成的滚动位置数量
+LAYOUTS = {
+    "desktop": {},
+    "login": {"fixed": [("start_messaging_button.png", None, 520)]},
+    "main": {"fixed": [("hamburger_menu.png", 10, 10)]},
+    "menu": {"fixed": [("hamburger_menu.png", 10, 10), ("settings_menu_item.png", 20, 330)]},
+    "settings": {"fixed": [("advanced_tab.png", 420, 470)]},
+    "advanced": {
+        "scrolled": [("export_button.png", 420, 900)],
+        "viewport": (0, SCREEN_SIZE[1]),
+        "scrolls": 2,
+    },
+    "export_options": {
+        "fixed": [("export_settings_title.png", 400, 110), ("save_button.png", 860, 680)],
+        "scrolled": [(name, 420, 220 + 70 * i) for i, name in enumerate(OPTION_IMAGES)],
+        "viewport": (200, 640),
+        "scrolls": 2,
+    },
+    "exporting": {"fixed": [("export_settings_title.png", 400, 110)]},
+    "export_done": {"fixed": [("show_my_data_button.png", 490, 380), ("close_button.png", 1100, 60)]},
+}
+
+
+def _background(seed, size):
+    """生成浅色背景和若干伪文字行，seed相同时结果相同"""
+    width, height = size
+    rng = np.random.RandomState(seed)
+    frame = np.full((height, width, 3), 248, dtype=np.uint8)
+    # 左侧对话列表和顶部标题栏
+    frame[:, :300] = 240
+    frame[:60, :] = 235
+    for _ in range(120):
+        x = int(rng.randint(0, width - 40))
+        y = int(rng.randint(0, height - 16))
+        w = int(rng.randint(20, 220))
+        h = int(rng.randint(8, 14))
+        shade = int(rng.randint(90, 200))
+        frame[y:y + h, x:min(width, x + w)] = shade
+    return frame
+
+
+def _paste(frame, image, x, y, top=0, bottom=None):
+    """把元素贴到画面上，超出 [top, bottom) 的行不绘制；返回元素是否完整可见"""
+    height, width = image.shape[:2]
+    bottom = frame.shape[0] if bottom is None else bottom
+    y0, y1 = max(y, top), min(y + height, bottom)
+    x1 = min(x + width, frame.shape[1])
+    if y1 > y0 and x1 > x:
+        frame[y0:y1, x:x1] = image[y0 - y:y1 - y, :x1 - x]
+    return y >= top and y + height <= bottom and x + width <= frame.shape[1]
+
+
+def themed_name(templates, language, image_name, theme):
+    """深色主题下有对应的_dark截图（如hamburger_menu_dark.png）时使用该截图，否则使用原截图"""
+    if theme == DARK:
+        root, ext = os.path.splitext(image_name)
+        dark_name = f"{root}_dark{ext}"
+        if templates.has(language, dark_name):
+            return dark_name
+    return image_name
+
+
+def render_state(templates, language, state, theme=LIGHT, scroll=0, size=SCREEN_SIZE):
+    """
+    合成某个界面的整屏画面
+
+    参数:
+        templates: TemplateCache，提供元素截图的彩色数组
+        language: 语言代码
+        state: LAYOUTS中的界面名称
+        theme: LIGHT或DARK
+        scroll: 滚动位置（向下滚动的次数）
+
+    返回:
+        (BGR画面, {截图名称: Box}) - 后者为画面中完整可见的元素（深色主题下可能是_dark截图）及其位置
+    """
+    layout = LAYOUTS[state]
+    frame = _background(zlib.crc32(f"{language}|{state}|{scroll}".encode("utf-8")), size)
+    if theme == DARK:
+        frame = 255 - frame
+    expect = {}
+    for image_name, x, y in layout.get("fixed", []):
+        image_name = themed_name(templates, language, image_name, theme)
+        image = templates.get(language, image_name)
+        if x is None:
+            x = (size[0] - image.shape[1]) // 2
+        if _paste(frame, image, x, y):
+            expect[image_name] = Box(x, y, image.shape[1], image.shape[0])
+    top, bottom = layout.get("viewport", (0, size[1]))
+    for image_name, x, y in layout.get("scrolled", []):
+        image_name = themed_name(templates, language, image_name, theme)
+        image = templates.get(language, image_name)
+        y -= scroll * SCROLL_STEP
+        if _paste(frame, image, x, y, top, bottom):
+            expect[image_name] = Box(x, y, image.shape[1], image.shape[0])
+    return frame, expect
+
+
+def scale_fixture(fixture, scale):
+    """把画面和预期位置按比例缩放，模拟缩放设置与截图时不同的屏幕"""
+    if scale == 1.0:
+        return fixture
+    height, width = fixture["frame"].shape[:2]
+    size = (int(round(width * scale)), int(round(height * scale)))
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    scaled = dict(fixture)
+    scaled["frame"] = cv2.resize(fixture["frame"], size, interpolation=interpolation)
+    scaled["expect"] = {name: Box(*(int(round(v * scale)) for v in box)) for name, box in fixture["expect"].items()}
+    return scaled
+
+
+def fixture_name(language, theme, state, scroll):
+    return f"{language}_{theme}_{state}_{scroll}"
+
+
+def synthetic_fixtures(templates, languages, themes=THEMES, size=SCREEN_SIZE):
+    """
+    合成所有语言、主题、界面和滚动位置的画面
+
+    返回:
+        list - [{"name", "language", "theme", "state", "scroll", "frame", "expect"}]
+    """
+    fixtures = []
+    for language in languages:
+        for theme in themes:
+            for state, layout in LAYOUTS.items():
+                for scroll in range(layout.get("scrolls", 1)):
+                    frame, expect = render_state(templates, language, state, theme, scroll, size)
+                    fixtures.append({
+                        "name": fixture_name(language, theme, state, scroll),
+                        "language": language, "theme": theme, "state": state, "scroll": scroll,
+                        "frame": frame, "expect": expect,
+                    })
+    return fixtures
+
+
+def save_fixtures(directory, fixtures):
+    """将画面保存为 目录/<名称>.png，并写入manifest.json"""
+    os.makedirs(directory, exist_ok=True)
+    entries = []
+    for fixture in fixtures:
+        file_name = fixture["name"] + ".png"
+        ok, data = cv2.imencode(".png", fixture["frame"])
+        if not ok:
+            raise ValueError(f"无法编码画面：{fixture['name']}")
+        data.tofile(os.path.join(directory, file_name))
+        entry = {key: fixture[key] for key in ("name", "language", "theme", "state", "scroll")}
+        entry["file"] = file_name
+        entry["expect"] = {name: list(box) for name, box in fixture["expect"].items()}
+        entries.append(entry)
+    with open(os.path.join(directory, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({"frames": entries}, f, ensure_ascii=False, indent=2)
+
+
+def load_fixtures(directory):
+    """
+    读取录制的画面（格式见save_fixtures）
+
+    expect中列出画面里完整可见的元素及其位置 [left, top, width, height]，没有列出的元素都应匹配不到。
+    """
+    with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        entries = json.load(f)["frames"]
+    fixtures = []
+    for entry in entries:
+        path = os.path.join(directory, entry["file"])
+        frame = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"无法解码画面：{path}")
+        fixture = dict(entry)
+        fixture.setdefault("name", os.path.splitext(entry["file"])[0])
+        fixture.setdefault("theme", LIGHT)
+        fixture.setdefault("scroll", 0)
+        fixture["frame"] = frame
+        fixture["expect"] = {name: Box(*box) for name, box in entry.get("expect", {}).items()}
+        fixtures.append(fixture)
+    return fixtures
@@ -0,0 +1,234 @@
+"""
+全文检索 - 汇总导出目录中所有客户端的消息索引，按关键词、发送者和日期检索
+
+每个导出目录中的 result_index.sqlite（见result_index.py）被合并到 导出目录/search_index.sqlite，
+消息文本建立FTS5倒排索引。再次更新时只重新导入索引文件有变化的导出。
+"""
+
+import os
+import time
+import sqlite3
+import logging
+
+from result_index import INDEX_NAME
+
+SEARCH_INDEX_NAME = "search_index.sqlite"
+MAX_SCAN_DEPTH = 3                      # 在导出目录下查找消息索引的最大目录层级
+
+
+def _fts5_available():
+    try:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        finally:
+            conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+# 部分Python发行版的SQLite未编译FTS5，此时退回LIKE匹配
+FTS5_AVAILABLE = _fts5_available()
+
+
+def fts_query(keywords):
+    """
+    将用户输入的关键词转换为FTS5查询：按空白分词，每个词作为FTS5字符串（多个词需同时出现）
+
+    "foo-bar"、"@alice"、"it's"等包含FTS5语法字符的词按字面匹配；以*结尾的词保留前缀匹配。
+    """
+    terms = []
+    for term in keywords.split():
+        prefix = term.endswith("*") and len(term) > 1
+        if prefix:
+            term = term[:-1]
+        terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS exports (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    client TEXT,
+    index_mtime REAL,
+    index_size INTEGER,
+    messages INTEGER,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    export INTEGER NOT NULL,
+    chat_id TEXT,
+    chat_name TEXT,
+    message_id INTEGER,
+    date TEXT,
+    from_name TEXT,
+    text TEXT,
+    media TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_by_export ON messages (export);
+CREATE INDEX IF NOT EXISTS messages_by_date ON messages (date);
+CREATE INDEX IF NOT EXISTS messages_by_sender ON messages (from_name);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text, from_name, chat_name, content='messages', content_rowid='id', tokenize='unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, text, from_name, chat_name)
+    VALUES (new.id, new.text, new.from_name, new.chat_name);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, text, from_name, chat_name)
+    VALUES ('delete', old.id, old.text, old.from_name, old.chat_name);
+END;
+"""
+
+
+def find_export_indexes(export_dir, max_depth=MAX_SCAN_DEPTH, skip_dirs=()):
+    """
+    查找导出目录下所有客户端的消息索引文件，返回 {导出目录: 索引文件路径}
+    skip_dirs中的目录名称（如去重存储目录）和检索库本身的文件不遍历
+    """
+    found = {}
+    base_depth = os.path.abspath(export_dir).rstrip(os.sep).count(os.sep)
+    for current, dirs, files in os.walk(export_dir):
+        depth = os.path.abspath(current).count(os.sep) - base_depth
+        if depth >= max_depth:
+            dirs[:] = []
+        # 去重存储目录中没有索引，跳过以免遍历大量文件
+        dirs[:] = [d for d in dirs if d not in skip_dirs and not d.startswith(SEARCH_INDEX_NAME)]
+        if INDEX_NAME in files:
+            found[os.path.abspath(current)] = os.path.join(current, INDEX_NAME)
+    return found
+
+
+class SearchIndex:
+    """导出目录的跨客户端消息检索库"""
+
+    def __init__(self, export_dir, skip_dirs=()):
+        self.export_dir = export_dir
+        self.skip_dirs = tuple(skip_dirs)  # 不查找消息索引的目录名称
+        self.path = os.path.join(export_dir, SEARCH_INDEX_NAME)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        if FTS5_AVAILABLE:
+            self.conn.executescript(FTS_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _remove_export(self, export_id):
+        self.conn.execute("DELETE FROM messages WHERE export = ?", (export_id,))
+        self.conn.execute("DELETE FROM exports WHERE id = ?", (export_id,))
+
+    def update(self):
+        """
+        导入新增或有变化的导出，删除已不存在的导出
+        返回: dict - added, updated, removed, unchanged, messages, seconds
+        """
+        start = time.monotonic()
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "messages": 0}
+        indexes = find_export_indexes(self.export_dir, skip_dirs=self.skip_dirs)
+        known = {row["path"]: row for row in self.conn.execute("SELECT * FROM exports")}
+
+        for path, row in known.items():
+            if path not in indexes:
+                self._remove_export(row["id"])
+                stats["removed"] += 1
+
+        for path, index_path in sorted(indexes.items()):
+            stat = os.stat(index_path)
+            row = known.get(path)
+            if row and row["index_mtime"] == stat.st_mtime and row["index_size"] == stat.st_size:
+                stats["unchanged"] += 1
+                continue
+            if row:
+                self._remove_export(row["id"])
+                stats["updated"] += 1
+            else:
+                stats["added"] += 1
+            client = os.path.relpath(path, os.path.abspath(self.export_dir)).replace(os.sep, "/")
+            cursor = self.conn.execute(
+                "INSERT INTO exports (path, client, index_mtime, index_size, messages, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, ?)",
+                (path, client, stat.st_mtime, stat.st_size, time.strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            export_id = cursor.lastrowid
+            self.conn.execute("ATTACH DATABASE ? AS src", (index_path,))
+            try:
+                cursor = self.conn.execute(
+                    "INSERT INTO messages (export, chat_id, chat_name, message_id, date, from_name, text, media) "
+                    "SELECT ?, c.chat_id, c.name, m.message_id, m.date, m.from_name, m.text, m.media "
+                    "FROM src.messages m JOIN src.chats c ON c.id = m.chat",
+                    (export_id,)
+                )
+                count = cursor.rowcount
+                self.conn.execute("UPDATE exports SET messages = ? WHERE id = ?", (count, export_id))
+                stats["messages"] += count
+                self.conn.commit()
+            finally:
+                self.conn.execute("DETACH DATABASE src")
+        self.conn.commit()
+        stats["seconds"] = time.monotonic() - start
+        logging.info(f"检索索引已更新：新增 {stats['added']} 个导出，更新 {stats['updated']} 个，"
+                     f"删除 {stats['removed']} 个，导入 {stats['messages']} 条消息 ({stats['seconds']:.1f} 秒)")
+        return stats
+
+    def search(self, keywords=None, sender=None, since=None, until=None, client=None, limit=50, raw=False):
+        """
+        检索消息
+
+        参数:
+            keywords: 关键词（按空白分词，所有词都需出现；未编译FTS5时按子串匹配）
+            sender: 发送者名称（子串匹配）
+            since/until: 日期范围，格式与导出中的date字段一致，如"2024-01-31"或"2024-01-31T12:00:00"
+            client: 客户端（"根目录/客户端目录"，前缀匹配）
+            limit: 最多返回的条数
+            raw: 为True时keywords按FTS5查询语法直接使用（如 "a OR b"、"NEAR(a b)"），语法错误时抛出sqlite3.OperationalError
+
+        返回:
+            list of dict - client, chat_name, message_id, date, from_name, text, media
+        """
+        sql = ("SELECT e.client, m.chat_name, m.message_id, m.date, m.from_name, m.text, m.media "
+               "FROM messages m JOIN exports e ON e.id = m.export")
+        conditions = []
+        params = []
+        if keywords:
+            if FTS5_AVAILABLE:
+                sql += " JOIN messages_fts f ON f.rowid = m.id"
+                conditions.append("messages_fts MATCH ?")
+                params.append(keywords if raw else fts_query(keywords))
+            else:
+                conditions.append("m.text LIKE ?")
+                params.append(f"%{keywords}%")
+        if sender:
+            conditions.append("m.from_name LIKE ?")
+            params.append(f"%{sender}%")
+        if since:
+            conditions.append("m.date >= ?")
+            params.append(since)
+        if until:
+            # 只给出日期时包含当天全部消息
+            conditions.append("m.date <= ?")
+            params.append(until if "T" in until else until + "T99")
+        if client:
+            conditions.append("e.client LIKE ?")
+            params.append(f"{client}%")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY m.date DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+
+def update_search_index(export_dir, skip_dirs=()):
+    """更新导出目录的检索索引，返回更新统计；skip_dirs为不查找消息索引的目录名称"""
+    index = SearchIndex(export_dir, skip_dirs)
+    try:
+        return index.update()
+    finally:
+        index.close()
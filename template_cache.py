@@ -0,0 +1,118 @@
+"""
+模板缓存 - 启动时一次性读取并解码所有界面元素截图
+"""
+
+import os
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+
+class TemplateCache:
+    """
+    界面元素截图（needle）的内存注册表
+
+    每张截图在加载时解码并只保留定位使用的灰度数组，之后所有定位调用
+    直接使用内存中的数组，不再重复读盘和解码；彩色数组（合成测试画面时使用）在首次获取时才解码。
+    """
+
+    def __init__(self, screenshot_dir):
+        self.screenshot_dir = screenshot_dir
+        self._templates = {}  # (language, image_name) -> {"gray": ndarray, "color": ndarray（获取过彩色时）}
+        self._lock = threading.Lock()
+        self.decodes = 0  # 实际解码次数
+        self.lookups = 0  # 模板获取次数
+
+    def _decode(self, path):
+        """读取并解码一张截图，使用imdecode以兼容Windows下的非ASCII路径"""
+        data = np.fromfile(path, dtype=np.uint8)
+        color = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if color is None:
+            raise ValueError(f"无法解码截图文件：{path}")
+        self.decodes += 1
+        return color
+
+    def load(self, language, image_names, optional_names=()):
+        """
+        加载指定语言的截图，必要截图缺失或无法解码时抛出FileNotFoundError
+
+        参数:
+            language: 语言代码
+            image_names: 必要截图文件名列表
+            optional_names: 可选截图文件名列表（不存在时跳过）
+        """
+        lang_dir = os.path.join(self.screenshot_dir, language)
+        broken = []
+        for image_name in list(image_names) + list(optional_names):
+            path = os.path.join(lang_dir, image_name)
+            if image_name in optional_names and not os.path.exists(path):
+                continue
+            try:
+                entry = {"gray": cv2.cvtColor(self._decode(path), cv2.COLOR_BGR2GRAY)}
+            except Exception as e:
+                logging.error(f"截图解码失败: {path} - {str(e)}")
+                broken.append(image_name)
+                continue
+            with self._lock:
+                self._templates[(language, image_name)] = entry
+
+        if broken:
+            raise FileNotFoundError(f"语言 {language} 的截图文件无法解码：{', '.join(broken)}")
+
+    def has(self, language, image_name):
+        """检查截图是否已加载"""
+        return (language, image_name) in self._templates
+
+    def keys(self):
+        """返回已加载截图的 (语言, 截图文件名) 列表"""
+        with self._lock:
+            return list(self._templates)
+
+    def get(self, language, image_name, grayscale=False, scale=1.0):
+        """
+        获取已解码的截图数组，未预加载或首次获取彩色数组时按需解码一次
+
+        scale不为1时返回按比例缩放后的截图（用于屏幕缩放比例与截图时不同的机器），
+        每个比例只缩放一次，之后直接使用缓存的数组。
+        """
+        kind = "gray" if grayscale else "color"
+        with self._lock:
+            self.lookups += 1
+            entry = self._templates.get((language, image_name))
+        if entry is None or kind not in entry:
+            color = self._decode(os.path.join(self.screenshot_dir, language, image_name))
+            with self._lock:
+                entry = self._templates.setdefault((language, image_name),
+                                                   {"gray": cv2.cvtColor(color, cv2.COLOR_BGR2GRAY)})
+                if not grayscale:
+                    entry["color"] = color
+        scale = round(scale, 3)
+        if scale == 1.0:
+            return entry[kind]
+        scaled = entry.setdefault("scaled", {})
+        image = scaled.get((kind, scale))
+        if image is None:
+            height, width = entry[kind].shape[:2]
+            size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            image = scaled[(kind, scale)] = cv2.resize(entry[kind], size, interpolation=interpolation)
+        return image
+
+    def reset_stats(self):
+        """重置统计计数（每次运行开始时调用）"""
+        self.decodes = 0
+        self.lookups = 0
+
+    def stats(self):
+        """
+        返回缓存统计
+        返回: dict - 模板数量、实际解码次数、获取次数以及节省的解码次数
+        """
+        return {
+            "templates": len(self._templates),
+            "decodes": self.decodes,
+            "lookups": self.lookups,
+            "saved_decodes": max(self.lookups - self.decodes, 0),
+        }
@@ -0,0 +1,214 @@
+"""
+耗时记录 - 按客户端记录每个导出阶段的耗时，据此计算自适应超时和批量导出的预计剩余时间
+
+固定超时对所有客户端一视同仁：小账号卡住时要白等很久，大账号又可能在导出完成前被判为超时。
+这里保留每个客户端各阶段最近的若干次耗时（写入阶段同时记录导出大小），超时取历史耗时的
+p99乘以余量；客户端自己的记录不足时参考所有客户端的记录，仍不足时使用调用方给出的默认值。
+超时中断的写入记为下限（实际耗时至少为等待的时间），下次的超时不低于下限乘以余量，
+否则总是超时的大账号永远得不到完成的记录，每次都会在同一时间被中断。
+"""
+
+import os
+import json
+import math
+import logging
+import threading
+
+# 导出阶段
+LAUNCH = "launch"         # 启动客户端到主界面出现
+NAVIGATE = "navigate"     # 进入设置并打开导出窗口
+OPTIONS = "options"       # 勾选导出选项并确认保存
+WRITE = "write"           # 客户端写入导出文件
+RELOCATE = "relocate"     # 转移导出文件夹（含索引和打包）
+PHASES = (LAUNCH, NAVIGATE, OPTIONS, WRITE, RELOCATE)
+
+MAX_SAMPLES = 20          # 每个客户端每个阶段保留的记录数
+MIN_SAMPLES = 3           # 计算自适应超时所需的最少记录数
+PERCENTILE = 0.99
+MARGIN = 3.0              # 超时 = p99耗时 × 余量
+MIN_TIMEOUT = 5.0         # 自适应超时的下限（秒）
+MAX_FACTOR = 4.0          # 未指定上限时，自适应超时不超过默认值的倍数
+SIZE_GROWTH = 0.2         # 按大小估计写入耗时时，为账号数据增长预留的比例
+
+
+def percentile(values, fraction):
+    """最近秩法计算分位数"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _is_lower_bound(sample):
+    """超时中断的记录只是耗时的下限（旧记录没有该标记）"""
+    return len(sample) > 2 and bool(sample[2])
+
+
+class TimingHistory:
+    """
+    按 客户端 + 阶段 记录最近的耗时，并按界面元素记录找到元素所用的时间
+
+    记录保存为JSON文件，跨运行复用。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._clients = {}    # 客户端路径 -> {阶段: [[秒数, 大小或null, 是否为下限], ...]}
+        self._elements = {}   # 截图名称 -> [秒数, ...]
+        self._new = []        # 本进程新增的记录，用于汇总到父进程
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """从文件加载记录，文件不存在或损坏时从空白开始"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._clients = data.get("clients", {})
+            self._elements = data.get("elements", {})
+        except Exception as e:
+            logging.warning(f"读取耗时记录文件失败，将重新记录: {str(e)}")
+            self._clients = {}
+            self._elements = {}
+
+    def save(self):
+        """将记录写回文件（无变化时跳过）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"clients": self._clients, "elements": self._elements}
+            text = json.dumps(data, ensure_ascii=False)
+            self._dirty = False
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning(f"保存耗时记录文件失败: {str(e)}")
+
+    def record(self, client, phase, seconds, size=None, lower_bound=False):
+        """
+        记录客户端某个阶段的耗时，size为导出大小（字节，仅写入阶段）
+        lower_bound为True表示该阶段超时中断，实际耗时至少为seconds
+        """
+        with self._lock:
+            samples = self._clients.setdefault(client, {}).setdefault(phase, [])
+            samples.append([round(seconds, 3), size, lower_bound])
+            del samples[:-MAX_SAMPLES]
+            self._new.append(["client", client, phase, seconds, size, lower_bound])
+            self._dirty = True
+
+    def record_element(self, image_name, seconds):
+        """记录找到界面元素所用的时间"""
+        with self._lock:
+            samples = self._elements.setdefault(image_name, [])
+            samples.append(round(seconds, 3))
+            del samples[:-MAX_SAMPLES * 5]
+            self._new.append(["element", image_name, seconds])
+            self._dirty = True
+
+    def snapshot(self):
+        """返回本进程新增的记录"""
+        with self._lock:
+            return list(self._new)
+
+    def merge(self, records):
+        """合并其他进程新增的记录"""
+        for record in records:
+            if record[0] == "client":
+                self.record(*record[1:])
+            else:
+                self.record_element(*record[1:])
+
+    def _samples(self, client, phase):
+        """
+        客户端自己的记录不足时，改用所有客户端该阶段的记录
+
+        写入耗时取决于账号的数据量，不同客户端之间没有可比性，只使用客户端自己的记录。
+        """
+        samples = self._clients.get(client, {}).get(phase, [])
+        if len(samples) >= MIN_SAMPLES or phase == WRITE:
+            return samples
+        return [s for phases in self._clients.values() for s in phases.get(phase, [])]
+
+    def _size_estimate(self, client):
+        """按客户端以往的导出大小和写入速度估计写入耗时，没有大小记录时返回None"""
+        samples = [s for s in self._clients.get(client, {}).get(WRITE, [])
+                   if s[1] and s[0] > 0 and not _is_lower_bound(s)]
+        if not samples:
+            return None
+        rates = [s[1] / s[0] for s in samples]
+        largest = max(s[1] for s in samples)
+        return largest * (1 + SIZE_GROWTH) / percentile(rates, 0.5)
+
+    def timeout(self, client, phase, default, minimum=MIN_TIMEOUT, maximum=None):
+        """
+        返回客户端某个阶段的自适应超时（秒）
+
+        参数:
+            default: 记录不足时使用的超时
+            minimum/maximum: 自适应超时的范围，maximum默认为 default × MAX_FACTOR
+        """
+        with self._lock:
+            samples = self._samples(client, phase)
+            # 最近一次超时中断的等待时间，下次至少等待其余量倍
+            bounds = [s[0] for s in self._clients.get(client, {}).get(phase, []) if _is_lower_bound(s)]
+            if len(samples) < MIN_SAMPLES and not bounds:
+                return default
+            value = 0
+            if len(samples) >= MIN_SAMPLES:
+                value = percentile([s[0] for s in samples], PERCENTILE) * MARGIN
+            if bounds:
+                value = max(value, default, bounds[-1] * MARGIN)
+            if phase == WRITE:
+                estimate = self._size_estimate(client)
+                if estimate:
+                    value = max(value, estimate * MARGIN)
+        return min(maximum or default * MAX_FACTOR, max(minimum, value))
+
+    def element_timeout(self, image_name, default, minimum=MIN_TIMEOUT):
+        """返回等待界面元素的自适应超时（秒），不超过默认值"""
+        with self._lock:
+            samples = self._elements.get(image_name, [])
+            if len(samples) < MIN_SAMPLES:
+                return default
+            value = percentile(samples, PERCENTILE) * MARGIN
+        return min(default, max(minimum, value))
+
+    def estimate(self, client):
+        """估计导出一个客户端所需的时间（秒），各阶段取中位数；没有任何记录时返回None"""
+        total = None
+        with self._lock:
+            for phase in PHASES:
+                samples = self._samples(client, phase)
+                if phase == WRITE:
+                    estimate = self._size_estimate(client)
+                    if estimate:
+                        total = (total or 0) + estimate
+                        continue
+                if samples:
+                    total = (total or 0) + percentile([s[0] for s in samples], 0.5)
+        return total
+
+    def estimate_remaining(self, clients, concurrency=1):
+        """估计剩余客户端的总耗时（秒），没有记录的客户端按已有客户端的平均值计算"""
+        estimates = [self.estimate(client) for client in clients]
+        known = [e for e in estimates if e is not None]
+        if not known:
+            return None
+        average = sum(known) / len(known)
+        total = sum(e if e is not None else average for e in estimates)
+        return total / max(1, concurrency)
+
+    def reset_stats(self):
+        """清空本进程新增记录的统计（每次运行开始时调用）"""
+        with self._lock:
+            self._new = []
+
+    def stats(self):
+        """返回记录的客户端数、界面元素数和本次运行新增的记录数"""
+        with self._lock:
+            return {"clients": len(self._clients), "elements": len(self._elements), "new_samples": len(self._new)}
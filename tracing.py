@@ -0,0 +1,193 @@
+"""
+耗时追踪 - 记录导出流程中各步骤（span）的耗时和模板匹配次数，输出为JSON Lines或Chrome Trace格式
+
+span可以嵌套：外层span（例如某个客户端的begin_export）指定client后，内层span自动归属该客户端；
+内层span的匹配次数在结束时累加到外层。所有span按名称汇总为统计表，附在run_export的结果中。
+追踪文件以追加方式写入，多个线程和工作进程可以同时写入同一个文件。
+"""
+
+import os
+import json
+import time
+import functools
+import threading
+
+JSONL = "jsonl"
+CHROME = "chrome"        # chrome://tracing 或 Perfetto 可直接打开（JSON数组格式，允许省略结尾的"]"）
+
+
+class _Span:
+    __slots__ = ("name", "client", "args", "counts", "start", "wall_start")
+
+    def __init__(self, name, client, args):
+        self.name = name
+        self.client = client
+        self.args = args
+        self.counts = {}
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+
+
+class Tracer:
+    """
+    span耗时追踪
+
+    configure(path)后将每个span写入追踪文件；未配置文件时只按名称汇总统计。
+    """
+
+    def __init__(self):
+        self.path = None
+        self.format = JSONL
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def configure(self, path, fmt=JSONL):
+        """指定追踪文件和格式，path为None时不写文件"""
+        self.path = path
+        self.format = fmt
+        if path and fmt == CHROME and not os.path.exists(path):
+            self._append("[\n")
+
+    def reset_stats(self):
+        """清空汇总统计（每次运行开始时调用）"""
+        with self._lock:
+            self._summary = {}    # span名称 -> {count, seconds, max, matches}
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, client=None, **args):
+        """返回记录一个步骤耗时的上下文管理器"""
+        return _SpanContext(self, name, client, args)
+
+    def traced(self, name):
+        """装饰器：将整个函数调用记录为一个span"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, key, n=1):
+        """为当前span累加计数（例如模板匹配次数），不在span中时忽略"""
+        stack = self._stack()
+        if stack:
+            counts = stack[-1].counts
+            counts[key] = counts.get(key, 0) + n
+
+    def _enter(self, name, client, args):
+        stack = self._stack()
+        if client is None and stack:
+            client = stack[-1].client
+        span = _Span(name, client, args)
+        stack.append(span)
+        return span
+
+    def _exit(self, span, error):
+        seconds = time.perf_counter() - span.start
+        stack = self._stack()
+        stack.pop()
+        if stack:
+            parent = stack[-1].counts
+            for key, value in span.counts.items():
+                parent[key] = parent.get(key, 0) + value
+
+        with self._lock:
+            entry = self._summary.setdefault(span.name, {"count": 0, "seconds": 0.0, "max": 0.0, "matches": 0})
+            entry["count"] += 1
+            entry["seconds"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            entry["matches"] += span.counts.get("matches", 0)
+
+        if not self.path:
+            return
+        if self.format == CHROME:
+            args = dict(span.args, **span.counts)
+            if span.client:
+                args["client"] = span.client
+            if error:
+                args["error"] = error
+            record = {
+                "name": span.name, "cat": span.client or "run", "ph": "X",
+                "ts": int(span.wall_start * 1e6), "dur": int(seconds * 1e6),
+                "pid": os.getpid(), "tid": threading.get_ident(), "args": args,
+            }
+            line = json.dumps(record, ensure_ascii=False) + ",\n"
+        else:
+            record = {
+                "name": span.name, "client": span.client,
+                "start": round(span.wall_start, 6), "seconds": round(seconds, 6),
+                "pid": os.getpid(), "thread": threading.current_thread().name,
+            }
+            if span.args:
+                record["args"] = span.args
+            if span.counts:
+                record["counts"] = span.counts
+            if error:
+                record["error"] = error
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+        try:
+            self._append(line)
+        except OSError:
+            # 追踪文件写入失败不影响导出
+            self.path = None
+
+    def _append(self, text):
+        data = text.encode("utf-8")
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+    def merge(self, summary):
+        """合并工作进程的汇总统计"""
+        with self._lock:
+            for name, stats in summary.items():
+                entry = self._summary.setdefault(name, {"count": 0, "seconds": 0.0, "max": 0.0, "matches": 0})
+                entry["count"] += stats["count"]
+                entry["seconds"] += stats["seconds"]
+                entry["max"] = max(entry["max"], stats["max"])
+                entry["matches"] += stats["matches"]
+
+    def stats(self):
+        """返回按span名称汇总的统计：count, seconds, mean, max, matches"""
+        with self._lock:
+            return {
+                name: dict(entry, mean=entry["seconds"] / entry["count"] if entry["count"] else 0.0)
+                for name, entry in self._summary.items()
+            }
+
+
+class _SpanContext:
+    __slots__ = ("tracer", "name", "client", "args", "span")
+
+    def __init__(self, tracer, name, client, args):
+        self.tracer = tracer
+        self.name = name
+        self.client = client
+        self.args = args
+
+    def __enter__(self):
+        self.span = self.tracer._enter(self.name, self.client, self.args)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._exit(self.span, f"{exc_type.__name__}: {exc}" if exc_type else None)
+        return False
+
+
+def format_summary(summary):
+    """将汇总统计格式化为文本表格，按总耗时降序"""
+    lines = [f"{'步骤':<24}{'次数':>8}{'总耗时(秒)':>14}{'平均(秒)':>12}{'最长(秒)':>12}{'匹配次数':>10}"]
+    for name, entry in sorted(summary.items(), key=lambda item: item[1]["seconds"], reverse=True):
+        lines.append(f"{name:<24}{entry['count']:>8}{entry['seconds']:>14.2f}{entry['mean']:>12.2f}"
+                     f"{entry['max']:>12.2f}{entry['matches']:>10}")
+    return "\n".join(lines)
@@ -0,0 +1,166 @@
+"""
+导出文件夹转移 - 同一分区内直接重命名，跨分区时并行流式复制并逐个删除源文件
+
+替代 shutil.copytree + shutil.rmtree：同一分区不再复制任何数据；跨分区时每个文件复制并校验大小后
+立即删除源文件，所需的额外磁盘空间不超过正在复制的几个文件。
+"""
+
+import os
+import time
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+COPY_BUFFER_SIZE = 8 * 1024 * 1024   # 流式复制的缓冲区大小
+COPY_WORKERS = 4                      # 跨分区复制的并行文件数
+PARTIAL_SUFFIX = ".part"              # 复制中的临时文件后缀，校验通过后才重命名为正式文件名
+
+
+class TransferError(OSError):
+    """部分文件未能转移，未转移的源文件保留在原位置"""
+
+
+def same_volume(source, target_dir):
+    """判断source与target_dir是否位于同一分区（可以直接重命名）"""
+    try:
+        return os.stat(source).st_dev == os.stat(target_dir).st_dev
+    except OSError:
+        return False
+
+
+def _copy_file(source, target, buffer_size=COPY_BUFFER_SIZE):
+    """
+    流式复制单个文件，校验大小后删除源文件
+    返回: int - 复制的字节数
+    """
+    expected = os.path.getsize(source)
+    partial = target + PARTIAL_SUFFIX
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with open(source, "rb") as src, open(partial, "wb") as dst:
+        while True:
+            n = src.readinto(buffer)
+            if not n:
+                break
+            dst.write(view[:n])
+    shutil.copystat(source, partial)
+    actual = os.path.getsize(partial)
+    if actual != expected:
+        os.remove(partial)
+        raise TransferError(f"文件大小不一致: {source} ({expected} != {actual})")
+    os.replace(partial, target)
+    os.remove(source)
+    return actual
+
+
+def _remove_empty_dirs(root):
+    """自底向上删除已清空的目录"""
+    for current, dirs, files in os.walk(root, topdown=False):
+        try:
+            os.rmdir(current)
+        except OSError:
+            pass
+
+
+def move_tree(source, target, workers=COPY_WORKERS, buffer_size=COPY_BUFFER_SIZE):
+    """
+    将source文件夹移动为target（target不能已存在）
+
+    同一分区内直接重命名；否则并行流式复制，每个文件校验通过后立即删除源文件。
+
+    返回:
+        dict: method("rename"/"copy"), files, bytes, seconds, mbps
+    异常:
+        TransferError - 部分文件复制失败（已转移的文件保留在target中，其余保留在source中）
+    """
+    start = time.monotonic()
+    target_parent = os.path.dirname(os.path.abspath(target))
+    os.makedirs(target_parent, exist_ok=True)
+
+    files = []
+    for current, dirs, names in os.walk(source):
+        for name in names:
+            path = os.path.join(current, name)
+            files.append((path, os.path.relpath(path, source)))
+
+    method = None
+    if same_volume(source, target_parent):
+        total = 0
+        for path, _ in files:
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        try:
+            os.rename(source, target)
+            method = "rename"
+        except OSError as e:
+            # 例如文件仍被占用，退回逐个文件复制
+            logging.warning(f"重命名失败，改为复制: {source} - {str(e)}")
+
+    if method is None:
+        for current, dirs, names in os.walk(source):
+            os.makedirs(os.path.join(target, os.path.relpath(current, source)), exist_ok=True)
+        failures = []
+        lock = threading.Lock()
+
+        def copy_one(item):
+            path, relative = item
+            try:
+                return _copy_file(path, os.path.join(target, relative), buffer_size)
+            except Exception as e:
+                with lock:
+                    failures.append(f"{relative}: {str(e)}")
+                return 0
+
+        # 大文件优先，避免最后只剩一个大文件在单线程复制
+        files.sort(key=lambda item: os.path.getsize(item[0]), reverse=True)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            total = sum(pool.map(copy_one, files))
+        if failures:
+            raise TransferError(f"{len(failures)} 个文件复制失败: {'; '.join(failures[:5])}")
+        _remove_empty_dirs(source)
+        method = "copy"
+
+    seconds = time.monotonic() - start
+    return {
+        "method": method,
+        "files": len(files),
+        "bytes": total,
+        "seconds": seconds,
+        "mbps": total / 1024 / 1024 / seconds if seconds > 0 else 0.0,
+    }
+
+
+class TransferLog:
+    """记录本次运行中每个客户端的转移结果，用于汇总吞吐量"""
+
+    def __init__(self):
+        self._records = []
+        self._lock = threading.Lock()
+
+    def record(self, name, result):
+        """记录一个客户端的转移结果（move_tree的返回值）"""
+        with self._lock:
+            self._records.append(dict(result, name=name))
+
+    def reset_stats(self):
+        """清空记录（每次运行开始时调用）"""
+        with self._lock:
+            self._records = []
+
+    def stats(self):
+        """返回转移次数、重命名/复制次数、总字节数、总耗时和平均MB/s"""
+        with self._lock:
+            records = list(self._records)
+        total_bytes = sum(r["bytes"] for r in records)
+        seconds = sum(r["seconds"] for r in records)
+        return {
+            "transfers": len(records),
+            "renamed": sum(1 for r in records if r["method"] == "rename"),
+            "copied": sum(1 for r in records if r["method"] == "copy"),
+            "bytes": total_bytes,
+            "seconds": seconds,
+            "mbps": total_bytes / 1024 / 1024 / seconds if seconds > 0 else 0.0,
+        }
@@ -0,0 +1,148 @@
+"""
+事件驱动等待 - 轮询廉价的界面状态检查，条件满足后立即返回，替代固定时长的sleep
+"""
+
+import time
+import logging
+
+import cv2
+import numpy as np
+
+# 默认轮询退避参数：(初始间隔, 递增倍数, 最大间隔)，单位秒
+DEFAULT_POLL_BACKOFF = (0.05, 1.5, 0.5)
+
+
+def wait_until(predicate, timeout, poll_backoff=DEFAULT_POLL_BACKOFF, sleep=time.sleep):
+    """
+    反复调用predicate直到其返回真值或超时
+
+    参数:
+        predicate: 无参数可调用对象，返回真值表示条件满足
+        timeout: 最长等待时间（秒）
+        poll_backoff: (初始间隔, 递增倍数, 最大间隔)，轮询间隔按倍数递增直到最大间隔
+        sleep: 两次轮询之间的等待函数，可替换为能被事件提前唤醒的等待
+
+    返回:
+        predicate的真值结果；超时返回None
+    """
+    interval, factor, max_interval = poll_backoff
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = predicate()
+        except Exception as e:
+            logging.debug(f"等待条件检查异常: {str(e)}")
+            result = None
+        if result:
+            return result
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        sleep(min(interval, remaining))
+        interval = min(interval * factor, max_interval)
+
+
+class ScreenSettled:
+    """
+    画面稳定判定条件，可直接作为wait_until的predicate
+
+    每次调用截取一帧并缩小，与上一帧比较平均像素差；
+    画面连续保持不变达到min_still秒即视为界面已就绪（动画、加载结束）。
+    """
+
+    def __init__(self, grab, min_still=0.2, threshold=1.0, scale=8):
+        self.grab = grab              # 返回灰度帧的截屏函数
+        self.min_still = min_still    # 画面需保持不变的时长
+        self.threshold = threshold    # 平均像素差阈值
+        self.scale = scale            # 缩小倍数，降低比较开销
+        self._last_frame = None
+        self._last_time = None
+        self._still_since = None
+
+    def _thumbnail(self):
+        frame = self.grab()
+        height, width = frame.shape[:2]
+        size = (max(1, width // self.scale), max(1, height // self.scale))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    def __call__(self):
+        frame = self._thumbnail()
+        now = time.monotonic()
+        last, last_time = self._last_frame, self._last_time
+        self._last_frame, self._last_time = frame, now
+        if last is None or last.shape != frame.shape:
+            self._still_since = None
+            return False
+        if cv2.absdiff(frame, last).mean() > self.threshold:
+            self._still_since = None
+            return False
+        if self._still_since is None:
+            # 与上一帧相同，说明从上一帧起画面就没有变化
+            self._still_since = last_time
+        return now - self._still_since >= self.min_still
+
+
+class FrameChangeDetector:
+    """
+    画面变化检测，用于在画面没有变化时跳过模板匹配
+
+    将帧缩小后按网格分块，与上次执行匹配时的参考帧逐块比较；
+    只要有一块的最大像素差超过阈值即视为画面已变化。
+    为防止遗漏，距上次放行超过max_age秒时无论是否变化都会放行一次。
+    """
+
+    def __init__(self, scale=4, tile=8, threshold=8, max_age=30):
+        self.scale = scale            # 缩小倍数
+        self.tile = tile              # 缩小后每块的边长（像素）
+        self.threshold = threshold    # 块内最大像素差阈值
+        self.max_age = max_age        # 强制放行间隔（秒）
+        self._reference = None
+        self._reference_key = None
+        self._reference_time = None
+        self.checks = 0               # 检查次数
+        self.skipped = 0              # 因画面未变化而跳过的次数
+
+    def _thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        size = (max(1, width // self.scale), max(1, height // self.scale))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    def _changed_tiles(self, thumbnail):
+        """返回每个分块是否变化的布尔网格"""
+        diff = cv2.absdiff(thumbnail, self._reference)
+        height, width = diff.shape[:2]
+        rows = -(-height // self.tile)
+        cols = -(-width // self.tile)
+        padded = np.zeros((rows * self.tile, cols * self.tile), dtype=diff.dtype)
+        padded[:height, :width] = diff
+        tiles = padded.reshape(rows, self.tile, cols, self.tile).max(axis=(1, 3))
+        return tiles > self.threshold
+
+    def check(self, frame, key=None):
+        """
+        判断画面自上次放行以来是否有变化
+
+        参数:
+            frame: 灰度帧（全屏或某个区域）
+            key: 帧对应的区域标识，区域改变时视为已变化
+
+        返回:
+            bool: True表示需要执行匹配
+        """
+        self.checks += 1
+        thumbnail = self._thumbnail(frame)
+        now = time.monotonic()
+        changed = (
+            self._reference is None
+            or key != self._reference_key
+            or self._reference.shape != thumbnail.shape
+            or now - self._reference_time >= self.max_age
+            or bool(self._changed_tiles(thumbnail).any())
+        )
+        if not changed:
+            self.skipped += 1
+            return False
+        self._reference = thumbnail
+        self._reference_key = key
+        self._reference_time = now
+        return True